@@ -0,0 +1,9 @@
+"""Benchmarks for SolarPool AI.
+
+Run from the project root, e.g.::
+
+    python3 -m benchmarks.policies
+
+They need the same environment as the integration (Home Assistant and
+NumPy installed) because they import the real modules.
+"""
@@ -0,0 +1,544 @@
+"""Lightweight Home Assistant stand-in for driving the real coordinator.
+
+Provides just what ``SolarPoolCoordinator`` touches: a state machine, a
+service registry, config entry updates, executor jobs and timers on a fake
+clock. ``SimulatedPool`` wires a ``PoolSimulator`` to pump, temperature,
+weather and sun entities, so cycles run against realistic sensor values.
+
+Timers are patched into the integration's modules (``use_clock``), so the
+coordinator code runs unchanged. ``VirtualClock`` only moves when advanced
+(deterministic, for measurements); ``AcceleratedClock`` runs on the real
+event loop at a multiple of real time (for load tests)::
+
+    clock = VirtualClock(START)
+    with use_clock(clock):
+        hass = FakeHass(clock)
+        pool = SimulatedPool(hass, "temperate", seed=0, sunrise=START)
+        coordinator = SolarPoolCoordinator(hass, pool.config_entry())
+        await coordinator.async_config_entry_first_refresh()
+        await clock.advance(86400)
+"""
+from __future__ import annotations
+
+import asyncio
+import heapq
+import inspect
+import itertools
+import json
+import math
+import os
+import tempfile
+import time
+import weakref
+from collections import Counter
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from types import MappingProxyType, SimpleNamespace
+from typing import Any, NamedTuple
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.exceptions import ServiceNotFound
+
+from custom_components.solarpool_ai import coordinator as coordinator_module
+from custom_components.solarpool_ai import fleet as fleet_module
+from custom_components.solarpool_ai import forecast as forecast_module
+from custom_components.solarpool_ai.const import DOMAIN
+from custom_components.solarpool_ai.simulator import PoolSimulator, pool_gain, return_delta
+
+# Sun elevation reported between sunset and sunrise
+NIGHT_ELEVATION = -10.0
+
+
+class FakeState(NamedTuple):
+    """The parts of homeassistant.core.State the integration reads."""
+
+    state: str
+    attributes: dict[str, Any]
+
+
+class FakeStates:
+    """State machine: entity_id -> FakeState."""
+
+    def __init__(self) -> None:
+        """Initialize an empty state machine."""
+        self._states: dict[str, FakeState] = {}
+
+    def get(self, entity_id: str) -> FakeState | None:
+        """Current state of an entity."""
+        return self._states.get(entity_id)
+
+    def async_set(self, entity_id: str, state: Any, attributes: dict[str, Any] | None = None) -> None:
+        """Set the state of an entity."""
+        self._states[entity_id] = FakeState(str(state), attributes or {})
+
+
+class FakeServices:
+    """Service registry that counts every call."""
+
+    def __init__(self) -> None:
+        """Initialize an empty registry."""
+        self._handlers: dict[tuple[str, str], Callable[[dict[str, Any]], Any]] = {}
+        self.calls: Counter[str] = Counter()
+
+    def async_register(self, domain: str, service: str, handler: Callable[[dict[str, Any]], Any]) -> None:
+        """Register a handler; it receives the service data (may be async)."""
+        self._handlers[(domain, service)] = handler
+
+    async def async_call(
+        self,
+        domain: str,
+        service: str,
+        service_data: dict[str, Any] | None = None,
+        blocking: bool = False,
+        return_response: bool = False,
+    ) -> Any:
+        """Call a service like hass.services.async_call."""
+        handler = self._handlers.get((domain, service))
+        if handler is None:
+            raise ServiceNotFound(domain, service)
+        self.calls[f"{domain}.{service}"] += 1
+        result = handler(service_data or {})
+        if inspect.isawaitable(result):
+            result = await result
+        return result if return_response else None
+
+
+class FakeConfigEntries:
+    """Config entry updates: counts writes and runs the update listeners."""
+
+    def __init__(self, hass: FakeHass) -> None:
+        """Initialize the registry."""
+        self.hass = hass
+        self.writes = 0
+
+    def async_update_entry(
+        self,
+        entry: ConfigEntry,
+        *,
+        data: dict[str, Any] | None = None,
+        options: dict[str, Any] | None = None,
+    ) -> bool:
+        """Update an entry like ConfigEntries.async_update_entry."""
+        changed = False
+        if data is not None and entry.data != data:
+            entry.data = MappingProxyType(data)
+            changed = True
+        if options is not None and entry.options != options:
+            entry.options = MappingProxyType(options)
+            changed = True
+        if not changed:
+            return False
+
+        self.writes += 1
+        for listener in entry.update_listeners:
+            if isinstance(listener, weakref.ref):
+                listener = listener()
+            if listener is not None:
+                self.hass.async_create_task(listener(self.hass, entry))
+        return True
+
+
+def payload_bytes(entry: ConfigEntry) -> int:
+    """Size of an entry's data and options as Home Assistant stores them (JSON)."""
+    return len(json.dumps({"data": dict(entry.data), "options": dict(entry.options)}))
+
+
+class FakeHass:
+    """The subset of HomeAssistant the coordinator uses."""
+
+    def __init__(
+        self,
+        clock: VirtualClock | AcceleratedClock,
+        latitude: float = -34.6,
+        longitude: float = -58.4,
+        inline_executor: bool = True,
+        config_dir: str | None = None,
+    ) -> None:
+        """Initialize the stand-in.
+
+        Args:
+            clock: Clock the timers run on
+            latitude: Home latitude (used by the day planner)
+            longitude: Home longitude
+            inline_executor: Run executor jobs inline (deterministic) instead
+                of in the loop's default executor
+            config_dir: Configuration directory (cycle traces are written
+                there); a temporary one, removed with the instance, if None
+        """
+        self.clock = clock
+        self.states = FakeStates()
+        self.services = FakeServices()
+        self.config_entries = FakeConfigEntries(self)
+        if config_dir is None:
+            self._config_dir = tempfile.TemporaryDirectory(prefix="solarpool_fake_hass_")
+            config_dir = self._config_dir.name
+        self.config = SimpleNamespace(
+            latitude=latitude,
+            longitude=longitude,
+            config_dir=config_dir,
+            path=lambda *parts: os.path.join(config_dir, *parts),
+        )
+        self.bus = SimpleNamespace(async_listen_once=lambda event, listener: lambda: None)
+        self.data: dict[str, Any] = {}
+        self.is_running = True
+        self.is_stopping = False
+        self.inline_executor = inline_executor
+        self._tasks: set[asyncio.Task] = set()
+
+    def async_create_task(self, target: Any) -> asyncio.Task:
+        """Schedule a coroutine on the running loop."""
+        task = asyncio.get_running_loop().create_task(target)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    def async_add_executor_job(self, target: Callable[..., Any], *args: Any) -> asyncio.Future:
+        """Run a blocking function (inline, or in the default executor)."""
+        loop = asyncio.get_running_loop()
+        if not self.inline_executor:
+            return loop.run_in_executor(None, target, *args)
+        future = loop.create_future()
+        try:
+            future.set_result(target(*args))
+        except Exception as err:  # noqa: BLE001 - delivered to the awaiting caller
+            future.set_exception(err)
+        return future
+
+    async def async_block_till_done(self) -> None:
+        """Wait for every task created through async_create_task."""
+        while self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+class _Timer:
+    """A scheduled callback of the virtual clock."""
+
+    __slots__ = ("when", "seq", "action", "hass", "interval", "measured", "active")
+
+    def __init__(self, when, seq, action, hass, interval, measured) -> None:
+        self.when = when
+        self.seq = seq
+        self.action = action
+        self.hass = hass
+        self.interval = interval
+        self.measured = measured
+        self.active = True
+
+    def __lt__(self, other: _Timer) -> bool:
+        return (self.when, self.seq) < (other.when, other.seq)
+
+
+def _seconds(delay: float | timedelta) -> float:
+    """Delay in seconds from a number or a timedelta."""
+    return delay.total_seconds() if isinstance(delay, timedelta) else float(delay)
+
+
+class VirtualClock:
+    """Fake clock: time only moves in advance(), timers fire in order.
+
+    Callbacks scheduled through the Home Assistant helpers (``call_later``,
+    ``track_time_interval``) are timed; ``busy_seconds`` is the wall time
+    spent in them. Simulation timers (``schedule_interval``) are not.
+    """
+
+    def __init__(self, start: datetime) -> None:
+        """Start the clock at a timezone-aware datetime."""
+        self._now = start
+        self._timers: list[_Timer] = []
+        self._seq = itertools.count()
+        self.callbacks = 0
+        self.busy_seconds = 0.0
+
+    def utcnow(self) -> datetime:
+        """Current fake time."""
+        return self._now
+
+    def _schedule(self, delay: float, action, hass, interval: float | None, measured: bool) -> Callable[[], None]:
+        timer = _Timer(self._now + timedelta(seconds=delay), next(self._seq), action, hass, interval, measured)
+        heapq.heappush(self._timers, timer)
+
+        def cancel() -> None:
+            timer.active = False
+
+        return cancel
+
+    def call_later(self, hass: Any, delay: float | timedelta, action: Callable[[datetime], Any]) -> Callable[[], None]:
+        """Replacement for homeassistant.helpers.event.async_call_later."""
+        return self._schedule(_seconds(delay), action, hass, None, True)
+
+    def track_time_interval(
+        self, hass: Any, action: Callable[[datetime], Any], interval: timedelta
+    ) -> Callable[[], None]:
+        """Replacement for homeassistant.helpers.event.async_track_time_interval."""
+        seconds = _seconds(interval)
+        return self._schedule(seconds, action, hass, seconds, True)
+
+    def schedule_interval(self, seconds: float, action: Callable[[datetime], Any]) -> Callable[[], None]:
+        """Untimed periodic callback for the simulation itself."""
+        return self._schedule(seconds, action, None, seconds, False)
+
+    async def advance(self, seconds: float) -> None:
+        """Move the clock forward, firing every timer that falls due."""
+        target = self._now + timedelta(seconds=seconds)
+        while self._timers and self._timers[0].when <= target:
+            timer = heapq.heappop(self._timers)
+            if not timer.active:
+                continue
+            self._now = timer.when
+            if timer.interval is not None:
+                timer.when = timer.when + timedelta(seconds=timer.interval)
+                timer.seq = next(self._seq)
+                heapq.heappush(self._timers, timer)
+
+            start = time.perf_counter()
+            result = timer.action(self._now)
+            if inspect.isawaitable(result):
+                await result
+            if timer.hass is not None:
+                await timer.hass.async_block_till_done()
+            if timer.measured:
+                self.callbacks += 1
+                self.busy_seconds += time.perf_counter() - start
+        self._now = target
+
+
+class AcceleratedClock:
+    """Clock that runs on the real event loop, ``speed`` times faster.
+
+    Timers are real loop timers (``loop.call_later``) with the delay divided
+    by ``speed``, so many coordinators share one loop and compete for it the
+    way they would in Home Assistant. Coroutine callbacks run as tasks.
+    """
+
+    def __init__(self, start: datetime, speed: float = 1440.0) -> None:
+        """Start the clock at a timezone-aware datetime.
+
+        Args:
+            start: Fake time when the loop clock is first read
+            speed: Fake seconds per real second
+        """
+        self.start = start
+        self.speed = speed
+        self.callbacks = 0
+        self._loop_start: float | None = None
+
+    def _elapsed(self) -> float:
+        """Real seconds since the clock started."""
+        loop = asyncio.get_running_loop()
+        if self._loop_start is None:
+            self._loop_start = loop.time()
+        return loop.time() - self._loop_start
+
+    def utcnow(self) -> datetime:
+        """Current accelerated time."""
+        return self.start + timedelta(seconds=self._elapsed() * self.speed)
+
+    def _schedule(self, delay: float, action, hass, interval: float | None, measured: bool) -> Callable[[], None]:
+        loop = asyncio.get_running_loop()
+        self._elapsed()
+        handle: asyncio.TimerHandle | None = None
+
+        def fire() -> None:
+            nonlocal handle
+            if interval is not None:
+                handle = loop.call_later(interval / self.speed, fire)
+            if measured:
+                self.callbacks += 1
+            result = action(self.utcnow())
+            if inspect.isawaitable(result):
+                if hass is not None:
+                    hass.async_create_task(result)
+                else:
+                    loop.create_task(result)
+
+        handle = loop.call_later(delay / self.speed, fire)
+
+        def cancel() -> None:
+            if handle is not None:
+                handle.cancel()
+
+        return cancel
+
+    def call_later(self, hass: Any, delay: float | timedelta, action: Callable[[datetime], Any]) -> Callable[[], None]:
+        """Replacement for homeassistant.helpers.event.async_call_later."""
+        return self._schedule(_seconds(delay), action, hass, None, True)
+
+    def track_time_interval(
+        self, hass: Any, action: Callable[[datetime], Any], interval: timedelta
+    ) -> Callable[[], None]:
+        """Replacement for homeassistant.helpers.event.async_track_time_interval."""
+        seconds = _seconds(interval)
+        return self._schedule(seconds, action, hass, seconds, True)
+
+    def schedule_interval(self, seconds: float, action: Callable[[datetime], Any]) -> Callable[[], None]:
+        """Uncounted periodic callback for the simulation itself."""
+        return self._schedule(seconds, action, None, seconds, False)
+
+
+@contextmanager
+def use_clock(clock: VirtualClock | AcceleratedClock) -> Iterator[None]:
+    """Route the integration's timers and utcnow() through a fake clock."""
+    patches = [
+        (coordinator_module, "utcnow", clock.utcnow),
+        (coordinator_module, "async_call_later", clock.call_later),
+        (coordinator_module, "async_track_time_interval", clock.track_time_interval),
+        (forecast_module, "utcnow", clock.utcnow),
+        (fleet_module, "utcnow", clock.utcnow),
+        (fleet_module, "async_call_later", clock.call_later),
+        (fleet_module, "async_track_time_interval", clock.track_time_interval),
+    ]
+    originals = [(module, name, getattr(module, name)) for module, name, _ in patches]
+    for module, name, value in patches:
+        setattr(module, name, value)
+    try:
+        yield
+    finally:
+        for module, name, value in originals:
+            setattr(module, name, value)
+
+
+def _switch_handler(hass: FakeHass, turn_on: bool) -> Callable[[dict[str, Any]], None]:
+    """switch.turn_on / turn_off for the simulated pumps."""
+
+    def handle(data: dict[str, Any]) -> None:
+        entity_id = data["entity_id"]
+        pool = hass.data["simulated_pools"].get(entity_id)
+        if pool is not None:
+            pool.set_pump(turn_on)
+        else:
+            hass.states.async_set(entity_id, "on" if turn_on else "off")
+
+    return handle
+
+
+class SimulatedPool:
+    """A PoolSimulator wired to fake pump, sensor, weather and sun entities.
+
+    The pool temperature evolves with the simulator's physics while the
+    clock runs, heating only while the pump switch is on. Sensors are
+    published every ``sensor_interval`` seconds, like polled HA sensors.
+    """
+
+    def __init__(
+        self,
+        hass: FakeHass,
+        profile: str = "temperate",
+        seed: int = 0,
+        sunrise: datetime | None = None,
+        name: str = "pool",
+        sensor_interval: float = 60.0,
+    ) -> None:
+        """Create the pool and its entities.
+
+        Args:
+            hass: Fake hass to publish the entities on
+            profile: Climate profile of the simulator
+            seed: Seed of the simulator (weather and sensor noise)
+            sunrise: Time of the first simulated sunrise (defaults to now)
+            name: Entity ID suffix, unique per pool
+            sensor_interval: Seconds between sensor updates
+        """
+        self.hass = hass
+        self.sim = PoolSimulator(profile, seed=seed)
+        self.sunrise = sunrise or hass.clock.utcnow()
+        self.pump_on = False
+        self.pump_entity_id = f"switch.{name}_pump"
+        self.pool_sensor_id = f"sensor.{name}_temperature"
+        self.return_sensor_id = f"sensor.{name}_solar_return"
+        self.weather_entity_id = f"weather.{name}_home"
+        self._day = 0
+        self._updated = hass.clock.utcnow()
+
+        pools = hass.data.setdefault("simulated_pools", {})
+        # All pools of one hass share the sun entity; the first one publishes it
+        self._publishes_sun = not pools
+        if not pools:
+            hass.services.async_register("switch", "turn_on", _switch_handler(hass, True))
+            hass.services.async_register("switch", "turn_off", _switch_handler(hass, False))
+        pools[self.pump_entity_id] = self
+        hass.clock.schedule_interval(sensor_interval, self.update)
+        self.update(self._updated)
+
+    def config_entry(self, data: dict[str, Any] | None = None, **options: Any) -> ConfigEntry:
+        """Config entry of an integration instance controlling this pool.
+
+        Args:
+            data: Extra entry data (e.g. persisted policy states)
+            **options: Entry options
+        """
+        return ConfigEntry(
+            version=1,
+            minor_version=1,
+            domain=DOMAIN,
+            title=self.pump_entity_id,
+            data={
+                "pump_entity_id": self.pump_entity_id,
+                "pool_sensor_id": self.pool_sensor_id,
+                "return_sensor_id": self.return_sensor_id,
+                "weather_entity_id": self.weather_entity_id,
+                **(data or {}),
+            },
+            source="user",
+            options=options,
+        )
+
+    def set_pump(self, turn_on: bool) -> None:
+        """Switch the pump (physics is brought up to date first)."""
+        self.update(self.hass.clock.utcnow())
+        self.pump_on = turn_on
+        self.hass.states.async_set(self.pump_entity_id, "on" if turn_on else "off")
+
+    def update(self, now: datetime) -> None:
+        """Evolve the pool up to ``now`` and publish the sensors."""
+        sim = self.sim
+        minutes = (now - self._updated).total_seconds() / 60
+        self._updated = now
+
+        elapsed_minutes = (now - self.sunrise).total_seconds() / 60
+        while elapsed_minutes >= (self._day + 1) * 1440:
+            sim.reset_day()
+            self._day += 1
+        minute = elapsed_minutes - self._day * 1440
+        daylight = 0 <= minute < sim.day_minutes
+        weather = sim.weather_at(minute)
+        if not daylight:
+            weather.update(uv_index=0.0, uv_index_raw=0.0, sun_elevation=NIGHT_ELEVATION)
+        if daylight and minutes > 0:
+            sim.t_pool += float(
+                pool_gain(
+                    sim.pool,
+                    sim.t_pool,
+                    weather["uv_index"],
+                    weather["wind_speed"],
+                    weather["temperature_ext"],
+                    minutes if self.pump_on else 0.0,
+                    minutes,
+                )
+            )
+
+        noise = sim.rng.normal(0, sim.pool.sensor_noise, 2)
+        delta = float(
+            return_delta(sim.pool, weather["uv_index"], weather["wind_speed"], weather["temperature_ext"], sim.t_pool)
+        )
+        states = self.hass.states
+        states.async_set(self.pool_sensor_id, round(sim.t_pool + noise[0], 2))
+        states.async_set(self.return_sensor_id, round(sim.t_pool + delta + noise[1], 2))
+        states.async_set(
+            self.weather_entity_id,
+            "cloudy" if weather["cloud_coverage"] > 70 else "sunny",
+            {
+                "uv_index": round(weather["uv_index_raw"], 1),
+                "wind_speed": round(weather["wind_speed"], 1),
+                "temperature": round(weather["temperature_ext"], 1),
+                "cloud_coverage": round(weather["cloud_coverage"]),
+            },
+        )
+        if not self._publishes_sun:
+            return
+        elevation = weather["sun_elevation"]
+        states.async_set(
+            "sun.sun",
+            "above_horizon" if elevation > 0 else "below_horizon",
+            {"elevation": round(elevation, 1), "azimuth": round(math.degrees(math.pi * minute / 1440), 1)},
+        )
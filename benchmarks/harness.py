@@ -0,0 +1,162 @@
+"""Shared benchmark harness: runs policies on the pool simulator.
+
+Every policy is driven through the Policy protocol only (decide / observe /
+to_dict), so any new policy can be compared without changes here.
+"""
+from __future__ import annotations
+
+import json
+import time
+import tracemalloc
+from collections.abc import Callable
+from typing import Any
+
+import numpy as np
+
+from custom_components.solarpool_ai.const import RL_ACTIONS
+from custom_components.solarpool_ai.policy import Policy, Transition, calculate_reward
+from custom_components.solarpool_ai.simulator import PoolSimulator
+
+
+def seeded_state(seed: int) -> dict[str, Any]:
+    """Initial policy state that seeds the policy's own generator."""
+    return {"random": {"seed": seed}}
+
+
+def run_learning(
+    policy: Policy,
+    profile: str = "temperate",
+    days: int = 30,
+    seed: int = 0,
+    reward_fn: Callable[[float, int], float] = calculate_reward,
+) -> dict[str, np.ndarray]:
+    """Run a policy online on the simulator.
+
+    The policy draws from its own generator, so build it with
+    ``create_policy(name, seeded_state(seed))`` for a reproducible run.
+
+    Args:
+        policy: Policy under test (learns in place)
+        profile: Climate profile name
+        days: Simulated days
+        seed: Seed for the simulator
+        reward_fn: Reward the policy learns from, (gain, minutes) -> reward.
+            Regret is always measured with the default calculate_reward, so
+            runs with different reward shaping stay comparable.
+
+    Returns:
+        Dict of per-cycle arrays: rewards, regrets, actions
+    """
+    sim = PoolSimulator(profile, seed=seed)
+    rewards: list[float] = []
+    regrets: list[float] = []
+    actions: list[int] = []
+
+    for _ in range(days):
+        context = sim.context()
+        while not sim.done:
+            expected = sim.expected_rewards()
+            decision = policy.decide(context)
+            action = decision["action_index"]
+            gain = sim.step(action)
+            reward = reward_fn(gain, RL_ACTIONS[action])
+            # Like the coordinator: the outcome is measured before the next
+            # decision, so the successor is never passed, only the end of day
+            policy.observe(Transition(context, action, reward, terminal=sim.done))
+
+            rewards.append(reward)
+            regrets.append(float(expected.max() - expected[action]))
+            actions.append(action)
+            if not sim.done:
+                context = sim.context()
+        sim.reset_day()
+
+    return {
+        "rewards": np.array(rewards),
+        "regrets": np.array(regrets),
+        "actions": np.array(actions),
+    }
+
+
+def cycles_to_convergence(regrets: np.ndarray, window: int = 50, threshold: float = 0.1) -> int | None:
+    """First cycle after which the rolling mean regret stays below threshold.
+
+    Returns:
+        Cycle index, or None if the policy never converged
+    """
+    if len(regrets) < window:
+        return None
+    rolling = np.convolve(regrets, np.ones(window) / window, mode="valid")
+    above = np.nonzero(rolling >= threshold)[0]
+    if len(above) == 0:
+        return window
+    last_bad = int(above[-1])
+    if last_bad == len(rolling) - 1:
+        return None
+    return last_bad + 1 + window
+
+
+def sample_contexts(count: int = 256, profile: str = "temperate", seed: int = 0) -> list[dict[str, Any]]:
+    """Draw realistic contexts from the simulator (for latency tests)."""
+    sim = PoolSimulator(profile, seed=seed)
+    contexts = []
+    while len(contexts) < count:
+        if sim.done:
+            sim.reset_day()
+        contexts.append(sim.context())
+        sim.step(0)
+    return contexts
+
+
+def measure_latency(policy: Policy, contexts: list[dict[str, Any]], repeat: int = 3) -> dict[str, float]:
+    """Measure per-decision latency of decide() and decide_batch().
+
+    Returns:
+        Best-of-repeat microseconds per context for each call style
+    """
+    single = []
+    batch = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for context in contexts:
+            policy.decide(context)
+        single.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        policy.decide_batch(contexts, explore=False)
+        batch.append(time.perf_counter() - start)
+
+    n = len(contexts)
+    return {
+        "decide_us": min(single) / n * 1e6,
+        "decide_batch_us": min(batch) / n * 1e6,
+    }
+
+
+def measure_memory(factory: Callable[[], Policy]) -> dict[str, float]:
+    """Measure the allocation peak of building a policy and its state size.
+
+    Returns:
+        peak_kib: tracemalloc peak while constructing the policy
+        state_bytes: size of the JSON-serialized to_dict() payload
+    """
+    tracemalloc.start()
+    policy = factory()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "peak_kib": peak / 1024,
+        "state_bytes": len(json.dumps(policy.to_dict())),
+    }
+
+
+def summarize(results: dict[str, np.ndarray], window: int = 50, threshold: float = 0.1) -> dict[str, Any]:
+    """Reduce a run_learning result to the reported learning metrics."""
+    regrets = results["regrets"]
+    return {
+        "cycles": len(regrets),
+        "mean_reward": float(results["rewards"].mean()),
+        "total_regret": float(regrets.sum()),
+        "final_regret": float(regrets[-window:].mean()),
+        "cycles_to_convergence": cycles_to_convergence(regrets, window, threshold),
+    }
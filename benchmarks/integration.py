@@ -0,0 +1,237 @@
+"""Benchmark the shipped coordinator end to end on a fake clock.
+
+Runs the real ``SolarPoolCoordinator`` (sweep, stability checks, decision,
+safety overrides, heating, outcome measurement and persistence) against the
+Home Assistant stand-in in ``fake_hass``, with a simulated pool behind the
+sensors and the pump, and reports per policy:
+
+- decide_us: latency of the policy's decide()
+- consult_ms: latency of a whole measure-and-consult step
+- cycle_ms: wall time of all coordinator callbacks per cycle
+- payload_bytes: size of the persisted config entry after the run
+- alloc_peak_kib: allocation peak per scan interval (tracemalloc)
+- retained_kib: memory still allocated after the run, per cycle
+
+Results are compared with ``baselines/integration.json`` (stored on the
+reference machine with ``--update-baselines``); the run fails if a metric
+grows past its tolerance::
+
+    python3 -m benchmarks.integration --days 3
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import sys
+import time
+import tracemalloc
+from collections.abc import Callable
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+from custom_components.solarpool_ai import update_listener
+from custom_components.solarpool_ai.const import (
+    CONF_POLICY,
+    CONF_POLICY_STATES,
+    DEFAULT_SCAN_INTERVAL,
+    DOMAIN,
+    SUPPORTED_POLICIES,
+)
+from custom_components.solarpool_ai.coordinator import SolarPoolCoordinator
+
+from .fake_hass import FakeHass, SimulatedPool, VirtualClock, payload_bytes, use_clock
+from .harness import seeded_state
+
+BASELINES = Path(__file__).parent / "baselines" / "integration.json"
+
+# Allowed growth over the baseline before a metric counts as a regression
+TOLERANCES = {
+    "decide_us": 1.5,
+    "consult_ms": 1.5,
+    "cycle_ms": 1.5,
+    "payload_bytes": 1.1,
+    "alloc_peak_kib": 1.25,
+    "retained_kib": 1.5,
+}
+
+# Sunrise of the first simulated day (06:00 in Buenos Aires)
+START = datetime(2024, 1, 15, 9, 0, tzinfo=timezone.utc)
+
+
+def _timed(func: Callable[..., Any], samples: list[float]) -> Callable[..., Any]:
+    """Wrap a sync or async callable, appending each call's seconds to samples."""
+    if asyncio.iscoroutinefunction(func):
+
+        async def timed_async(*args: Any, **kwargs: Any) -> Any:
+            start = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                samples.append(time.perf_counter() - start)
+
+        return timed_async
+
+    def timed(*args: Any, **kwargs: Any) -> Any:
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            samples.append(time.perf_counter() - start)
+
+    return timed
+
+
+async def run_integration(
+    policy: str,
+    days: int = 3,
+    profile: str = "temperate",
+    seed: int = 0,
+    trace_allocations: bool = False,
+) -> dict[str, Any]:
+    """Run one coordinator for some simulated days.
+
+    Args:
+        policy: Decision policy of the config entry
+        days: Simulated days
+        profile: Climate profile of the simulated pool
+        seed: Seed of the simulated pool
+        trace_allocations: Measure allocations with tracemalloc (slower, so
+            timings from this run are not reported)
+
+    Returns:
+        Raw measurements of the run
+    """
+    clock = VirtualClock(START)
+    with use_clock(clock):
+        hass = FakeHass(clock)
+        pool = SimulatedPool(hass, profile, seed=seed, sunrise=START)
+        entry = pool.config_entry({CONF_POLICY_STATES: {policy: seeded_state(seed)}}, **{CONF_POLICY: policy})
+        coordinator = SolarPoolCoordinator(hass, entry)
+        hass.data[DOMAIN] = {entry.entry_id: coordinator}
+        entry.add_update_listener(update_listener)
+
+        decide: list[float] = []
+        consult: list[float] = []
+        cycles: list[float] = []
+        coordinator.policy.decide = _timed(coordinator.policy.decide, decide)
+        coordinator._async_measure_and_consult = _timed(coordinator._async_measure_and_consult, consult)
+        coordinator.async_start_cycle = _timed(coordinator.async_start_cycle, cycles)
+
+        peaks: list[float] = []
+        if trace_allocations:
+            tracemalloc.start()
+        baseline_memory = tracemalloc.get_traced_memory()[0] if trace_allocations else 0
+
+        await coordinator.async_config_entry_first_refresh()
+        interval = coordinator.settings.scan_interval * 60
+        for _ in range(int(days * 86400 // interval)):
+            if trace_allocations:
+                current, _ = tracemalloc.get_traced_memory()
+                tracemalloc.reset_peak()
+            await clock.advance(interval)
+            if trace_allocations:
+                peaks.append((tracemalloc.get_traced_memory()[1] - current) / 1024)
+
+        retained = (tracemalloc.get_traced_memory()[0] - baseline_memory) / 1024 if trace_allocations else 0.0
+        if trace_allocations:
+            tracemalloc.stop()
+        await coordinator.stop()
+
+    decided = len(decide)
+    return {
+        "policy": policy,
+        "cycles": len(cycles),
+        "decisions": decided,
+        "decide_us": sum(decide) / max(decided, 1) * 1e6,
+        "consult_ms": sum(consult) / max(len(consult), 1) * 1e3,
+        "cycle_ms": clock.busy_seconds / max(len(cycles), 1) * 1e3,
+        "callbacks": clock.callbacks,
+        "service_calls": dict(hass.services.calls),
+        "writes": hass.config_entries.writes,
+        "payload_bytes": payload_bytes(entry),
+        "alloc_peak_kib": sum(peaks) / max(len(peaks), 1),
+        "retained_kib": retained / max(len(cycles), 1),
+    }
+
+
+async def benchmark_policy(policy: str, days: int, profile: str, seed: int, repeat: int = 3) -> dict[str, Any]:
+    """Best of ``repeat`` timed runs plus an allocation-traced run of the same scenario."""
+    runs = [await run_integration(policy, days, profile, seed) for _ in range(repeat)]
+    timed = min(runs, key=lambda run: run["cycle_ms"])
+    for metric in ("decide_us", "consult_ms"):
+        timed[metric] = min(run[metric] for run in runs)
+    traced = await run_integration(policy, days, profile, seed, trace_allocations=True)
+    timed["alloc_peak_kib"] = traced["alloc_peak_kib"]
+    timed["retained_kib"] = traced["retained_kib"]
+    return timed
+
+
+def compare(results: list[dict[str, Any]], baselines: dict[str, dict[str, float]]) -> list[str]:
+    """Metrics that grew past their tolerance over the stored baselines."""
+    regressions = []
+    for result in results:
+        baseline = baselines.get(result["policy"], {})
+        for metric, tolerance in TOLERANCES.items():
+            reference = baseline.get(metric)
+            if reference and result[metric] > reference * tolerance:
+                regressions.append(
+                    f"{result['policy']} {metric}: {result[metric]:.1f} > {reference:.1f} x {tolerance}"
+                )
+    return regressions
+
+
+def main() -> None:
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--days", type=int, default=3)
+    parser.add_argument("--profile", default="temperate")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per policy (best is kept)")
+    parser.add_argument("--policies", nargs="*", default=list(SUPPORTED_POLICIES))
+    parser.add_argument("--update-baselines", action="store_true", help="Store these results as the baselines")
+    parser.add_argument("--json", action="store_true", help="Print raw JSON results")
+    args = parser.parse_args()
+
+    # Keep the integration's warnings out of the report (records are still built)
+    integration_logger = logging.getLogger("custom_components.solarpool_ai")
+    integration_logger.addHandler(logging.NullHandler())
+    integration_logger.propagate = False
+
+    results = [
+        asyncio.run(benchmark_policy(policy, args.days, args.profile, args.seed, args.repeat))
+        for policy in args.policies
+    ]
+
+    baselines = json.loads(BASELINES.read_text()) if BASELINES.exists() else {}
+    if args.update_baselines:
+        for result in results:
+            baselines[result["policy"]] = {metric: round(result[metric], 2) for metric in TOLERANCES}
+        BASELINES.parent.mkdir(exist_ok=True)
+        BASELINES.write_text(json.dumps(baselines, indent=2, sort_keys=True) + "\n")
+    regressions = compare(results, baselines)
+
+    if args.json:
+        print(json.dumps({"results": results, "regressions": regressions}, indent=2))
+    else:
+        header = (
+            f"{'policy':<11} {'cycles':>6} {'decide µs':>9} {'consult ms':>10} {'cycle ms':>8} "
+            f"{'payload B':>9} {'alloc KiB':>9} {'kept KiB':>8}"
+        )
+        print(f"Days: {args.days}, profile: {args.profile}, scan interval: {DEFAULT_SCAN_INTERVAL} min")
+        print(header)
+        print("-" * len(header))
+        for r in results:
+            print(
+                f"{r['policy']:<11} {r['cycles']:>6} {r['decide_us']:>9.1f} {r['consult_ms']:>10.2f} "
+                f"{r['cycle_ms']:>8.2f} {r['payload_bytes']:>9} {r['alloc_peak_kib']:>9.1f} {r['retained_kib']:>8.2f}"
+            )
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+"""Load test: many coordinators sharing one event loop.
+
+Creates N ``SolarPoolCoordinator`` instances against the Home Assistant
+stand-in in ``fake_hass``, each with its own simulated pool, sensors and
+pump, and runs them for a full simulated day on an accelerated clock
+(``--speed`` fake seconds per real second). For each N it reports:
+
+- lag_ms: event-loop lag (how late a 10 ms probe timer wakes up), mean,
+  p99 and max, in real milliseconds
+- callbacks/s: integration timer callbacks per real second
+- service calls and config entry (persistence) writes over the day
+- peak RSS of the process, and its growth per coordinator
+
+Every N runs in a fresh interpreter so peak memory is not shared between
+them. Lag is real time: a lag approaching the coordinators' timer periods
+divided by ``--speed`` means the loop is saturated at that speed, and the
+simulated day falls behind real Home Assistant behaviour::
+
+    python3 -m benchmarks.load --pools 1 10 100 1000 --speed 1440
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import resource
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any
+
+from custom_components.solarpool_ai import update_listener
+from custom_components.solarpool_ai.const import (
+    CONF_POLICY,
+    CONF_POLICY_STATES,
+    DOMAIN,
+    POLICY_Q_LEARNING,
+    SUPPORTED_POLICIES,
+)
+from custom_components.solarpool_ai.coordinator import SolarPoolCoordinator
+from custom_components.solarpool_ai.simulator import CLIMATE_PROFILES
+
+from .fake_hass import AcceleratedClock, FakeHass, SimulatedPool, use_clock
+from .harness import seeded_state
+
+# Sunrise of the simulated day (06:00 in Buenos Aires)
+START = datetime(2024, 1, 15, 9, 0, tzinfo=timezone.utc)
+
+# Real seconds between event-loop lag probes
+PROBE_INTERVAL = 0.01
+
+
+def _rss_kib() -> int:
+    """Peak resident set size of this process in KiB (Linux units)."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+async def _probe_lag(samples: list[float], stop: asyncio.Event) -> None:
+    """Sample how late a short sleep wakes up until ``stop`` is set."""
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        start = loop.time()
+        await asyncio.sleep(PROBE_INTERVAL)
+        samples.append(max(loop.time() - start - PROBE_INTERVAL, 0.0))
+
+
+def _percentile(values: list[float], fraction: float) -> float:
+    """Nearest-rank percentile of unsorted values (0 when empty)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+
+async def run_load(
+    pools: int,
+    policy: str = POLICY_Q_LEARNING,
+    hours: float = 24.0,
+    speed: float = 1440.0,
+    sensor_interval: float = 300.0,
+    seed: int = 0,
+) -> dict[str, Any]:
+    """Run N coordinators in this event loop for some simulated hours.
+
+    Args:
+        pools: Number of coordinators (one simulated pool each)
+        policy: Decision policy of every config entry
+        hours: Simulated hours to run
+        speed: Fake seconds per real second
+        sensor_interval: Fake seconds between sensor updates of each pool
+        seed: Seed of the first pool (pool i uses seed + i)
+
+    Returns:
+        Raw measurements of the run
+    """
+    profiles = list(CLIMATE_PROFILES)
+    rss_before = _rss_kib()
+    clock = AcceleratedClock(START, speed)
+    with use_clock(clock):
+        hass = FakeHass(clock, inline_executor=False)
+        hass.data[DOMAIN] = {}
+        coordinators = []
+        setup_start = time.perf_counter()
+        for index in range(pools):
+            pool = SimulatedPool(
+                hass,
+                profiles[index % len(profiles)],
+                seed=seed + index,
+                sunrise=START,
+                name=f"pool_{index}",
+                sensor_interval=sensor_interval,
+            )
+            entry = pool.config_entry(
+                {CONF_POLICY_STATES: {policy: seeded_state(seed + index)}}, **{CONF_POLICY: policy}
+            )
+            coordinator = SolarPoolCoordinator(hass, entry)
+            hass.data[DOMAIN][entry.entry_id] = coordinator
+            entry.add_update_listener(update_listener)
+            await coordinator.async_config_entry_first_refresh()
+            coordinators.append(coordinator)
+        setup_seconds = time.perf_counter() - setup_start
+
+        lag: list[float] = []
+        stop = asyncio.Event()
+        probe = asyncio.create_task(_probe_lag(lag, stop))
+        run_start = time.perf_counter()
+        callbacks_before = clock.callbacks
+        await asyncio.sleep(hours * 3600 / speed)
+        run_seconds = time.perf_counter() - run_start
+        callbacks = clock.callbacks - callbacks_before
+        stop.set()
+        await probe
+
+        for coordinator in coordinators:
+            await coordinator.stop()
+        await hass.async_block_till_done()
+
+    rss_peak = _rss_kib()
+    return {
+        "pools": pools,
+        "policy": policy,
+        "simulated_hours": hours,
+        "real_seconds": round(run_seconds, 2),
+        "setup_ms_per_pool": setup_seconds / pools * 1000,
+        "lag_mean_ms": sum(lag) / max(len(lag), 1) * 1000,
+        "lag_p99_ms": _percentile(lag, 0.99) * 1000,
+        "lag_max_ms": max(lag, default=0.0) * 1000,
+        "callbacks": callbacks,
+        "callbacks_per_s": callbacks / run_seconds,
+        "service_calls": sum(hass.services.calls.values()),
+        "writes": hass.config_entries.writes,
+        "peak_rss_mib": rss_peak / 1024,
+        "rss_kib_per_pool": (rss_peak - rss_before) / pools,
+    }
+
+
+def measure(pools: int, args: argparse.Namespace) -> dict[str, Any]:
+    """Run one load level in a fresh interpreter."""
+    command = [
+        sys.executable, "-m", "benchmarks.load", "--single", str(pools),
+        "--policy", args.policy, "--hours", str(args.hours), "--speed", str(args.speed),
+        "--sensor-interval", str(args.sensor_interval), "--seed", str(args.seed),
+    ]
+    result = subprocess.run(command, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout)
+
+
+def main() -> None:
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pools", type=int, nargs="*", default=[1, 10, 100, 1000])
+    parser.add_argument("--policy", choices=SUPPORTED_POLICIES, default=POLICY_Q_LEARNING)
+    parser.add_argument("--hours", type=float, default=24.0, help="Simulated hours per run")
+    parser.add_argument("--speed", type=float, default=1440.0, help="Fake seconds per real second")
+    parser.add_argument("--sensor-interval", type=float, default=300.0, help="Fake seconds between sensor updates")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--single", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--json", action="store_true", help="Print raw JSON results")
+    args = parser.parse_args()
+
+    # Keep the integration's warnings out of the report
+    integration_logger = logging.getLogger("custom_components.solarpool_ai")
+    integration_logger.addHandler(logging.NullHandler())
+    integration_logger.propagate = False
+
+    if args.single is not None:
+        result = asyncio.run(
+            run_load(args.single, args.policy, args.hours, args.speed, args.sensor_interval, args.seed)
+        )
+        print(json.dumps(result))
+        return
+
+    results = []
+    for pools in args.pools:
+        results.append(measure(pools, args))
+        if not args.json:
+            print(f"{pools} pools done in {results[-1]['real_seconds']:.0f}s", file=sys.stderr, flush=True)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    header = (
+        f"{'pools':>6} {'lag ms':>7} {'p99 ms':>7} {'max ms':>7} {'cb/s':>8} "
+        f"{'services':>8} {'writes':>7} {'peak MiB':>8} {'KiB/pool':>8}"
+    )
+    print(f"Policy: {args.policy}, {args.hours:g} h at {args.speed:g}x, sensors every {args.sensor_interval:g} s")
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(
+            f"{r['pools']:>6} {r['lag_mean_ms']:>7.2f} {r['lag_p99_ms']:>7.2f} {r['lag_max_ms']:>7.1f} "
+            f"{r['callbacks_per_s']:>8.0f} {r['service_calls']:>8} {r['writes']:>7} "
+            f"{r['peak_rss_mib']:>8.1f} {r['rss_kib_per_pool']:>8.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
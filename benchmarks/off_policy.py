@@ -0,0 +1,94 @@
+"""Accuracy and speed of the off-policy estimators on simulated logs.
+
+Logs a season of cycles decided by the Q-learning agent, then evaluates
+many perturbed copies of its Q-table from the log alone and compares the
+estimates with their true expected reward on the simulator::
+
+    python3 -m benchmarks.off_policy --days 80 --candidates 200
+"""
+from __future__ import annotations
+
+import argparse
+import time
+
+import numpy as np
+
+from custom_components.solarpool_ai.const import RL_ACTIONS
+from custom_components.solarpool_ai.evaluation import evaluate, logged_cycles
+from custom_components.solarpool_ai.policy import Transition, calculate_reward
+from custom_components.solarpool_ai.rl_agent import RLAgent
+from custom_components.solarpool_ai.simulator import PoolSimulator
+
+from .harness import seeded_state
+
+
+def log_season(profile: str, days: int, seed: int) -> tuple[list[dict], RLAgent, np.ndarray]:
+    """Run the agent online and log its cycles like the coordinator does.
+
+    Returns:
+        (cycle records, trained agent, expected reward of every action per cycle)
+    """
+    sim = PoolSimulator(profile, seed=seed)
+    agent = RLAgent.from_dict(seeded_state(seed))
+    cycles = []
+    expected = []
+    for _ in range(days):
+        while not sim.done:
+            context = sim.context()
+            decision = agent.decide(context)
+            action = decision["action_index"]
+            expected.append(sim.expected_rewards())
+            reward = calculate_reward(sim.step(action), RL_ACTIONS[action])
+            agent.observe(Transition(context, action, reward))
+            cycles.append(
+                {
+                    "conditions": context,
+                    "action_index": action,
+                    "propensity": decision["propensity"],
+                    "reward": reward,
+                }
+            )
+        sim.reset_day()
+    return cycles, agent, np.array(expected)
+
+
+def main() -> None:
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--days", type=int, default=80)
+    parser.add_argument("--profile", default="temperate")
+    parser.add_argument("--candidates", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    cycles, agent, expected = log_season(args.profile, args.days, args.seed)
+    logged = logged_cycles(cycles)
+
+    # The learned table plus increasingly perturbed copies
+    rng = np.random.default_rng(args.seed)
+    scales = np.linspace(0.01, 0.5, args.candidates - 1)[:, None, None]
+    tables = np.concatenate(
+        [agent.q_table[None], agent.q_table + rng.normal(0, 1, (args.candidates - 1,) + agent.q_table.shape) * scales]
+    )
+
+    start = time.perf_counter()
+    estimate = evaluate(logged, tables)
+    elapsed = time.perf_counter() - start
+
+    greedy = np.argmax(tables[:, logged.states], axis=-1)
+    truth = np.take_along_axis(expected[None], greedy[..., None], axis=-1)[..., 0].mean(axis=1)
+
+    print(f"Profile: {args.profile}, cycles: {len(logged.rewards)}, candidates: {len(tables)}")
+    print(f"Evaluation time: {elapsed * 1000:.1f} ms ({elapsed / len(tables) * 1e6:.0f} µs per candidate)")
+    header = f"{'estimator':<14} {'MAE':>7} {'corr':>6}"
+    print(header)
+    print("-" * len(header))
+    for name in ("ips", "snips", "doubly_robust"):
+        values = getattr(estimate, name)
+        mae = float(np.abs(values - truth).mean())
+        corr = float(np.corrcoef(values, truth)[0, 1])
+        print(f"{name:<14} {mae:>7.4f} {corr:>6.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Compare decision policies on the simulator.
+
+Reports decision latency, memory and learning speed for every registered
+policy::
+
+    python3 -m benchmarks.policies --days 60 --profile temperate
+"""
+from __future__ import annotations
+
+import argparse
+import json
+
+from custom_components.solarpool_ai.const import SUPPORTED_POLICIES
+from custom_components.solarpool_ai.policy import create_policy
+
+from .harness import (
+    measure_latency,
+    measure_memory,
+    run_learning,
+    sample_contexts,
+    seeded_state,
+    summarize,
+)
+
+
+def benchmark_policy(name: str, profile: str, days: int, seeds: list[int]) -> dict:
+    """Run all measurements for one policy.
+
+    Learning metrics are averaged over the given seeds.
+    """
+    contexts = sample_contexts(profile=profile)
+    latency = measure_latency(create_policy(name), contexts)
+    memory = measure_memory(lambda: create_policy(name))
+
+    runs = [
+        summarize(run_learning(create_policy(name, seeded_state(seed)), profile, days, seed))
+        for seed in seeds
+    ]
+    converged = [r["cycles_to_convergence"] for r in runs if r["cycles_to_convergence"] is not None]
+    return {
+        "policy": name,
+        **latency,
+        **memory,
+        "mean_reward": sum(r["mean_reward"] for r in runs) / len(runs),
+        "total_regret": sum(r["total_regret"] for r in runs) / len(runs),
+        "final_regret": sum(r["final_regret"] for r in runs) / len(runs),
+        "converged_runs": f"{len(converged)}/{len(runs)}",
+        "cycles_to_convergence": sum(converged) / len(converged) if converged else None,
+    }
+
+
+def main() -> None:
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--days", type=int, default=60)
+    parser.add_argument("--profile", default="temperate")
+    parser.add_argument("--seeds", type=int, default=3)
+    parser.add_argument("--policies", nargs="*", default=list(SUPPORTED_POLICIES))
+    parser.add_argument("--json", action="store_true", help="Print raw JSON results")
+    args = parser.parse_args()
+
+    results = [
+        benchmark_policy(name, args.profile, args.days, list(range(args.seeds)))
+        for name in args.policies
+    ]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    header = f"{'policy':<12} {'decide µs':>10} {'batch µs':>9} {'peak KiB':>9} {'state B':>8} " \
+             f"{'reward':>7} {'regret':>8} {'final':>6} {'conv':>6}"
+    print(f"Profile: {args.profile}, days: {args.days}, seeds: {args.seeds}")
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        conv = "-" if r["cycles_to_convergence"] is None else f"{r['cycles_to_convergence']:.0f}"
+        print(
+            f"{r['policy']:<12} {r['decide_us']:>10.1f} {r['decide_batch_us']:>9.1f} "
+            f"{r['peak_kib']:>9.1f} {r['state_bytes']:>8d} {r['mean_reward']:>7.3f} "
+            f"{r['total_regret']:>8.1f} {r['final_regret']:>6.3f} {conv:>6}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Compare the learning targets of the tabular Q-learning agent.
+
+Runs the same seeds and climate profiles for every return mode (one-step,
+Double-Q, n-step) and reports cycles-to-convergence and regret, so the
+mode can be chosen on data::
+
+    python3 -m benchmarks.returns --days 40 --seeds 10
+"""
+from __future__ import annotations
+
+import argparse
+import json
+
+from custom_components.solarpool_ai.rl_agent import RETURN_MODES, RLAgent
+from custom_components.solarpool_ai.simulator import CLIMATE_PROFILES
+
+from .harness import run_learning, summarize
+
+
+def benchmark_mode(mode: str, profile: str, days: int, seeds: list[int], n_step: int | None = None) -> dict:
+    """Learning metrics of one return mode, averaged over the seeds."""
+    runs = [
+        summarize(
+            run_learning(
+                RLAgent(return_mode=mode, n_step=n_step, random_state={"seed": seed}), profile, days, seed
+            )
+        )
+        for seed in seeds
+    ]
+    converged = [r["cycles_to_convergence"] for r in runs if r["cycles_to_convergence"] is not None]
+    return {
+        "mode": mode,
+        "profile": profile,
+        "mean_reward": sum(r["mean_reward"] for r in runs) / len(runs),
+        "total_regret": sum(r["total_regret"] for r in runs) / len(runs),
+        "final_regret": sum(r["final_regret"] for r in runs) / len(runs),
+        "converged_runs": f"{len(converged)}/{len(runs)}",
+        "cycles_to_convergence": sum(converged) / len(converged) if converged else None,
+    }
+
+
+def main() -> None:
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--days", type=int, default=40)
+    parser.add_argument("--seeds", type=int, default=10)
+    parser.add_argument("--profiles", nargs="*", default=list(CLIMATE_PROFILES))
+    parser.add_argument("--modes", nargs="*", default=list(RETURN_MODES))
+    parser.add_argument("--n-step", type=int, default=None, help="Steps of the n_step return")
+    parser.add_argument("--json", action="store_true", help="Print raw JSON results")
+    args = parser.parse_args()
+
+    seeds = list(range(args.seeds))
+    results = [
+        benchmark_mode(mode, profile, args.days, seeds, args.n_step)
+        for profile in args.profiles
+        for mode in args.modes
+    ]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    header = f"{'profile':<10} {'mode':<9} {'reward':>7} {'regret':>8} {'final':>6} {'conv':>6} {'runs':>6}"
+    print(f"Days: {args.days}, seeds: {args.seeds}")
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        conv = "-" if r["cycles_to_convergence"] is None else f"{r['cycles_to_convergence']:.0f}"
+        print(
+            f"{r['profile']:<10} {r['mode']:<9} {r['mean_reward']:>7.3f} {r['total_regret']:>8.1f} "
+            f"{r['final_regret']:>6.3f} {conv:>6} {r['converged_runs']:>6}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""Measure the import and setup time of the integration.
+
+Every measurement runs in a fresh interpreter, so nothing is cached between
+them. "import" is the self time of the integration's own modules (from
+``python -X importtime``; Home Assistant itself is not counted), "setup" is
+building a policy, the thermal model and the explanation engine the way the
+coordinator does. The run fails (exit code 1) when a measurement exceeds its
+budget, or when NumPy is loaded by the import or by a policy that does not
+need it::
+
+    python3 -m benchmarks.startup --repeat 5
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import subprocess
+import sys
+
+from custom_components.solarpool_ai.const import (
+    POLICY_FROZEN,
+    POLICY_RULES,
+    SUPPORTED_POLICIES,
+)
+
+PACKAGE = "custom_components.solarpool_ai"
+
+# Policies that must start without NumPy
+NUMPY_FREE_POLICIES = (POLICY_RULES, POLICY_FROZEN)
+
+# Budgets in milliseconds (best of --repeat runs)
+IMPORT_BUDGET_MS = 60.0
+SETUP_BUDGET_MS = 10.0  # Policies without NumPy
+LEARNING_SETUP_BUDGET_MS = 300.0  # Includes importing NumPy
+
+_SETUP_SCRIPT = """
+import json, sys, time
+import {package}
+start = time.perf_counter()
+from {package}.policy import create_policy
+from {package}.thermal_model import ThermalModel
+from {package}.explanation_templates import ExplanationEngine
+create_policy({policy!r})
+ThermalModel.from_dict(None)
+ExplanationEngine("en")
+elapsed = time.perf_counter() - start
+print(json.dumps({{"ms": elapsed * 1000, "numpy": "numpy" in sys.modules}}))
+"""
+
+_IMPORT_SCRIPT = """
+import json, sys
+import {package}
+print(json.dumps({{"numpy": "numpy" in sys.modules}}))
+"""
+
+
+def _run(script: str, *flags: str) -> subprocess.CompletedProcess:
+    """Run a script in a fresh interpreter."""
+    return subprocess.run(
+        [sys.executable, *flags, "-c", script], capture_output=True, text=True, check=True
+    )
+
+
+def measure_import() -> dict[str, float | bool]:
+    """Self time (ms) of the integration's modules in one fresh import."""
+    result = _run(_IMPORT_SCRIPT.format(package=PACKAGE), "-X", "importtime")
+    total_us = 0
+    for line in result.stderr.splitlines():
+        # "import time:  self [us] | cumulative | imported package"
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if fields[-1].strip().startswith(PACKAGE) and fields[0].strip().isdigit():
+            total_us += int(fields[0])
+    return {"ms": total_us / 1000, "numpy": json.loads(result.stdout)["numpy"]}
+
+
+def measure_setup(policy: str) -> dict[str, float | bool]:
+    """Time (ms) to build one policy and its companions after the import."""
+    return json.loads(_run(_SETUP_SCRIPT.format(package=PACKAGE, policy=policy)).stdout)
+
+
+def best_of(measure, repeat: int) -> dict[str, float | bool]:
+    """Fastest of ``repeat`` measurements."""
+    return min((measure() for _ in range(repeat)), key=lambda result: result["ms"])
+
+
+def check(name: str, result: dict[str, float | bool], budget: float, numpy_allowed: bool) -> list[str]:
+    """Budget violations of one measurement."""
+    failures = []
+    if result["ms"] > budget:
+        failures.append(f"{name}: {result['ms']:.1f} ms > budget {budget:.0f} ms")
+    if result["numpy"] and not numpy_allowed:
+        failures.append(f"{name}: imported NumPy")
+    return failures
+
+
+def main() -> None:
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--policies", nargs="*", default=list(SUPPORTED_POLICIES))
+    parser.add_argument("--import-budget", type=float, default=IMPORT_BUDGET_MS)
+    parser.add_argument("--setup-budget", type=float, default=SETUP_BUDGET_MS)
+    parser.add_argument("--learning-setup-budget", type=float, default=LEARNING_SETUP_BUDGET_MS)
+    parser.add_argument("--json", action="store_true", help="Print raw JSON results")
+    args = parser.parse_args()
+
+    results = {"import": best_of(measure_import, args.repeat)}
+    failures = check("import", results["import"], args.import_budget, numpy_allowed=False)
+    for policy in args.policies:
+        result = best_of(lambda: measure_setup(policy), args.repeat)
+        results[f"setup_{policy}"] = result
+        numpy_free = policy in NUMPY_FREE_POLICIES
+        budget = args.setup_budget if numpy_free else args.learning_setup_budget
+        failures += check(f"setup {policy}", result, budget, numpy_allowed=not numpy_free)
+
+    if args.json:
+        print(json.dumps({"results": results, "failures": failures}, indent=2))
+    else:
+        print(f"{'measurement':<20} {'ms':>8} {'numpy':>6}")
+        print("-" * 36)
+        for name, result in results.items():
+            print(f"{name:<20} {result['ms']:>8.1f} {'yes' if result['numpy'] else 'no':>6}")
+        for failure in failures:
+            print(f"FAIL {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+"""Hyperparameter sweep of a learning policy on the simulator.
+
+Fans grid or random-search configurations out over all cores with a
+ProcessPoolExecutor. Every (configuration, climate profile) pair is one task
+that learns a full simulated season per seed; results are appended to a
+single JSON Lines file as they finish, followed by the best configuration
+of each profile::
+
+    python3 -m benchmarks.sweep --search random --samples 64 --days 40
+    python3 -m benchmarks.sweep --search grid --space space.json
+
+Configurations are ranked by total regret, which is always measured with the
+default reward: the reward constants being swept only change what the policy
+learns from, not how it is scored.
+"""
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import partial
+from typing import Any
+
+import numpy as np
+
+from custom_components.solarpool_ai.const import POLICY_Q_LEARNING, SUPPORTED_POLICIES
+from custom_components.solarpool_ai.policy import calculate_reward, create_policy
+from custom_components.solarpool_ai.simulator import CLIMATE_PROFILES
+
+from .harness import run_learning, seeded_state, summarize
+
+# Swept name -> policy class attribute it overrides
+AGENT_PARAMETERS = {
+    "alpha": "ALPHA",
+    "min_alpha": "MIN_ALPHA",
+    "lr_decay": "LR_DECAY",
+    "gamma": "GAMMA",
+    "warmup_episodes": "WARMUP_EPISODES",
+    "initial_exploration": "INITIAL_EXPLORATION",
+    "min_exploration": "MIN_EXPLORATION",
+}
+# Swept names passed to calculate_reward
+REWARD_PARAMETERS = ("pump_cost_per_hour", "efficiency_bonus")
+
+# Default search space (values around the shipped defaults). The tabular
+# agent learns with max(MIN_ALPHA, 1/n^LR_DECAY); ALPHA only matters for the
+# backends without visit counts, so it is left out here.
+SEARCH_SPACE: dict[str, list[Any]] = {
+    "min_alpha": [0.05, 0.1, 0.2, 0.3],
+    "gamma": [0.0, 0.5, 0.9],
+    "warmup_episodes": [20, 50, 100],
+    "initial_exploration": [0.2, 0.3, 0.5],
+    "min_exploration": [0.02, 0.05, 0.1],
+    "pump_cost_per_hour": [0.05, 0.1, 0.2],
+    "efficiency_bonus": [0.0, 0.25, 0.5],
+}
+
+
+def grid_configs(space: dict[str, list[Any]]) -> list[dict[str, Any]]:
+    """Every combination of the search space."""
+    names = list(space)
+    return [dict(zip(names, values)) for values in itertools.product(*(space[name] for name in names))]
+
+
+def random_configs(space: dict[str, list[Any]], samples: int, seed: int = 0) -> list[dict[str, Any]]:
+    """Distinct configurations drawn uniformly from the search space.
+
+    Returns the whole grid when it has no more than ``samples`` points.
+    """
+    total = int(np.prod([len(values) for values in space.values()]))
+    if total <= samples:
+        return grid_configs(space)
+    rng = np.random.default_rng(seed)
+    configs: dict[str, dict[str, Any]] = {}
+    while len(configs) < samples:
+        config = {name: values[int(rng.integers(len(values)))] for name, values in space.items()}
+        configs.setdefault(json.dumps(config, sort_keys=True), config)
+    return list(configs.values())
+
+
+def evaluate_config(
+    config_id: int,
+    config: dict[str, Any],
+    policy_name: str,
+    profile: str,
+    days: int,
+    seeds: list[int],
+) -> dict[str, Any]:
+    """Learning metrics of one configuration on one profile (runs in a worker).
+
+    Args:
+        config_id: Index of the configuration in the sweep
+        config: Swept parameter values (see AGENT_PARAMETERS, REWARD_PARAMETERS)
+        policy_name: Registered policy to tune
+        profile: Climate profile name
+        days: Simulated days per season
+        seeds: One season is learned per seed
+
+    Returns:
+        Metrics averaged over the seeds
+    """
+    start = time.perf_counter()
+    reward_fn = partial(
+        calculate_reward, **{name: config[name] for name in REWARD_PARAMETERS if name in config}
+    )
+    runs = []
+    for seed in seeds:
+        policy = create_policy(policy_name, seeded_state(seed))
+        for name, attribute in AGENT_PARAMETERS.items():
+            if name in config:
+                if not hasattr(policy, attribute):
+                    raise ValueError(f"{policy_name} has no {attribute} to sweep")
+                setattr(policy, attribute, config[name])
+        runs.append(summarize(run_learning(policy, profile, days, seed, reward_fn=reward_fn)))
+
+    converged = [r["cycles_to_convergence"] for r in runs if r["cycles_to_convergence"] is not None]
+    return {
+        "type": "result",
+        "config_id": config_id,
+        "profile": profile,
+        "config": config,
+        "total_regret": sum(r["total_regret"] for r in runs) / len(runs),
+        "final_regret": sum(r["final_regret"] for r in runs) / len(runs),
+        "converged_runs": f"{len(converged)}/{len(runs)}",
+        "cycles_to_convergence": sum(converged) / len(converged) if converged else None,
+        "seconds": round(time.perf_counter() - start, 2),
+    }
+
+
+def best_per_profile(results: list[dict[str, Any]]) -> dict[str, dict[str, Any]]:
+    """Lowest total regret (then final regret) of each profile."""
+    best: dict[str, dict[str, Any]] = {}
+    for result in results:
+        current = best.get(result["profile"])
+        key = (result["total_regret"], result["final_regret"])
+        if current is None or key < (current["total_regret"], current["final_regret"]):
+            best[result["profile"]] = result
+    return best
+
+
+def run_sweep(
+    configs: list[dict[str, Any]],
+    profiles: list[str],
+    output: str,
+    policy_name: str = POLICY_Q_LEARNING,
+    days: int = 40,
+    seeds: int = 5,
+    workers: int | None = None,
+) -> dict[str, dict[str, Any]]:
+    """Evaluate every configuration on every profile in parallel.
+
+    Each finished task is written to ``output`` (JSON Lines) immediately, so
+    a long sweep can be followed with ``tail -f`` and partial results survive
+    an interruption. The best configuration of each profile is appended as a
+    ``"type": "best"`` record at the end.
+
+    Returns:
+        Best result per profile
+    """
+    seed_list = list(range(seeds))
+    results = []
+    with open(output, "w", encoding="utf-8") as results_file, ProcessPoolExecutor(
+        max_workers=workers or os.cpu_count()
+    ) as executor:
+        futures = [
+            executor.submit(evaluate_config, config_id, config, policy_name, profile, days, seed_list)
+            for config_id, config in enumerate(configs)
+            for profile in profiles
+        ]
+        for done, future in enumerate(as_completed(futures), start=1):
+            result = future.result()
+            results.append(result)
+            results_file.write(json.dumps(result) + "\n")
+            results_file.flush()
+            print(
+                f"[{done}/{len(futures)}] config {result['config_id']} {result['profile']}: "
+                f"regret {result['total_regret']:.1f} ({result['seconds']:.1f}s)",
+                flush=True,
+            )
+
+        best = best_per_profile(results)
+        for profile in profiles:
+            results_file.write(json.dumps({**best[profile], "type": "best"}) + "\n")
+    return best
+
+
+def main() -> None:
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--search", choices=["grid", "random"], default="random")
+    parser.add_argument("--samples", type=int, default=32, help="Configurations of a random search")
+    parser.add_argument("--space", help="JSON file with {parameter: [values]} (default SEARCH_SPACE)")
+    parser.add_argument("--policy", choices=SUPPORTED_POLICIES, default=POLICY_Q_LEARNING)
+    parser.add_argument("--days", type=int, default=40)
+    parser.add_argument("--seeds", type=int, default=5)
+    parser.add_argument("--profiles", nargs="*", default=list(CLIMATE_PROFILES))
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the random search")
+    parser.add_argument("--output", default="sweep_results.jsonl")
+    parser.add_argument("--json", action="store_true", help="Print the best configurations as JSON")
+    args = parser.parse_args()
+
+    space = SEARCH_SPACE
+    if args.space:
+        with open(args.space, encoding="utf-8") as space_file:
+            space = json.load(space_file)
+    unknown = set(space) - set(AGENT_PARAMETERS) - set(REWARD_PARAMETERS)
+    if unknown:
+        parser.error(f"Unknown parameters: {', '.join(sorted(unknown))}")
+
+    configs = grid_configs(space) if args.search == "grid" else random_configs(space, args.samples, args.seed)
+    print(f"{len(configs)} configurations x {len(args.profiles)} profiles, {args.seeds} seeds, {args.days} days")
+    best = run_sweep(configs, args.profiles, args.output, args.policy, args.days, args.seeds, args.workers)
+
+    if args.json:
+        print(json.dumps(best, indent=2))
+        return
+
+    print(f"Results: {args.output}")
+    for profile, result in best.items():
+        conv = "-" if result["cycles_to_convergence"] is None else f"{result['cycles_to_convergence']:.0f}"
+        print(
+            f"{profile:<10} regret {result['total_regret']:>8.1f}  final {result['final_regret']:.3f}  "
+            f"conv {conv:>5}  {result['converged_runs']}"
+        )
+        print(f"{'':<10} {json.dumps(result['config'])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,11 +7,18 @@ from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import Platform
 from homeassistant.core import HomeAssistant
 
-from .const import DOMAIN, CONF_SCAN_INTERVAL
+from .const import DOMAIN, CONF_POLICY
 from .coordinator import SolarPoolCoordinator
+from .fleet import DATA_FLEET, FleetAggregator
+from .policy import get_policy_class
+from .services import async_setup_services
+from .settings import SolarPoolSettings
 
 _LOGGER = logging.getLogger(__name__)
 
+# hass.data key marking the metrics view as registered (views cannot be removed)
+_METRICS_VIEW = f"{DOMAIN}_metrics_view"
+
 # NUMBER is kept for backwards compatibility (no entities created)
 PLATFORMS: list[Platform] = [
     Platform.SENSOR,
@@ -22,6 +29,8 @@ PLATFORMS: list[Platform] = [
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up SolarPool AI from a config entry."""
+    # Learning backends import NumPy: load the selected one off the event loop
+    await hass.async_add_executor_job(get_policy_class, SolarPoolSettings.from_entry(hass, entry).policy)
     coordinator = SolarPoolCoordinator(hass, entry)
     
     # Store the coordinator for platforms to use
@@ -36,24 +45,44 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     # Register update listener for options changes
     entry.async_on_unload(entry.add_update_listener(update_listener))
 
+    async_setup_services(hass)
+
+    fleet: FleetAggregator | None = hass.data.get(DATA_FLEET)
+    if fleet is None:
+        fleet = hass.data[DATA_FLEET] = FleetAggregator(hass)
+        fleet.async_start()
+    fleet.async_join(coordinator)
+
+    if not hass.data.get(_METRICS_VIEW):
+        # Imported here: the http component is only needed once an entry is set up
+        from .views import SolarPoolMetricsView
+
+        hass.http.register_view(SolarPoolMetricsView())
+        hass.data[_METRICS_VIEW] = True
+
     return True
 
 async def update_listener(hass: HomeAssistant, entry: ConfigEntry) -> None:
     """Handle options update."""
-    coordinator = hass.data[DOMAIN][entry.entry_id]
-    
-    # Update coordinator parameters from options
-    if CONF_SCAN_INTERVAL in entry.options:
-        coordinator.async_update_interval(entry.options[CONF_SCAN_INTERVAL])
+    coordinator: SolarPoolCoordinator = hass.data[DOMAIN][entry.entry_id]
+
+    policy = entry.options.get(CONF_POLICY)
+    if policy and policy != coordinator.policy.name:
+        await hass.async_add_executor_job(get_policy_class, policy)
     
-    # Reinitialize AI client if API keys or model changed
-    if hasattr(coordinator, '_init_ai_client'):
-        coordinator._init_ai_client()
-        _LOGGER.info("AI client reinitialized after options update")
+    # Rebuild the resolved settings (no-op for data-only updates)
+    was_sharing = coordinator.settings.fleet_sharing
+    coordinator.async_apply_settings()
+    if coordinator.settings.fleet_sharing and not was_sharing and (fleet := hass.data.get(DATA_FLEET)):
+        fleet.async_join(coordinator)
 
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
     if unload_ok := await hass.config_entries.async_unload_platforms(entry, PLATFORMS):
-        hass.data[DOMAIN].pop(entry.entry_id)
+        coordinator: SolarPoolCoordinator = hass.data[DOMAIN].pop(entry.entry_id)
+        # Timers, outcome measurement, loop monitor thread; also writes buffered traces
+        await coordinator.stop()
+        if not hass.data[DOMAIN] and (fleet := hass.data.pop(DATA_FLEET, None)):
+            fleet.async_stop()
 
     return unload_ok
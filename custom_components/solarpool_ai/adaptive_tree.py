@@ -0,0 +1,304 @@
+"""Adaptive-resolution Q-function backend for the SolarPool AI agent.
+
+The fixed bins of RLAgent spread 144 cells over the whole context space, but
+in a given climate most cycles land in a handful of them. Here the state
+space is a binary tree over the raw context readings that starts as a single
+cell and splits a leaf only when it has been visited often and the returns
+observed in it vary a lot for the same action. Resolution goes where the data
+is, and Q-values are stored only for the current leaves.
+"""
+from __future__ import annotations
+
+import logging
+from typing import Any
+
+import numpy as np
+
+from .const import POLICY_Q_TREE
+from .features import RAW_COLUMNS, RAW_HIGH, RAW_LOW, raw_columns
+from .rl_agent import RLAgent
+
+_LOGGER = logging.getLogger(__name__)
+
+# Marks a leaf in the node arrays
+_LEAF = -1
+
+
+class AdaptiveTreeAgent(RLAgent):
+    """Q-learning agent over an adaptively split state space.
+
+    Same get_action/update/to_dict API as RLAgent. The tree is kept in flat
+    node arrays (feature, threshold, left, right) so a lookup is a short
+    descent, vectorized level by level for batches. Each leaf accumulates,
+    per action, the count/sum/sum of squares of its TD targets on both sides
+    of its midpoint along every dimension; that is enough to know how much a
+    split would reduce the variance without storing any samples.
+    """
+
+    name = POLICY_Q_TREE
+
+    # Leaves start coarse and are re-seeded on every split, so values must
+    # track their targets quickly (tuned on benchmarks.policies)
+    ALPHA = 0.5
+    # A leaf is considered for a split after this many updates
+    SPLIT_MIN_VISITS = 15
+    # ... if its within-action variance of the targets is at least this
+    SPLIT_MIN_VARIANCE = 0.01
+    # ... and the best split removes at least this share of the squared error
+    SPLIT_MIN_GAIN = 0.02
+    # Samples of an action on one side needed to seed a child's value from them
+    SPLIT_MIN_SAMPLES = 3
+    # Limits on the tree size
+    MAX_DEPTH = 10
+    MAX_LEAVES = 256
+
+    def __init__(
+        self,
+        tree: dict[str, list] | None = None,
+        values: dict[str, list[float]] | None = None,
+        episode_count: int = 0,
+        visit_counts: list[list[int]] | None = None,
+        random_state: dict[str, Any] | None = None,
+        rng: np.random.Generator | None = None,
+        pending: dict[str, Any] | None = None,
+    ) -> None:
+        """Initialize the agent.
+
+        Args:
+            tree: Node arrays from to_dict ({"feature", "threshold", "left", "right"})
+            values: Q-values per leaf node (keys are node ids as strings)
+            episode_count: Number of episodes already completed
+            visit_counts: Updates per discrete (state, action), for exploration
+            random_state: Persisted seed and generator state (optional)
+            rng: Generator to draw from instead of one seeded from random_state
+            pending: Persisted transition still waiting for its successor
+        """
+        super().__init__(
+            q_table=None,
+            episode_count=episode_count,
+            visit_counts=visit_counts,
+            random_state=random_state,
+            rng=rng,
+            pending=pending,
+        )
+        self.q_table = None  # Not used by this backend
+
+        self.feature: list[int] = [_LEAF]
+        self.threshold: list[float] = [0.0]
+        self.left: list[int] = [_LEAF]
+        self.right: list[int] = [_LEAF]
+        self.values: dict[int, np.ndarray] = {0: self.random.generator.uniform(0, self.INIT_Q_MAX, self.num_actions)}
+
+        if tree:
+            try:
+                self._load(tree, values or {})
+            except (KeyError, ValueError, TypeError, IndexError) as err:
+                _LOGGER.warning("Tree agent: stored tree is invalid (%s). Resetting.", err)
+                self.feature, self.threshold, self.left, self.right = [_LEAF], [0.0], [_LEAF], [_LEAF]
+                self.values = {0: self.random.generator.uniform(0, self.INIT_Q_MAX, self.num_actions)}
+
+        # Split statistics per leaf: (count, sum, sum of squares) x dim x side x action.
+        # Not persisted: after a restart leaves simply accumulate them again.
+        self._stats: dict[int, np.ndarray] = {}
+        self._rebuild_index()
+
+    def _load(self, tree: dict[str, list], values: dict[str, list[float]]) -> None:
+        """Restore node arrays and leaf values, validating their consistency."""
+        feature = [int(f) for f in tree["feature"]]
+        threshold = [float(t) for t in tree["threshold"]]
+        left = [int(i) for i in tree["left"]]
+        right = [int(i) for i in tree["right"]]
+        size = len(feature)
+        if not size or not len(threshold) == len(left) == len(right) == size:
+            raise ValueError("node arrays differ in length")
+
+        leaves = {node for node in range(size) if feature[node] == _LEAF}
+        loaded = {int(node): np.array(row, dtype=float) for node, row in values.items()}
+        if set(loaded) != leaves or any(row.shape != (self.num_actions,) for row in loaded.values()):
+            raise ValueError("leaf values do not match the tree")
+        # Children are always appended after their parent, which also rules out cycles
+        for node in range(size):
+            if feature[node] != _LEAF and not (
+                0 <= feature[node] < len(RAW_COLUMNS) and node < left[node] < size and node < right[node] < size
+            ):
+                raise ValueError(f"bad node {node}")
+
+        self.feature, self.threshold, self.left, self.right = feature, threshold, left, right
+        self.values = loaded
+
+    def _rebuild_index(self) -> None:
+        """Recompute the NumPy node arrays, leaf boxes and depths after a change."""
+        self._feature_arr = np.array(self.feature, dtype=np.int64)
+        self._threshold_arr = np.array(self.threshold)
+        self._left_arr = np.array(self.left, dtype=np.int64)
+        self._right_arr = np.array(self.right, dtype=np.int64)
+
+        # Bounding box and depth of every leaf, walking down from the root
+        self._boxes: dict[int, tuple[np.ndarray, np.ndarray]] = {}
+        self._depths: dict[int, int] = {}
+        pending = [(0, RAW_LOW.copy(), RAW_HIGH.copy(), 0)]
+        while pending:
+            node, low, high, depth = pending.pop()
+            dim = self.feature[node]
+            if dim == _LEAF:
+                self._boxes[node] = (low, high)
+                self._depths[node] = depth
+                continue
+            left_high = high.copy()
+            left_high[dim] = self.threshold[node]
+            right_low = low.copy()
+            right_low[dim] = self.threshold[node]
+            pending.append((self.left[node], low, left_high, depth + 1))
+            pending.append((self.right[node], right_low, high, depth + 1))
+        self._max_depth = max(self._depths.values())
+
+    @property
+    def num_leaves(self) -> int:
+        """Number of cells the state space is currently split into."""
+        return len(self.values)
+
+    def _leaf(self, point: np.ndarray) -> int:
+        """Descend the tree for a single point."""
+        node = 0
+        feature, threshold = self.feature, self.threshold
+        while feature[node] != _LEAF:
+            node = self.left[node] if point[feature[node]] < threshold[node] else self.right[node]
+        return node
+
+    def _leaves(self, points: np.ndarray) -> np.ndarray:
+        """Descend the tree for many points at once (one NumPy step per level)."""
+        nodes = np.zeros(len(points), dtype=np.int64)
+        rows = np.arange(len(points))
+        for _ in range(self._max_depth):
+            dims = self._feature_arr[nodes]
+            inner = dims != _LEAF
+            if not inner.any():
+                break
+            go_left = points[rows, np.maximum(dims, 0)] < self._threshold_arr[nodes]
+            children = np.where(go_left, self._left_arr[nodes], self._right_arr[nodes])
+            nodes = np.where(inner, children, nodes)
+        return nodes
+
+    def _encode(self, context: dict[str, Any], state_index: int) -> np.ndarray:
+        """Raw readings of a single context (the leaf is resolved on lookup)."""
+        return self._encode_batch([context], None)[0]
+
+    def _encode_batch(self, contexts: list[dict[str, Any]], state_indices: np.ndarray | None) -> np.ndarray:
+        """Raw readings of many contexts, clipped to the tree's root box."""
+        return np.clip(raw_columns(contexts), RAW_LOW, RAW_HIGH)
+
+    def _q(self, state: np.ndarray) -> np.ndarray:
+        """Q-values of the leaf (or leaves) containing the point(s)."""
+        if state.ndim == 1:
+            return self.values[self._leaf(state)]
+        return np.array([self.values[leaf] for leaf in self._leaves(state).tolist()])
+
+    def _td_update(self, state: np.ndarray, action: int, target: float) -> tuple[float, float]:
+        """Update the leaf containing the point and split it if warranted."""
+        leaf = self._leaf(state)
+        q_values = self.values[leaf]
+        old_q = float(q_values[action])
+        new_q = old_q + self.ALPHA * (target - old_q)
+        q_values[action] = new_q
+
+        self._record(leaf, state, action, target)
+        return old_q, new_q
+
+    def _record(self, leaf: int, point: np.ndarray, action: int, target: float) -> None:
+        """Accumulate split statistics for a leaf and split it when they justify it."""
+        stats = self._stats.get(leaf)
+        if stats is None:
+            stats = self._stats[leaf] = np.zeros((3, len(RAW_COLUMNS), 2, self.num_actions))
+        low, high = self._boxes[leaf]
+        dims = np.arange(len(RAW_COLUMNS))
+        sides = (point >= (low + high) / 2).astype(np.int64)
+        stats[0, dims, sides, action] += 1
+        stats[1, dims, sides, action] += target
+        stats[2, dims, sides, action] += target * target
+
+        visits = int(stats[0, 0].sum())
+        if (
+            visits >= self.SPLIT_MIN_VISITS
+            and self._depths[leaf] < self.MAX_DEPTH
+            and len(self.values) < self.MAX_LEAVES
+        ):
+            self._maybe_split(leaf, visits)
+
+    @staticmethod
+    def _squared_error(count: np.ndarray, total: np.ndarray, squares: np.ndarray) -> np.ndarray:
+        """Sum of squared deviations from the mean, from running sums."""
+        mean_sq = np.divide(total * total, count, out=np.zeros_like(total), where=count > 0)
+        return np.maximum(squares - mean_sq, 0.0)
+
+    def _maybe_split(self, leaf: int, visits: int) -> None:
+        """Split a leaf at its midpoint along the dimension that explains most variance."""
+        count, total, squares = self._stats[leaf]  # each (dims, side, action)
+
+        # Within-action error of the whole leaf (identical for every dim, take the first)
+        parent_error = float(self._squared_error(
+            count[0].sum(axis=0), total[0].sum(axis=0), squares[0].sum(axis=0)
+        ).sum())
+        variance = parent_error / visits
+        if variance < self.SPLIT_MIN_VARIANCE:
+            return
+
+        child_error = self._squared_error(count, total, squares).sum(axis=(1, 2))  # (dims,)
+        gains = parent_error - child_error
+        # A split that leaves one side empty only moves the leaf, it does not refine it
+        gains[(count.sum(axis=2) == 0).any(axis=1)] = 0.0
+        dim = int(np.argmax(gains))
+        if gains[dim] < self.SPLIT_MIN_GAIN * parent_error:
+            return
+
+        low, high = self._boxes[leaf]
+        threshold = float((low[dim] + high[dim]) / 2)
+        left, right = len(self.feature), len(self.feature) + 1
+        self.feature[leaf], self.threshold[leaf] = dim, threshold
+        self.left[leaf], self.right[leaf] = left, right
+        self.feature += [_LEAF, _LEAF]
+        self.threshold += [0.0, 0.0]
+        self.left += [_LEAF, _LEAF]
+        self.right += [_LEAF, _LEAF]
+
+        # Children start from the mean target seen on their side of the split,
+        # falling back to the parent's estimate for actions rarely tried there
+        parent_values = self.values.pop(leaf)
+        for child, side in ((left, 0), (right, 1)):
+            seen = count[dim, side] >= self.SPLIT_MIN_SAMPLES
+            means = np.divide(total[dim, side], count[dim, side], out=parent_values.copy(), where=seen)
+            self.values[child] = means
+        del self._stats[leaf]
+        self._rebuild_index()
+
+        _LOGGER.debug(
+            "Árbol: hoja %d dividida por %s < %.2f (visitas=%d, varianza=%.3f, hojas=%d)",
+            leaf, RAW_COLUMNS[dim], threshold, visits, variance, len(self.values),
+        )
+
+    def to_dict(self) -> dict[str, Any]:
+        """Export agent state for persistence (tree plus the values of its leaves)."""
+        return {
+            "tree": {
+                "feature": list(self.feature),
+                "threshold": list(self.threshold),
+                "left": list(self.left),
+                "right": list(self.right),
+            },
+            "values": {str(leaf): np.round(row, 5).tolist() for leaf, row in self.values.items()},
+            "visit_counts": self.visit_counts.tolist(),
+            "episode_count": self.episode_count,
+            "random": self.random.to_dict(),
+            **self._unlearned_to_dict(),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "AdaptiveTreeAgent":
+        """Create agent from persisted state."""
+        return cls(
+            tree=data.get("tree"),
+            values=data.get("values"),
+            episode_count=data.get("episode_count", 0),
+            visit_counts=data.get("visit_counts"),
+            random_state=data.get("random"),
+            pending=data.get("pending"),
+        )
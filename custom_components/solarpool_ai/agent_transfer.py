@@ -0,0 +1,128 @@
+"""Compact binary files of a trained Q-learning agent, to move it between pools.
+
+Layout (little endian)::
+
+    magic "SPQA" | version u16 | num_states u16 | num_actions u16 | metadata length u32
+    metadata (UTF-8 JSON: episode count, source entry, export time...)
+    Q-table    float32[num_states * num_actions]
+    visits     uint32[num_states * num_actions]
+    CRC32 u32 of everything above
+
+A 144 × 5 agent takes about 6 KB, against ~20 KB of JSON in the config entry.
+Reading checks the magic, version, checksum and that the shape matches
+``RLAgent.num_states`` × ``RLAgent.num_actions``, so a truncated file or one
+from an incompatible state space is rejected before it touches a policy.
+
+Encoding and file access are blocking: the services run them in the executor.
+NumPy is only imported when a file is encoded or decoded.
+"""
+from __future__ import annotations
+
+import json
+import struct
+import zlib
+from pathlib import Path
+from typing import Any
+
+MAGIC = b"SPQA"
+FORMAT_VERSION = 1
+FILE_SUFFIX = ".spqa"
+
+_HEADER = struct.Struct("<4sHHHI")
+_CHECKSUM = struct.Struct("<I")
+
+
+class AgentFileError(ValueError):
+    """The file is not a valid agent file for this state space."""
+
+
+def encode_agent(state: dict[str, Any], metadata: dict[str, Any]) -> bytes:
+    """Binary file contents of a Q-learning state.
+
+    Args:
+        state: Output of ``RLAgent.to_dict()`` (q_table, visit_counts, episode_count)
+        metadata: Extra JSON-serializable fields stored with it
+
+    Returns:
+        The file contents
+    """
+    import numpy as np
+
+    q_table = np.asarray(state["q_table"], dtype="<f4")
+    visits = np.asarray(state.get("visit_counts", np.zeros(q_table.shape)), dtype="<u4")
+    if q_table.ndim != 2 or visits.shape != q_table.shape:
+        raise AgentFileError(f"Q-table {q_table.shape} and visit counts {visits.shape} do not match")
+    meta = json.dumps(
+        {**metadata, "episode_count": int(state.get("episode_count", 0))}, separators=(",", ":")
+    ).encode()
+    body = b"".join(
+        (_HEADER.pack(MAGIC, FORMAT_VERSION, *q_table.shape, len(meta)), meta, q_table.tobytes(), visits.tobytes())
+    )
+    return body + _CHECKSUM.pack(zlib.crc32(body))
+
+
+def decode_agent(data: bytes, num_states: int, num_actions: int) -> tuple[dict[str, Any], dict[str, Any]]:
+    """Metadata and Q-learning state of a binary agent file.
+
+    Args:
+        data: File contents
+        num_states: Expected number of states (``RLAgent.num_states``)
+        num_actions: Expected number of actions (``RLAgent.num_actions``)
+
+    Returns:
+        The metadata and a state for ``RLAgent.from_dict``
+
+    Raises:
+        AgentFileError: Bad magic, version, checksum, size or shape
+    """
+    import numpy as np
+
+    if len(data) < _HEADER.size + _CHECKSUM.size or data[:4] != MAGIC:
+        raise AgentFileError("Not a SolarPool AI agent file")
+    body, (checksum,) = data[: -_CHECKSUM.size], _CHECKSUM.unpack(data[-_CHECKSUM.size :])
+    if zlib.crc32(body) != checksum:
+        raise AgentFileError("Checksum mismatch, the file is corrupted")
+    _, version, states, actions, meta_length = _HEADER.unpack_from(body)
+    if version != FORMAT_VERSION:
+        raise AgentFileError(f"Unsupported agent file version {version}")
+    if (states, actions) != (num_states, num_actions):
+        raise AgentFileError(f"Agent has {states} × {actions} Q-values, expected {num_states} × {num_actions}")
+    cells = states * actions
+    offset = _HEADER.size + meta_length
+    if len(body) != offset + cells * 8:
+        raise AgentFileError("Truncated agent file")
+
+    metadata = json.loads(body[_HEADER.size : offset])
+    q_table = np.frombuffer(body, dtype="<f4", count=cells, offset=offset).reshape(states, actions)
+    visits = np.frombuffer(body, dtype="<u4", count=cells, offset=offset + cells * 4).reshape(states, actions)
+    state = {
+        "q_table": q_table.astype(float).tolist(),
+        "visit_counts": visits.astype(int).tolist(),
+        "episode_count": int(metadata.get("episode_count", 0)),
+    }
+    return metadata, state
+
+
+def write_agent_files(agents: list[tuple[str | Path, dict[str, Any], dict[str, Any]]]) -> list[str]:
+    """Write several agent files (blocking).
+
+    Args:
+        agents: (path, state, metadata) per file
+
+    Returns:
+        The paths written
+    """
+    written = []
+    for path, state, metadata in agents:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = path.with_name(f"{path.name}.tmp")
+        temporary.write_bytes(encode_agent(state, metadata))
+        temporary.replace(path)
+        written.append(str(path))
+    return written
+
+
+def read_agent_file(path: str | Path, num_states: int, num_actions: int) -> tuple[dict[str, Any], dict[str, Any]]:
+    """Read and validate an agent file (blocking, see ``decode_agent``)."""
+    return decode_agent(Path(path).read_bytes(), num_states, num_actions)
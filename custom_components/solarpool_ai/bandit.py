@@ -0,0 +1,334 @@
+"""Contextual bandit policies for SolarPool AI.
+
+A cycle's reward is measured right after its own heating window, so a bandit
+(no bootstrapping from the next state) is a natural fit for the problem.
+"""
+from __future__ import annotations
+
+import logging
+from typing import Any
+
+import numpy as np
+
+from .const import RL_ACTIONS, DEFAULT_RL_WARMUP_EPISODES, POLICY_BANDIT, POLICY_LINUCB
+from .features import NUM_FEATURES, context_matrix
+from .policy import (
+    BOOTSTRAP_EPISODES,
+    Transition,
+    epsilon_greedy_propensity,
+    exploration_schedule,
+    make_decision,
+)
+from .randomness import SeededRandom
+from .rl_agent import RLAgent
+from .rules import rule_based_action
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class ContextualBanditPolicy:
+    """Epsilon-greedy contextual bandit over the discretized RLAgent states.
+
+    Keeps the incremental mean reward of every (state, action) pair and the
+    number of times it was observed. Uses the same bootstrap rules and
+    exploration schedule as the Q-learning agent.
+    """
+
+    name = POLICY_BANDIT
+
+    def __init__(
+        self,
+        values: list[list[float]] | None = None,
+        counts: list[list[int]] | None = None,
+        episode_count: int = 0,
+        random_state: dict[str, Any] | None = None,
+        rng: np.random.Generator | None = None,
+    ) -> None:
+        """Initialize the bandit.
+
+        Args:
+            values: Mean reward per (state, action) (optional)
+            counts: Observations per (state, action) (optional)
+            episode_count: Number of episodes already completed
+            random_state: Persisted seed and generator state (optional)
+            rng: Generator to draw from instead of one seeded from random_state
+        """
+        self.num_states = 4 * 4 * 3 * 3
+        self.num_actions = len(RL_ACTIONS)
+        shape = (self.num_states, self.num_actions)
+
+        if values is not None and counts is not None and np.shape(values) == shape and np.shape(counts) == shape:
+            self.values = np.array(values, dtype=float)
+            self.counts = np.array(counts, dtype=np.int64)
+        else:
+            if values is not None:
+                _LOGGER.warning("Bandit: stored table shape mismatch. Resetting.")
+            self.values = np.zeros(shape)
+            self.counts = np.zeros(shape, dtype=np.int64)
+
+        self.episode_count = episode_count
+        self.random = SeededRandom.from_dict(random_state, rng)
+
+    @property
+    def is_warmup(self) -> bool:
+        """Check if policy is still in warmup phase."""
+        return self.episode_count < DEFAULT_RL_WARMUP_EPISODES
+
+    @property
+    def exploration_rate(self) -> float:
+        """Calculate current exploration rate (epsilon)."""
+        return exploration_schedule(self.episode_count)
+
+    def decide(self, context: dict[str, Any]) -> dict[str, Any]:
+        """Choose an action for a single context."""
+        decision = self._decide_batch([context], True, self.random.for_decision())[0]
+        self.random.decisions += 1
+        return decision
+
+    def decide_batch(
+        self, contexts: list[dict[str, Any]], explore: bool = True
+    ) -> list[dict[str, Any]]:
+        """Choose actions for many contexts in one pass.
+
+        Args:
+            contexts: Sensor contexts
+            explore: Apply epsilon-greedy exploration (False = pure greedy)
+        """
+        return self._decide_batch(contexts, explore, self.random.for_query())
+
+    def _decide_batch(
+        self, contexts: list[dict[str, Any]], explore: bool, rng: np.random.Generator
+    ) -> list[dict[str, Any]]:
+        """Shared body of decide and decide_batch, drawing from ``rng``."""
+        n = len(contexts)
+        if n == 0:
+            return []
+        states = RLAgent.discretize_states(contexts)
+        values = self.values[states]
+        is_learning = np.zeros(n, dtype=bool)
+        epsilon = 0.0
+        propensities = np.ones(n)
+
+        if self.is_warmup and self.episode_count < BOOTSTRAP_EPISODES:
+            actions = np.fromiter((rule_based_action(c) for c in contexts), int, n)
+        else:
+            # Unseen arms are tried before seen arms with negative means
+            scores = np.where(self.counts[states] > 0, values, 0.0)
+            greedy = actions = np.argmax(scores, axis=1)
+            if explore:
+                epsilon = self.exploration_rate
+                is_learning = rng.random(n) < epsilon
+                actions = np.where(is_learning, rng.integers(0, self.num_actions, n), actions)
+                propensities = epsilon_greedy_propensity(epsilon, actions, greedy, self.num_actions)
+
+        is_warmup = self.is_warmup
+        return [
+            make_decision(
+                int(action),
+                is_learning=bool(learning),
+                is_warmup=is_warmup,
+                state_index=int(state),
+                q_values=row,
+                epsilon=epsilon,
+                propensity=float(propensity),
+            )
+            for action, learning, state, row, propensity in zip(
+                actions, is_learning, states, values.tolist(), propensities
+            )
+        ]
+
+    def observe(self, transition: Transition) -> None:
+        """Update the running mean of the observed (state, action) pair."""
+        state = int(RLAgent.discretize_states([transition.context])[0])
+        action = transition.action
+        self.counts[state, action] += 1
+        count = self.counts[state, action]
+        old_value = self.values[state, action]
+        self.values[state, action] = old_value + (transition.reward - old_value) / count
+        self.episode_count += 1
+
+        _LOGGER.debug(
+            "Bandit update: estado=%d, acción=%d, recompensa=%.2f, media: %.3f -> %.3f",
+            state, action, transition.reward, old_value, self.values[state, action],
+        )
+
+    def to_dict(self) -> dict[str, Any]:
+        """Export policy state for persistence."""
+        return {
+            "values": self.values.tolist(),
+            "counts": self.counts.tolist(),
+            "episode_count": self.episode_count,
+            "random": self.random.to_dict(),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "ContextualBanditPolicy":
+        """Create policy from persisted state."""
+        return cls(
+            values=data.get("values"),
+            counts=data.get("counts"),
+            episode_count=data.get("episode_count", 0),
+            random_state=data.get("random"),
+        )
+
+
+class LinUCBPolicy:
+    """LinUCB contextual bandit over continuous context features.
+
+    One ridge-regression model per action (arm) predicts the reward from
+    the scaled features in features.py; the action with the highest upper
+    confidence bound ``mean + alpha * width`` is chosen. The inverse design
+    matrices are kept up to date with Sherman-Morrison rank-one updates, so
+    a decision or an update costs a few (d x d) NumPy operations.
+    """
+
+    name = POLICY_LINUCB
+
+    # Exploration strength (width of the confidence bound)
+    ALPHA = 0.5
+    # Ridge regularization (A starts as RIDGE * I)
+    RIDGE = 1.0
+    # Episodes between full re-inversions of every arm (discards rounding error)
+    REFRESH_EVERY = 500
+    # Smoothing of the reported exploration rate
+    EXPLORATION_SMOOTHING = 0.05
+
+    def __init__(
+        self,
+        a_matrices: list | None = None,
+        b_vectors: list | None = None,
+        episode_count: int = 0,
+        exploration_rate: float = 1.0,
+    ) -> None:
+        """Initialize the policy.
+
+        Args:
+            a_matrices: Design matrices per arm, shape (actions, d, d) (optional)
+            b_vectors: Reward-weighted feature sums per arm, shape (actions, d) (optional)
+            episode_count: Number of episodes already completed
+            exploration_rate: Smoothed share of decisions driven by the bonus
+        """
+        self.num_actions = len(RL_ACTIONS)
+        d = NUM_FEATURES
+        if (
+            a_matrices is not None
+            and b_vectors is not None
+            and np.shape(a_matrices) == (self.num_actions, d, d)
+            and np.shape(b_vectors) == (self.num_actions, d)
+        ):
+            self.a_matrices = np.array(a_matrices, dtype=float)
+            self.b_vectors = np.array(b_vectors, dtype=float)
+        else:
+            if a_matrices is not None:
+                _LOGGER.warning("LinUCB: stored model shape mismatch (features changed?). Resetting.")
+            self.a_matrices = np.tile(np.eye(d) * self.RIDGE, (self.num_actions, 1, 1))
+            self.b_vectors = np.zeros((self.num_actions, d))
+
+        self.a_inverse = np.linalg.inv(self.a_matrices)
+        self.theta = np.einsum("aij,aj->ai", self.a_inverse, self.b_vectors)
+        self.episode_count = episode_count
+        self._exploration_rate = exploration_rate
+
+    @property
+    def is_warmup(self) -> bool:
+        """Check if policy is still in warmup phase."""
+        return self.episode_count < DEFAULT_RL_WARMUP_EPISODES
+
+    @property
+    def exploration_rate(self) -> float:
+        """Smoothed share of recent decisions where the bonus overrode the mean."""
+        if self.episode_count < BOOTSTRAP_EPISODES:
+            return 1.0
+        return self._exploration_rate
+
+    def decide(self, context: dict[str, Any]) -> dict[str, Any]:
+        """Choose an action for a single context."""
+        decision = self.decide_batch([context])[0]
+        if not (self.is_warmup and self.episode_count < BOOTSTRAP_EPISODES):
+            a = self.EXPLORATION_SMOOTHING
+            self._exploration_rate = (1 - a) * self._exploration_rate + a * decision["is_learning"]
+        return decision
+
+    def decide_batch(
+        self, contexts: list[dict[str, Any]], explore: bool = True
+    ) -> list[dict[str, Any]]:
+        """Choose actions for many contexts in one pass.
+
+        Args:
+            contexts: Sensor contexts
+            explore: Add the confidence bonus (False = greedy on the mean)
+        """
+        n = len(contexts)
+        if n == 0:
+            return []
+        features = context_matrix(contexts)
+        means = features @ self.theta.T  # (n, actions)
+        greedy = np.argmax(means, axis=1)
+
+        if self.is_warmup and self.episode_count < BOOTSTRAP_EPISODES:
+            actions = np.fromiter((rule_based_action(c) for c in contexts), int, n)
+            is_learning = np.zeros(n, dtype=bool)
+        elif explore:
+            widths = np.sqrt(np.einsum("ni,aij,nj->na", features, self.a_inverse, features))
+            actions = np.argmax(means + self.ALPHA * widths, axis=1)
+            is_learning = actions != greedy
+        else:
+            actions = greedy
+            is_learning = np.zeros(n, dtype=bool)
+
+        is_warmup = self.is_warmup
+        return [
+            make_decision(
+                int(action),
+                is_learning=bool(learning),
+                is_warmup=is_warmup,
+                q_values=row,
+            )
+            for action, learning, row in zip(actions, is_learning, means.tolist())
+        ]
+
+    def observe(self, transition: Transition) -> None:
+        """Rank-one update of the chosen arm's model (Sherman-Morrison)."""
+        x = context_matrix([transition.context])[0]
+        arm = transition.action
+
+        a_inv = self.a_inverse[arm]
+        a_inv_x = a_inv @ x
+        a_inv -= np.outer(a_inv_x, a_inv_x) / (1.0 + x @ a_inv_x)
+        self.a_matrices[arm] += np.outer(x, x)
+        self.b_vectors[arm] += transition.reward * x
+        self.episode_count += 1
+
+        if self.episode_count % self.REFRESH_EVERY == 0:
+            # Todos los brazos: los que no se actualizaron también arrastran error
+            self.a_inverse = np.linalg.inv(self.a_matrices)
+            self.theta = np.einsum("aij,aj->ai", self.a_inverse, self.b_vectors)
+        else:
+            self.theta[arm] = self.a_inverse[arm] @ self.b_vectors[arm]
+
+        _LOGGER.debug(
+            "LinUCB update: acción=%d, recompensa=%.2f, predicción=%.3f",
+            arm, transition.reward, float(x @ self.theta[arm]),
+        )
+
+    def to_dict(self) -> dict[str, Any]:
+        """Export policy state for persistence.
+
+        A (not its inverse) is stored so every restart re-inverts exactly.
+        """
+        return {
+            "a_matrices": self.a_matrices.tolist(),
+            "b_vectors": self.b_vectors.tolist(),
+            "episode_count": self.episode_count,
+            "exploration_rate": round(self._exploration_rate, 4),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "LinUCBPolicy":
+        """Create policy from persisted state."""
+        return cls(
+            a_matrices=data.get("a_matrices"),
+            b_vectors=data.get("b_vectors"),
+            episode_count=data.get("episode_count", 0),
+            exploration_rate=data.get("exploration_rate", 1.0),
+        )
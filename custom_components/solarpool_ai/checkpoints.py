@@ -0,0 +1,296 @@
+"""Checkpoints of the learned policy state, with rollback.
+
+Every ``CHECKPOINT_EVERY`` learned episodes the active policy's state
+(``to_dict``: Q-table or weights, visit counts, episode count) is saved as a
+checkpoint. A checkpoint is stored as a delta against a base snapshot of the
+same policy: numeric arrays keep only the elements that changed (index and
+new value), other keys only when they differ. Once a delta would touch more
+than ``REBASE_FRACTION`` of the elements, the checkpoint becomes the new
+base. Only the newest ``retention`` checkpoints per policy are kept, and bases
+no checkpoint refers to are dropped.
+
+The store is one JSON file per config entry, read and written in the
+executor (encoding included) and not kept in memory. Rewards of the learned cycles are kept in a
+rolling window: when its mean drops below the configured threshold the
+coordinator rolls back to the newest checkpoint taken while the mean was
+above it.
+
+This module only imports NumPy when a checkpoint is encoded or decoded, which
+happens for learning policies only.
+"""
+from __future__ import annotations
+
+import copy
+import json
+import logging
+import threading
+from collections import deque
+from collections.abc import Awaitable, Callable
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+from .const import POLICY_FROZEN, POLICY_RULES
+
+_LOGGER = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+CHECKPOINT_EVERY = 50  # Learned episodes between periodic checkpoints
+REBASE_FRACTION = 0.5  # Delta size (fraction of array elements) that triggers a new base
+ROLLING_WINDOW = 20  # Rewards averaged for the auto-rollback check
+
+# Policies that never learn online: nothing to checkpoint
+NOT_CHECKPOINTED = frozenset((POLICY_RULES, POLICY_FROZEN))
+
+
+def _numeric_array(value: Any) -> Any:
+    """Value as a numeric NumPy array, or None if it is not a rectangular number list."""
+    import numpy as np
+
+    if not isinstance(value, list):
+        return None
+    try:
+        array = np.asarray(value)
+    except ValueError:  # Ragged
+        return None
+    return array if array.dtype.kind in "iuf" else None
+
+
+def encode_delta(base: dict[str, Any], state: dict[str, Any]) -> tuple[dict[str, Any], float]:
+    """Delta that turns ``base`` into ``state``.
+
+    Returns:
+        The delta, and the fraction of numeric array elements it patches
+    """
+    import numpy as np
+
+    delta: dict[str, Any] = {"set": {}, "patch": {}, "removed": [key for key in base if key not in state]}
+    patched = total = 0
+    for key, value in state.items():
+        reference = base.get(key)
+        new = _numeric_array(value)
+        old = _numeric_array(reference)
+        if new is not None and old is not None and new.shape == old.shape:
+            total += new.size
+            changed = np.flatnonzero(new != old)
+            if changed.size:
+                patched += changed.size
+                delta["patch"][key] = {"index": changed.tolist(), "value": new.ravel()[changed].tolist()}
+        elif value != reference or key not in base:
+            delta["set"][key] = value
+    return delta, (patched / total if total else 0.0)
+
+
+def apply_delta(base: dict[str, Any], delta: dict[str, Any]) -> dict[str, Any]:
+    """Rebuild a state from its base and delta (the base is not modified)."""
+    import numpy as np
+
+    state = {
+        key: copy.deepcopy(value)
+        for key, value in base.items()
+        if key not in delta["removed"] and key not in delta["patch"]
+    }
+    for key, patch in delta["patch"].items():
+        array = np.array(base[key])
+        updates = np.asarray(patch["value"])
+        if updates.size:
+            array = array.astype(np.result_type(array, updates))
+            array.flat[patch["index"]] = updates
+        state[key] = array.tolist()
+    state.update(copy.deepcopy(delta["set"]))
+    return state
+
+
+class CheckpointManager:
+    """Checkpoint store of one config entry plus its rolling reward window.
+
+    All store access runs in the executor under a lock; the event loop only
+    awaits it.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        run_in_executor: Callable[..., Awaitable[Any]],
+        retention: int,
+        rollback_threshold: float | None = None,
+        every: int = CHECKPOINT_EVERY,
+        window: int = ROLLING_WINDOW,
+    ) -> None:
+        """Initialize the manager (the file is read on first use).
+
+        Args:
+            path: JSON file of the store
+            run_in_executor: ``hass.async_add_executor_job``
+            retention: Checkpoints kept per policy
+            rollback_threshold: Rolling mean reward below which the policy is
+                rolled back (None disables automatic rollback)
+            every: Learned episodes between periodic checkpoints
+            window: Rewards in the rolling mean
+        """
+        self.path = Path(path)
+        self.retention = retention
+        self.rollback_threshold = rollback_threshold
+        self.every = every
+        self.rewards: deque[float] = deque(maxlen=window)
+        self._run_in_executor = run_in_executor
+        self._lock = threading.Lock()
+        self._loaded = False
+        # Episode count of the newest checkpoint per policy
+        self._last_episode: dict[str, int] = {}
+
+    # Rolling reward
+
+    def record_reward(self, reward: float) -> None:
+        """Add the reward of a learned cycle to the rolling window."""
+        self.rewards.append(reward)
+
+    @property
+    def rolling_reward(self) -> float | None:
+        """Mean reward of the window, once it is full."""
+        if len(self.rewards) < self.rewards.maxlen:
+            return None
+        return sum(self.rewards) / len(self.rewards)
+
+    @property
+    def reward_dropped(self) -> bool:
+        """Whether automatic rollback should run now."""
+        rolling = self.rolling_reward
+        return self.rollback_threshold is not None and rolling is not None and rolling < self.rollback_threshold
+
+    def due(self, policy_name: str, episode_count: int) -> bool:
+        """Whether a periodic checkpoint is due (the store must be loaded)."""
+        if policy_name in NOT_CHECKPOINTED:
+            return False
+        return episode_count - self._last_episode.get(policy_name, 0) >= self.every
+
+    # Store (executor side)
+
+    def _read(self) -> dict[str, Any]:
+        """Read the store (blocking, lock held).
+
+        It is not kept in memory: it is only needed every ``every`` episodes.
+        """
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            data = {"version": FORMAT_VERSION, "next_id": 1, "policies": {}}
+        except (OSError, ValueError) as err:
+            _LOGGER.warning("Checkpoints ilegibles en %s, se empieza de cero: %s", self.path, err)
+            data = {"version": FORMAT_VERSION, "next_id": 1, "policies": {}}
+        if not self._loaded:
+            for name, store in data["policies"].items():
+                for entry in store["checkpoints"]:
+                    if entry["reason"] == "periodic":
+                        self._last_episode[name] = entry["episode_count"]
+            self._loaded = True
+        return data
+
+    def _write(self, data: dict[str, Any]) -> None:
+        """Replace the store file atomically (blocking, lock held)."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = self.path.with_name(f"{self.path.name}.tmp")
+        temporary.write_text(json.dumps(data, separators=(",", ":")), encoding="utf-8")
+        temporary.replace(self.path)
+
+    def _save(self, policy_name: str, state: dict[str, Any], meta: dict[str, Any]) -> dict[str, Any]:
+        with self._lock:
+            data = self._read()
+            store = data["policies"].setdefault(policy_name, {"bases": {}, "checkpoints": []})
+            checkpoint_id = data["next_id"]
+            data["next_id"] += 1
+
+            base_id = store["checkpoints"][-1]["base"] if store["checkpoints"] else None
+            delta = None
+            if base_id is not None:
+                delta, fraction = encode_delta(store["bases"][str(base_id)], state)
+                if fraction > REBASE_FRACTION:
+                    delta = None
+            if delta is None:
+                base_id = checkpoint_id
+                store["bases"][str(base_id)] = state
+                delta = {"set": {}, "patch": {}, "removed": []}
+
+            checkpoint = {"id": checkpoint_id, "policy": policy_name, "base": base_id, **meta}
+            store["checkpoints"].append({**checkpoint, "delta": delta})
+            del store["checkpoints"][: -self.retention]
+            referenced = {str(entry["base"]) for entry in store["checkpoints"]}
+            store["bases"] = {key: value for key, value in store["bases"].items() if key in referenced}
+            self._write(data)
+            if meta["reason"] == "periodic":  # After a rollback or import the new state sets it
+                self._last_episode[policy_name] = meta["episode_count"]
+            return checkpoint
+
+    def _list(self) -> list[dict[str, Any]]:
+        with self._lock:
+            data = self._read()
+            return [
+                {key: value for key, value in entry.items() if key != "delta"}
+                for store in data["policies"].values()
+                for entry in store["checkpoints"]
+            ]
+
+    def _restore(self, checkpoint_id: int) -> tuple[dict[str, Any], dict[str, Any]] | None:
+        with self._lock:
+            data = self._read()
+            for store in data["policies"].values():
+                for entry in store["checkpoints"]:
+                    if entry["id"] == checkpoint_id:
+                        state = apply_delta(store["bases"][str(entry["base"])], entry["delta"])
+                        self._last_episode[entry["policy"]] = entry["episode_count"]
+                        return {key: value for key, value in entry.items() if key != "delta"}, state
+            return None
+
+    # Event loop API
+
+    async def async_load(self) -> None:
+        """Read the checkpoint schedule from the store (no-op once loaded)."""
+        if not self._loaded:
+            await self._run_in_executor(self._locked_read)
+
+    def _locked_read(self) -> None:
+        with self._lock:
+            self._read()
+
+    async def async_save(
+        self, policy_name: str, state: dict[str, Any], episode_count: int, created: datetime, reason: str
+    ) -> dict[str, Any]:
+        """Store a checkpoint of a policy state.
+
+        Args:
+            policy_name: Policy the state belongs to
+            state: Output of ``policy.to_dict()`` (not modified afterwards)
+            episode_count: Episodes the policy had learned
+            created: Checkpoint time
+            reason: "periodic", "before_rollback" or "before_import"
+
+        Returns:
+            The checkpoint metadata
+        """
+        meta = {
+            "created": created.isoformat(),
+            "episode_count": episode_count,
+            "rolling_reward": self.rolling_reward,
+            "reason": reason,
+        }
+        return await self._run_in_executor(self._save, policy_name, state, meta)
+
+    async def async_list(self) -> list[dict[str, Any]]:
+        """Metadata of every stored checkpoint, oldest first per policy."""
+        return await self._run_in_executor(self._list)
+
+    async def async_restore(self, checkpoint_id: int) -> tuple[dict[str, Any], dict[str, Any]] | None:
+        """Metadata and rebuilt policy state of a checkpoint (None if unknown)."""
+        return await self._run_in_executor(self._restore, checkpoint_id)
+
+    async def async_last_good(self, policy_name: str) -> int | None:
+        """Newest checkpoint of a policy taken while the rolling reward was above the threshold."""
+        for checkpoint in reversed(await self.async_list()):
+            rolling = checkpoint["rolling_reward"]
+            if (
+                checkpoint["policy"] == policy_name
+                and rolling is not None
+                and (self.rollback_threshold is None or rolling >= self.rollback_threshold)
+            ):
+                return checkpoint["id"]
+        return None
@@ -25,16 +25,48 @@ from .const import (
     CONF_SWEEP_DURATION,
     CONF_MAX_TEMP,
     CONF_SCAN_INTERVAL,
+    CONF_SETTLE_DELAY,
     CONF_LANGUAGE,
+    CONF_POLICY,
+    CONF_LOOP_MONITOR,
+    CONF_TRACE_SAMPLE_RATE,
+    CONF_CHECKPOINT_RETENTION,
+    CONF_AUTO_ROLLBACK,
+    CONF_ROLLBACK_REWARD,
+    CONF_FLEET_SHARING,
+    CONF_RETURN_MODE,
     SUPPORTED_LANGUAGES,
+    SUPPORTED_POLICIES,
     DEFAULT_LANGUAGE,
+    DEFAULT_POLICY,
     DEFAULT_SWEEP_DURATION,
     DEFAULT_MAX_TEMP,
     DEFAULT_SCAN_INTERVAL,
+    DEFAULT_SETTLE_DELAY,
+    DEFAULT_LOOP_MONITOR,
+    DEFAULT_TRACE_SAMPLE_RATE,
+    DEFAULT_CHECKPOINT_RETENTION,
+    DEFAULT_AUTO_ROLLBACK,
+    DEFAULT_ROLLBACK_REWARD,
+    DEFAULT_FLEET_SHARING,
+    DEFAULT_RETURN_MODE,
+    RETURN_MODES,
 )
 
 _LOGGER = logging.getLogger(__name__)
 
+
+def _policy_selector() -> selector.SelectSelector:
+    """Build the decision policy selector (labels come from translations)."""
+    return selector.SelectSelector(
+        selector.SelectSelectorConfig(
+            options=list(SUPPORTED_POLICIES),
+            mode=selector.SelectSelectorMode.DROPDOWN,
+            translation_key=CONF_POLICY,
+        )
+    )
+
+
 class SolarPoolConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     """Handle a config flow for SolarPool AI."""
 
@@ -136,6 +168,7 @@ class SolarPoolConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                             min=5, max=120, step=1, unit_of_measurement="min", mode=selector.NumberSelectorMode.BOX
                         )
                     ),
+                    vol.Required(CONF_POLICY, default=DEFAULT_POLICY): _policy_selector(),
                 }
             ),
         )
@@ -180,6 +213,23 @@ class SolarPoolOptionsFlow(config_entries.OptionsFlow):
                 CONF_SCAN_INTERVAL,
                 self.config_entry.data.get(CONF_SCAN_INTERVAL, DEFAULT_SCAN_INTERVAL)
             )
+            settle_delay = self.config_entry.options.get(
+                CONF_SETTLE_DELAY,
+                self.config_entry.data.get(CONF_SETTLE_DELAY, DEFAULT_SETTLE_DELAY)
+            )
+            policy = self.config_entry.options.get(
+                CONF_POLICY,
+                self.config_entry.data.get(CONF_POLICY, DEFAULT_POLICY)
+            )
+            loop_monitor = self.config_entry.options.get(CONF_LOOP_MONITOR, DEFAULT_LOOP_MONITOR)
+            trace_sample_rate = self.config_entry.options.get(CONF_TRACE_SAMPLE_RATE, DEFAULT_TRACE_SAMPLE_RATE)
+            checkpoint_retention = self.config_entry.options.get(
+                CONF_CHECKPOINT_RETENTION, DEFAULT_CHECKPOINT_RETENTION
+            )
+            auto_rollback = self.config_entry.options.get(CONF_AUTO_ROLLBACK, DEFAULT_AUTO_ROLLBACK)
+            rollback_reward = self.config_entry.options.get(CONF_ROLLBACK_REWARD, DEFAULT_ROLLBACK_REWARD)
+            fleet_sharing = self.config_entry.options.get(CONF_FLEET_SHARING, DEFAULT_FLEET_SHARING)
+            return_mode = self.config_entry.options.get(CONF_RETURN_MODE, DEFAULT_RETURN_MODE)
             
             # Get optional sensor overrides
             uv_sensor = self.config_entry.options.get(
@@ -203,6 +253,9 @@ class SolarPoolOptionsFlow(config_entries.OptionsFlow):
             sweep_duration = int(sweep_duration) if sweep_duration else DEFAULT_SWEEP_DURATION
             max_temp = float(max_temp) if max_temp else DEFAULT_MAX_TEMP
             scan_interval = int(scan_interval) if scan_interval else DEFAULT_SCAN_INTERVAL
+            settle_delay = int(settle_delay) if settle_delay is not None else DEFAULT_SETTLE_DELAY
+            policy = policy if policy in SUPPORTED_POLICIES else DEFAULT_POLICY
+            return_mode = return_mode if return_mode in RETURN_MODES else DEFAULT_RETURN_MODE
 
             # Build language options for selector
             language_map = {
@@ -253,6 +306,64 @@ class SolarPoolOptionsFlow(config_entries.OptionsFlow):
                         min=5, max=120, step=1, unit_of_measurement="min", mode=selector.NumberSelectorMode.BOX
                     )
                 ),
+                vol.Required(
+                    CONF_SETTLE_DELAY,
+                    default=settle_delay,
+                ): selector.NumberSelector(
+                    selector.NumberSelectorConfig(
+                        min=0, max=30, step=1, unit_of_measurement="min", mode=selector.NumberSelectorMode.BOX
+                    )
+                ),
+                vol.Required(
+                    CONF_POLICY,
+                    default=policy,
+                ): _policy_selector(),
+                vol.Required(
+                    CONF_RETURN_MODE,
+                    default=return_mode,
+                ): selector.SelectSelector(
+                    selector.SelectSelectorConfig(
+                        options=list(RETURN_MODES),
+                        mode=selector.SelectSelectorMode.DROPDOWN,
+                        translation_key=CONF_RETURN_MODE,
+                    )
+                ),
+                vol.Required(
+                    CONF_LOOP_MONITOR,
+                    default=bool(loop_monitor),
+                ): selector.BooleanSelector(),
+                vol.Required(
+                    CONF_TRACE_SAMPLE_RATE,
+                    default=trace_sample_rate,
+                ): selector.NumberSelector(
+                    selector.NumberSelectorConfig(
+                        min=0, max=1, step=0.05, mode=selector.NumberSelectorMode.BOX
+                    )
+                ),
+                vol.Required(
+                    CONF_CHECKPOINT_RETENTION,
+                    default=checkpoint_retention,
+                ): selector.NumberSelector(
+                    selector.NumberSelectorConfig(
+                        min=1, max=50, step=1, mode=selector.NumberSelectorMode.BOX
+                    )
+                ),
+                vol.Required(
+                    CONF_AUTO_ROLLBACK,
+                    default=bool(auto_rollback),
+                ): selector.BooleanSelector(),
+                vol.Required(
+                    CONF_ROLLBACK_REWARD,
+                    default=rollback_reward,
+                ): selector.NumberSelector(
+                    selector.NumberSelectorConfig(
+                        min=-2, max=2, step=0.05, mode=selector.NumberSelectorMode.BOX
+                    )
+                ),
+                vol.Required(
+                    CONF_FLEET_SHARING,
+                    default=bool(fleet_sharing),
+                ): selector.BooleanSelector(),
             }
             
             # Add optional sensor fields
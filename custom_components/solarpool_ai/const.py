@@ -21,7 +21,22 @@ CONF_CLOUD_COVERAGE_SENSOR_ID: Final = "cloud_coverage_sensor_id"
 CONF_SWEEP_DURATION: Final = "sweep_duration"
 CONF_MAX_TEMP: Final = "max_temp"
 CONF_SCAN_INTERVAL: Final = "scan_interval"
+CONF_SETTLE_DELAY: Final = "settle_delay"
 CONF_CYCLE_HISTORY: Final = "cycle_history"
+CONF_LOOP_MONITOR: Final = "loop_monitor"  # Opt-in event-loop blocking detector
+CONF_TRACE_SAMPLE_RATE: Final = "trace_sample_rate"  # Fraction of cycles written to the trace log
+CONF_CHECKPOINT_RETENTION: Final = "checkpoint_retention"  # Policy checkpoints kept
+CONF_AUTO_ROLLBACK: Final = "auto_rollback"  # Roll back the policy when rewards drop
+CONF_ROLLBACK_REWARD: Final = "rollback_reward"  # Rolling mean reward that triggers it
+CONF_FLEET_SHARING: Final = "fleet_sharing"  # Merge the Q-table with other opted-in entries
+
+# Services
+SERVICE_EXPORT_HISTORY: Final = "export_history"
+SERVICE_LIST_CHECKPOINTS: Final = "list_checkpoints"
+SERVICE_ROLLBACK: Final = "rollback"
+SERVICE_EXPORT_AGENT: Final = "export_agent"
+SERVICE_IMPORT_AGENT: Final = "import_agent"
+SERVICE_SIMULATE: Final = "simulate"
 
 # AI Providers
 AI_PROVIDER_GEMINI: Final = "Gemini"
@@ -34,6 +49,17 @@ DEFAULT_SWEEP_DURATION: Final = 180
 DEFAULT_MAX_TEMP: Final = 32.0
 DEFAULT_SCAN_INTERVAL: Final = 10
 DEFAULT_MIN_RUN_TIME: Final = 10  # Minutos mínimos de funcionamiento para proteger la bomba
+DEFAULT_SETTLE_DELAY: Final = 5  # Minutos tras el calentamiento antes de medir la ganancia
+DEFAULT_LOOP_MONITOR: Final = False
+DEFAULT_TRACE_SAMPLE_RATE: Final = 1.0
+DEFAULT_CHECKPOINT_RETENTION: Final = 10
+DEFAULT_AUTO_ROLLBACK: Final = False
+DEFAULT_ROLLBACK_REWARD: Final = -0.2
+DEFAULT_FLEET_SHARING: Final = False
+
+# Safety overrides applied on top of the policy's decision
+MIN_HEATING_DELTA: Final = 2.0  # °C: ON with a smaller real delta is forced OFF
+MIN_RUN_MARGIN: Final = 2  # Minutos extra al extender una corrida corta
 
 # States
 STATE_IDLE = "idle"
@@ -59,3 +85,33 @@ DEFAULT_RL_MIN_EXPLORATION: Final = 0.05
 # RL Actions (pump durations in minutes)
 RL_ACTIONS: Final = [0, 20, 40, 60, 90]  # 0 = OFF, others = ON for X minutes
 
+# Decision policy selection
+CONF_POLICY: Final = "policy"
+CONF_POLICY_STATES: Final = "policy_states"  # Persisted state per policy name
+CONF_THERMAL_MODEL: Final = "thermal_model"  # Persisted learned heat-balance model
+POLICY_Q_LEARNING: Final = "q_learning"
+POLICY_RULES: Final = "rules"
+POLICY_BANDIT: Final = "bandit"
+POLICY_LINUCB: Final = "linucb"
+POLICY_Q_TILES: Final = "q_tiles"
+POLICY_Q_TREE: Final = "q_tree"
+POLICY_FROZEN: Final = "frozen"  # Locked: compiled from a trained policy, no learning
+SUPPORTED_POLICIES: Final = [
+    POLICY_Q_LEARNING,
+    POLICY_RULES,
+    POLICY_BANDIT,
+    POLICY_LINUCB,
+    POLICY_Q_TILES,
+    POLICY_Q_TREE,
+    POLICY_FROZEN,
+]
+DEFAULT_POLICY: Final = POLICY_Q_LEARNING
+
+# Learning target of the tabular Q-learning policy
+CONF_RETURN_MODE: Final = "return_mode"
+RETURN_ONE_STEP: Final = "one_step"  # r + γ max Q(s')
+RETURN_DOUBLE_Q: Final = "double_q"  # r + γ Q_target(s', argmax Q(s'))
+RETURN_N_STEP: Final = "n_step"  # Σ γ^k r_{t+k} + γ^n max Q(s_{t+n})
+RETURN_MODES: Final = (RETURN_ONE_STEP, RETURN_DOUBLE_Q, RETURN_N_STEP)
+DEFAULT_RETURN_MODE: Final = RETURN_ONE_STEP
+
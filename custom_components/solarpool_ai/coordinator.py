@@ -2,10 +2,11 @@
 from __future__ import annotations
 
 import logging
-import asyncio
 import math
+import time
+from collections.abc import Mapping
 from datetime import datetime, timedelta
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import (
@@ -17,30 +18,21 @@ from homeassistant.const import (
     EVENT_HOMEASSISTANT_STARTED,
 )
 from homeassistant.core import HomeAssistant, callback
-from homeassistant.util.dt import utcnow
+from homeassistant.util.dt import parse_datetime, utcnow
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
 from homeassistant.helpers.event import async_track_time_interval, async_call_later
 
 from .const import (
     DOMAIN,
-    CONF_PUMP_ENTITY_ID,
-    CONF_POOL_SENSOR_ID,
-    CONF_RETURN_SENSOR_ID,
-    CONF_WEATHER_ENTITY_ID,
-    CONF_UV_SENSOR_ID,
-    CONF_WIND_SENSOR_ID,
-    CONF_AMBIENT_TEMP_SENSOR_ID,
-    CONF_CLOUD_COVERAGE_SENSOR_ID,
-    CONF_SWEEP_DURATION,
-    CONF_MAX_TEMP,
-    CONF_SCAN_INTERVAL,
     CONF_CYCLE_HISTORY,
     CONF_Q_TABLE,
     CONF_RL_EPISODE_COUNT,
-    CONF_LANGUAGE,
-    DEFAULT_SCAN_INTERVAL,
-    DEFAULT_SWEEP_DURATION,
-    DEFAULT_LANGUAGE,
+    CONF_POLICY_STATES,
+    CONF_THERMAL_MODEL,
+    POLICY_Q_LEARNING,
+    MIN_HEATING_DELTA,
+    MIN_RUN_MARGIN,
+    POLICY_FROZEN,
     STATE_IDLE,
     STATE_SWEEPING,
     STATE_MEASURING,
@@ -49,13 +41,44 @@ from .const import (
     STATE_COOLDOWN,
     STATE_ERROR,
 )
-from .rl_agent import RLAgent
+from .policy import Policy, Transition, calculate_reward, create_policy
 from .explanation_templates import ExplanationEngine
+from .checkpoints import NOT_CHECKPOINTED, CheckpointManager
+from .cycle_trace import CycleTracer
+from .fleet import apply_fleet_prior
+from .what_if import simulate_decisions
+from .forecast import ForecastCache
+from .loop_monitor import LoopMonitor
+from .metrics import SolarPoolMetrics
+from .settings import SolarPoolSettings
+from .thermal_model import ThermalModel
+
+if TYPE_CHECKING:
+    from .planner import DayPlan
 
 _LOGGER = logging.getLogger(__name__)
 
+
+def _make_day_plan(*args: Any) -> DayPlan | None:
+    """Build the day plan; runs in the executor, where NumPy may be imported."""
+    from .planner import make_day_plan
+
+    return make_day_plan(*args)
+
 # We no longer use a global SCAN_INTERVAL constant for the timer
 
+# Entry points measured by the loop monitor: timer callbacks, the update
+# listener and the config entry write
+_MONITORED_METHODS = (
+    "async_start_cycle",
+    "_async_check_sweep_stability",
+    "_async_measure_and_consult",
+    "_async_measure_cycle_outcome",
+    "_async_stop_heating",
+    "async_apply_settings",
+    "_persist_learning",
+)
+
 class SolarPoolCoordinator(DataUpdateCoordinator[dict[str, Any]]):
     """Class to manage fetching data from the AI and sensors."""
 
@@ -80,43 +103,81 @@ class SolarPoolCoordinator(DataUpdateCoordinator[dict[str, Any]]):
         self.t_pool_day_start: float | None = None
         self.daily_gain: float = 0.0
         
-        # Get interval from config
-        self.cycle_interval_minutes = entry.data.get(CONF_SCAN_INTERVAL, DEFAULT_SCAN_INTERVAL)
+        # Resolve options/data once; rebuilt by async_apply_settings on options update
+        self.settings = SolarPoolSettings.from_entry(hass, entry)
         
         # Load cycle history from config_entry
         self.cycle_history = entry.data.get(CONF_CYCLE_HISTORY, [])
         self.current_cycle_data = None  # Datos del ciclo en curso
         
-        # Initialize RL Agent and Explanation Engine
+        # Day plan built from the weather forecast (forecast fetched at most hourly)
+        self.forecast_cache = ForecastCache()
+        self.day_plan: DayPlan | None = None
+        self._plan_forecast_time: datetime | None = None
+        
+        # Initialize decision policy and Explanation Engine
         self._init_rl_agent()
+
+        # Runtime metrics, served in Prometheus format by the metrics view
+        self.metrics = SolarPoolMetrics(self)
+
+        # Structured per-cycle trace log (replaces the per-decision INFO lines)
+        self.tracer = CycleTracer(
+            hass.config.path(DOMAIN, "traces", f"{entry.entry_id}.jsonl"),
+            hass.async_add_executor_job,
+            self.settings.trace_sample_rate,
+            entry.entry_id,
+        )
+
+        # Periodic checkpoints of the learned policy state, with rollback
+        self.checkpoints = CheckpointManager(
+            hass.config.path(DOMAIN, "checkpoints", f"{entry.entry_id}.json"),
+            hass.async_add_executor_job,
+            self.settings.checkpoint_retention,
+            self.settings.rollback_reward,
+        )
+        self._rollback_warned = False
+        self._last_rollback_id: int | None = None
+
+        # Opt-in detector of steps that block the event loop (see diagnostics)
+        self.loop_monitor = LoopMonitor()
+        if self.settings.loop_monitor:
+            self._set_loop_monitor(True)
     
     def _init_rl_agent(self) -> None:
-        """Initialize or reinitialize the RL agent based on current config."""
+        """Initialize or reinitialize the decision policy based on current config."""
         entry = self.entry
         
-        # Load RL agent state from config_entry if available
-        q_table = entry.data.get(CONF_Q_TABLE)
-        episode_count = entry.data.get(CONF_RL_EPISODE_COUNT, 0)
+        # Persisted state per policy name, so switching policies keeps what each one learned
+        self._policy_states: dict[str, dict[str, Any]] = dict(entry.data.get(CONF_POLICY_STATES, {}))
+        if POLICY_Q_LEARNING not in self._policy_states and CONF_Q_TABLE in entry.data:
+            # Migrate the Q-table stored by earlier versions
+            self._policy_states[POLICY_Q_LEARNING] = {
+                "q_table": entry.data.get(CONF_Q_TABLE),
+                "episode_count": entry.data.get(CONF_RL_EPISODE_COUNT, 0),
+            }
         
-        self.rl_agent = RLAgent(
-            q_table=q_table,
-            episode_count=episode_count,
-        )
+        self.policy = self._create_policy(self.settings.policy, self._policy_states.get(self.settings.policy))
         _LOGGER.info(
-            "RL Agent initialized: episodes=%d, warmup=%s, exploration=%.2f",
-            self.rl_agent.episode_count,
-            self.rl_agent.is_warmup,
-            self.rl_agent.exploration_rate,
+            "Policy '%s' initialized: episodes=%d, warmup=%s, exploration=%.2f",
+            self.policy.name,
+            self.policy.episode_count,
+            self.policy.is_warmup,
+            self.policy.exploration_rate,
         )
         
+        # Heat-balance model of this pool, learned from sweeps and completed cycles
+        self.thermal_model: ThermalModel = ThermalModel.from_dict(entry.data.get(CONF_THERMAL_MODEL))
+        
         # Initialize explanation engine with language from config
-        language = entry.options.get(CONF_LANGUAGE, entry.data.get(CONF_LANGUAGE, DEFAULT_LANGUAGE))
-        self.explanation_engine = ExplanationEngine(language)
+        self.explanation_engine = ExplanationEngine(self.settings.language)
         
         # Seguimiento de intervalos y temporizadores
         self._unsub_interval = None
+        self._start_timer = None  # Primer ciclo tras el arranque (timer o evento de HA iniciado)
         self._sweep_timer = None
         self._heating_timer = None  # Timer para apagar la bomba después de heating_duration
+        self._outcome_timer = None  # Timer para medir la ganancia al final del calentamiento
         
         # Lógica de 'Ownership' (Propiedad) de la bomba
         # Evita apagar la bomba si ya estaba encendida por otro proceso (ej. filtrado)
@@ -155,18 +216,94 @@ class SolarPoolCoordinator(DataUpdateCoordinator[dict[str, Any]]):
             
         # Ejecuta async_start_cycle cada N minutos según configuración
         self._unsub_interval = async_track_time_interval(
-            self.hass, self.async_start_cycle, timedelta(minutes=self.cycle_interval_minutes)
+            self.hass, self.async_start_cycle, timedelta(minutes=self.settings.scan_interval)
         )
 
     @callback
-    def async_update_interval(self, minutes: int):
-        """Update the scan interval."""
-        self.cycle_interval_minutes = minutes
+    def async_update_interval(self) -> None:
+        """Reschedule the cycle timer using the current scan interval."""
+        minutes = self.settings.scan_interval
         self._async_setup_listeners()
         # Also schedule next run based on new interval
         self.next_cycle_time = utcnow() + timedelta(minutes=minutes)
         _LOGGER.info("SolarPool interval updated to %s minutes", minutes)
 
+    @callback
+    def async_apply_settings(self) -> None:
+        """Rebuild the settings object after a config entry update.
+
+        The update listener also fires for data-only updates (every cycle
+        persists its history), so nothing is rebuilt unless options changed.
+        The new settings object is swapped in one assignment.
+        """
+        old = self.settings
+        if dict(self.entry.options) == old.options:
+            return
+
+        self.settings = new = SolarPoolSettings.from_entry(self.hass, self.entry)
+        _LOGGER.debug("SolarPool settings rebuilt: %s", new)
+
+        if new.language != old.language:
+            self.explanation_engine.set_language(new.language)
+        if new.policy != old.policy:
+            self._switch_policy(new.policy)
+        elif new.return_mode != old.return_mode and new.policy == POLICY_Q_LEARNING:
+            # Rebuild the agent with the new target; the table and counts carry over
+            self.policy = self._create_policy(POLICY_Q_LEARNING, self.policy.to_dict())
+            _LOGGER.info("Q-learning con retorno '%s'", new.return_mode)
+        if new.scan_interval != old.scan_interval:
+            self.async_update_interval()
+        if new.loop_monitor != old.loop_monitor:
+            self._set_loop_monitor(new.loop_monitor)
+        self.tracer.sample_rate = new.trace_sample_rate
+        self.checkpoints.retention = new.checkpoint_retention
+        self.checkpoints.rollback_threshold = new.rollback_reward
+
+    @callback
+    def _set_loop_monitor(self, enabled: bool) -> None:
+        """Enable or disable the loop monitor on the coordinator's entry points.
+
+        The measured methods are shadowed by instance attributes, so timers
+        scheduled from now on get the wrapped versions; the cycle timer is
+        rescheduled to pick them up.
+        """
+        if enabled:
+            self.loop_monitor.enable()
+            for name in _MONITORED_METHODS:
+                setattr(self, name, self.loop_monitor.wrap(f"coordinator.{name}", getattr(self, name)))
+        else:
+            self.loop_monitor.disable()
+            for name in _MONITORED_METHODS:
+                self.__dict__.pop(name, None)
+        if self._unsub_interval:
+            self._async_setup_listeners()
+
+    def _create_policy(self, name: str, state: dict[str, Any] | None) -> Policy:
+        """Create a policy from its state, with the configured Q-learning return mode."""
+        if name == POLICY_Q_LEARNING:
+            state = {**(state or {}), "return_mode": self.settings.return_mode}
+        return create_policy(name, state)
+
+    def _switch_policy(self, name: str) -> None:
+        """Replace the active policy, keeping the state of the previous one."""
+        self._policy_states = {**self._policy_states, self.policy.name: self.policy.to_dict()}
+        if name == POLICY_FROZEN and self.policy.name != POLICY_FROZEN:
+            self._policy_states[POLICY_FROZEN] = self._freeze_policy()
+        self.policy = self._create_policy(name, self._policy_states.get(name))
+        _LOGGER.info(
+            "Switched to policy '%s' (episodes=%d)", self.policy.name, self.policy.episode_count
+        )
+
+    def _freeze_policy(self) -> dict[str, Any]:
+        """Compile the active policy into a frozen artifact for locked mode."""
+        from .frozen_policy import freeze
+
+        artifact = freeze(self.policy)
+        _LOGGER.info(
+            "Política '%s' congelada tras %d episodios", self.policy.name, self.policy.episode_count
+        )
+        return {"artifact": artifact, "episode_count": self.policy.episode_count}
+
     async def async_config_entry_first_refresh(self) -> None:
         """Set up the coordinator and start the first cycle."""
         # Reset state on startup in case previous run left it in an inconsistent state
@@ -182,17 +319,18 @@ class SolarPoolCoordinator(DataUpdateCoordinator[dict[str, Any]]):
         if self.hass.is_running:
             # HA already running, start cycle after short delay
             _LOGGER.info("SolarPool AI initialized, first cycle in 10 seconds")
-            async_call_later(self.hass, 10, self.async_start_cycle)
+            self._start_timer = async_call_later(self.hass, 10, self.async_start_cycle)
         else:
             # Wait for HA to fully start
             _LOGGER.info("SolarPool AI initialized, waiting for Home Assistant to start...")
             
-            async def _start_after_ha_ready(event):
+            @callback
+            def _start_after_ha_ready(event):
                 _LOGGER.info("Home Assistant started, beginning first cycle in 10 seconds")
-                await asyncio.sleep(10)  # Additional delay to ensure entities are ready
-                await self.async_start_cycle()
+                # Additional delay to ensure entities are ready
+                self._start_timer = async_call_later(self.hass, 10, self.async_start_cycle)
             
-            self.hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STARTED, _start_after_ha_ready)
+            self._start_timer = self.hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STARTED, _start_after_ha_ready)
 
     async def async_start_cycle(self, _now: datetime | None = None, force: bool = False) -> None:
         """Inicia un ciclo completo: Chequeo -> Barrido -> IA -> Calentamiento."""
@@ -201,23 +339,30 @@ class SolarPoolCoordinator(DataUpdateCoordinator[dict[str, Any]]):
             return
 
         _LOGGER.debug("Iniciando ciclo SolarPool (forzado=%s)", force)
+        self.metrics.cycles.inc()
         
         # Calculamos la próxima ejecución para el sensor
-        self.next_cycle_time = utcnow() + timedelta(minutes=self.cycle_interval_minutes)
+        self.next_cycle_time = utcnow() + timedelta(minutes=self.settings.scan_interval)
 
         # 1. Chequeo de requisitos (Sol alto, Temperatura máx, etc.)
         if not force and not await self._async_check_prerequisites():
             return
 
+        # 1b. Plan del día: si descarta calentar en este intervalo, no barremos
+        if not force and not self.pump_is_heating and await self._async_plan_rules_out_heating():
+            return
+
         # 2. FASE DE BARRIDO (Sweep)
         # Si la bomba ya está prendida por nosotros (proceso continuo), saltamos el barrido
+        self.tracer.start(utcnow(), sweep=not self.pump_is_heating)
         if self.pump_is_heating:
-            _LOGGER.info("Bomba ya en funcionamiento, saltando barrido para consulta instantánea")
+            _LOGGER.debug("Bomba ya en funcionamiento, saltando barrido para consulta instantánea")
             await self._async_measure_and_consult()
         else:
-            _LOGGER.info("Iniciando fase de barrido (sweep)")
+            _LOGGER.debug("Iniciando fase de barrido (sweep)")
             msg = self.explanation_engine.get_status_message("sweep_forced") if force else self.explanation_engine.get_status_message("sweep_starting")
             await self._async_set_state(STATE_SWEEPING, msg)
+            self.metrics.sweeps.inc()
             
             # Encendemos bomba (con protección de ownership)
             await self._async_control_pump(True)
@@ -236,29 +381,19 @@ class SolarPoolCoordinator(DataUpdateCoordinator[dict[str, Any]]):
             return
 
         # Duración máxima configurada por el usuario
-        max_sweep_duration = self.entry.options.get(
-            CONF_SWEEP_DURATION, 
-            self.entry.data.get(CONF_SWEEP_DURATION, DEFAULT_SWEEP_DURATION)
-        )
+        max_sweep_duration = self.settings.sweep_duration
         
         elapsed = (utcnow() - self._sweep_start_time).total_seconds()
         
         # Leer sensor de retorno
-        return_sensor = self.entry.data.get(CONF_RETURN_SENSOR_ID)
-        current_t_return = None
-        if return_sensor:
-            state = self.hass.states.get(return_sensor)
-            if state and state.state not in ["unknown", "unavailable"]:
-                try:
-                    current_t_return = float(state.state)
-                except ValueError:
-                    pass
+        current_t_return = self.settings.read_return_temp()
 
         # ALGORITMO DE VARIACIÓN:
         # Acumula lecturas y verifica que la diferencia entre Max y Min sea < 0.2°C
         is_stable = False
         if current_t_return is not None:
             self._sweep_readings.append(current_t_return)
+            self.tracer.sweep_sample(utcnow(), current_t_return)
             
             if elapsed >= 60 and len(self._sweep_readings) >= 3:
                 window_min = min(self._sweep_readings)
@@ -267,10 +402,12 @@ class SolarPoolCoordinator(DataUpdateCoordinator[dict[str, Any]]):
                 
                 if rango < 0.2:
                     is_stable = True
-                    _LOGGER.info("Barrido: Estabilidad detectada (Rango: %.2f°C)", rango)
+                    _LOGGER.debug("Barrido: Estabilidad detectada (Rango: %.2f°C)", rango)
         
         # Si está estable O se acabó el tiempo, procedemos a consultar a la IA
         if is_stable or elapsed >= max_sweep_duration:
+            self.metrics.sweep_duration.observe(elapsed)
+            self.tracer.phase("consult", utcnow())
             await self._async_measure_and_consult()
         else:
             # Re-programar chequeo en 15 segundos
@@ -278,6 +415,7 @@ class SolarPoolCoordinator(DataUpdateCoordinator[dict[str, Any]]):
 
     async def _async_measure_and_consult(self, _now: datetime | None = None) -> None:
         """Step 3 & 4: Measure and Consult RL Agent."""
+        consult_start = time.perf_counter()
         status_msg = self.explanation_engine.get_status_message("measuring_sensors")
         await self._async_set_state(STATE_MEASURING, status_msg)
         
@@ -288,14 +426,18 @@ class SolarPoolCoordinator(DataUpdateCoordinator[dict[str, Any]]):
             await self._async_control_pump(False)
             return
 
+        self.tracer.readings(context)
+
+        # The pump is running, so the measured delta teaches the collector model
+        self.thermal_model.observe_sweep(context)
+
         # 4. CONSULTING RL AGENT (instantaneous, no API call)
         consulting_msg = self.explanation_engine.get_status_message("consulting_ai")
         await self._async_set_state(STATE_CONSULTING, consulting_msg)
         
-        decision = self.rl_agent.get_action(context)
+        decision = self.policy.decide(context)
         
         action = decision.get("action", "OFF")
-        expected_gain = decision.get("expected_gain", 0.0)
         heating_duration = decision.get("heating_duration_minutes", 0)
         is_learning = decision.get("is_learning", False)
         is_warmup = decision.get("is_warmup", False)
@@ -307,11 +449,10 @@ class SolarPoolCoordinator(DataUpdateCoordinator[dict[str, Any]]):
             is_learning=is_learning,
             is_warmup=is_warmup,
         )
-        self.expected_gain = expected_gain
         
-        _LOGGER.info(
-            "RL Decision: %s for %d min (gain=%.1f°C, learning=%s, warmup=%s)",
-            action, heating_duration, expected_gain, is_learning, is_warmup
+        _LOGGER.debug(
+            "RL Decision: %s for %d min (learning=%s, warmup=%s)",
+            action, heating_duration, is_learning, is_warmup
         )
 
         # --- SAFETY OVERRIDE & HYSTERESIS ---
@@ -320,27 +461,37 @@ class SolarPoolCoordinator(DataUpdateCoordinator[dict[str, Any]]):
         # Protection: Minimum run time to prevent short-cycling (Sweep + Heating)
         if action == "OFF" and self._last_pump_on_time:
             run_time_min = (utcnow() - self._last_pump_on_time).total_seconds() / 60
-            from .const import DEFAULT_MIN_RUN_TIME
-            if run_time_min < DEFAULT_MIN_RUN_TIME:
-                remaining_min = DEFAULT_MIN_RUN_TIME - run_time_min
-                _LOGGER.info("Protección: IA sugirió OFF pero bomba lleva solo %.1f min. Manteniendo ON por %.1f min más.", 
+            min_run_time = self.settings.min_run_time
+            if run_time_min < min_run_time:
+                remaining_min = min_run_time - run_time_min
+                _LOGGER.debug("Protección: IA sugirió OFF pero bomba lleva solo %.1f min. Manteniendo ON por %.1f min más.", 
                             run_time_min, remaining_min)
                 action = "ON"
-                heating_duration = int(remaining_min) + 2 # Agregamos 2 min de margen
+                heating_duration = int(remaining_min) + MIN_RUN_MARGIN
+                self.metrics.override_min_run.inc()
+                self.tracer.override("min_run_time")
                 self.reasoning += f" (Protegiendo bomba: {run_time_min:.0f}min run)"
 
         # Safety: Delta T too low
-        if action == "ON" and actual_delta < 2.0:
+        if action == "ON" and actual_delta < MIN_HEATING_DELTA:
             _LOGGER.warning(
                 "RL sugirió ON con un diferencial real de %.1f°C. Forzando OFF por eficiencia.",
                 actual_delta
             )
             action = "OFF"
             heating_duration = 0
+            self.metrics.override_low_delta.inc()
+            self.tracer.override("low_delta")
             override_msg = self.explanation_engine.get_status_message("safety_override", delta=actual_delta)
             self.reasoning = override_msg
         # ----------------------------------------
 
+        # Ganancia esperada según el modelo térmico aprendido de esta pileta
+        expected_gain = self.thermal_model.predict_gain(
+            context, heating_duration, max(heating_duration, self.settings.scan_interval)
+        )
+        self.expected_gain = expected_gain
+
         # Guardar datos del ciclo actual para el historial y RL feedback
         self.current_cycle_data = {
             "timestamp": utcnow().isoformat(),
@@ -350,8 +501,18 @@ class SolarPoolCoordinator(DataUpdateCoordinator[dict[str, Any]]):
             "t_pool_start": context["t_pool"],
             "heating_duration": heating_duration,
             "is_learning": is_learning,
+            "policy": self.policy.name,
+            "action_index": decision.get("action_index"),
+            # Para evaluación off-policy: con qué probabilidad se eligió y si se anuló
+            "epsilon": decision.get("epsilon"),
+            "propensity": decision.get("propensity"),
+            "overridden": heating_duration != decision.get("heating_duration_minutes", 0),
         }
 
+        metrics = self.metrics
+        (metrics.decisions_on if action == "ON" else metrics.decisions_off).inc()
+        metrics.heating_duration.observe(heating_duration)
+
         # 5. EXECUTING
         if action == "ON":
             await self._async_set_state(STATE_HEATING, self.reasoning)
@@ -369,7 +530,7 @@ class SolarPoolCoordinator(DataUpdateCoordinator[dict[str, Any]]):
                 heating_duration * 60,  # Convertir minutos a segundos
                 self._async_stop_heating
             )
-            _LOGGER.info("Bomba encendida por %d minutos (ganancia esperada: %.1f°C)", heating_duration, expected_gain)
+            _LOGGER.debug("Bomba encendida por %d minutos (ganancia esperada: %.1f°C)", heating_duration, expected_gain)
         else:
             await self._async_set_state(STATE_IDLE, self.reasoning)
             await self._async_control_pump(False)
@@ -377,6 +538,14 @@ class SolarPoolCoordinator(DataUpdateCoordinator[dict[str, Any]]):
             
         # Actualizar historial con ganancia real si hay ciclo previo
         await self._async_update_cycle_history(context["t_pool"])
+        
+        # Medir este ciclo al final de su ventana de calentamiento, no en el próximo ciclo
+        self._schedule_outcome_measurement(heating_duration)
+        consult_seconds = time.perf_counter() - consult_start
+        metrics.consult_duration.observe(consult_seconds)
+        self.tracer.decided(
+            self.policy.name, decision, action, heating_duration, expected_gain, consult_seconds
+        )
 
     async def _async_check_prerequisites(self) -> bool:
         """Check if we should run the cycle."""
@@ -403,34 +572,85 @@ class SolarPoolCoordinator(DataUpdateCoordinator[dict[str, Any]]):
                 return False
 
         # 3. Max Temp check
-        max_temp = self.entry.data.get(CONF_MAX_TEMP, 32.0)
-        pool_sensor = self.entry.data.get(CONF_POOL_SENSOR_ID)
-        pool_temp_state = self.hass.states.get(pool_sensor)
+        max_temp = self.settings.max_temp
+        temp = self.settings.read_pool_temp()
         
-        if pool_temp_state and pool_temp_state.state not in ["unknown", "unavailable"]:
-            try:
-                temp = float(pool_temp_state.state)
-                
-                # Update daily gain tracking
-                if self.t_pool_day_start is None:
-                    # First reading of the day when sun is up and system is active
-                    self.t_pool_day_start = temp
-                    self.daily_gain = 0.0
-                    _LOGGER.info("Starting daily yield tracking. Initial pool temp: %.1f°C", temp)
-                else:
-                    # Calculate current yield relative to start of day
-                    # We use max(0, ...) to avoid negative values if pool cools down initially
-                    self.daily_gain = round(max(0.0, temp - self.t_pool_day_start), 2)
+        if temp is not None:
+            # Update daily gain tracking
+            if self.t_pool_day_start is None:
+                # First reading of the day when sun is up and system is active
+                self.t_pool_day_start = temp
+                self.daily_gain = 0.0
+                _LOGGER.info("Starting daily yield tracking. Initial pool temp: %.1f°C", temp)
+            else:
+                # Calculate current yield relative to start of day
+                # We use max(0, ...) to avoid negative values if pool cools down initially
+                self.daily_gain = round(max(0.0, temp - self.t_pool_day_start), 2)
 
-                if temp >= max_temp:
-                    await self._async_set_state(STATE_COOLDOWN, self.explanation_engine.get_status_message("max_temp_reached", temp=temp, max_temp=max_temp))
-                    await self._async_control_pump(False)
-                    return False
-            except ValueError:
-                pass
+            if temp >= max_temp:
+                await self._async_set_state(STATE_COOLDOWN, self.explanation_engine.get_status_message("max_temp_reached", temp=temp, max_temp=max_temp))
+                await self._async_control_pump(False)
+                return False
 
         return True
 
+    async def _async_plan_rules_out_heating(self) -> bool:
+        """Refresh the day plan if needed and check whether it rules out this slot.
+
+        A sweep runs the pump just to measure, so slots where the plan expects
+        no useful heating are skipped. Not during warmup: there every sweep is
+        a learning sample for the policy.
+        """
+        await self._async_refresh_plan()
+        if self.day_plan is None or self.policy.is_warmup:
+            return False
+        if self.day_plan.action_at(utcnow()) != 0:
+            return False
+
+        _LOGGER.debug("Plan del día: sin calentamiento útil en este intervalo, omitiendo barrido")
+        await self._async_set_state(STATE_IDLE, self.explanation_engine.get_status_message("plan_no_heating"))
+        await self._async_control_pump(False)
+        return True
+
+    async def _async_refresh_plan(self) -> None:
+        """Re-plan the rest of the day whenever a new forecast has been fetched."""
+        settings = self.settings
+        forecast = await self.forecast_cache.async_get(self.hass, settings.weather_entity_id)
+        fetched_at = self.forecast_cache.fetched_at
+        if fetched_at == self._plan_forecast_time:
+            return
+        self._plan_forecast_time = fetched_at
+
+        t_pool = settings.read_pool_temp()
+        if not forecast or t_pool is None:
+            self.day_plan = None
+            return
+
+        try:
+            self.day_plan = await self.hass.async_add_executor_job(
+                _make_day_plan,
+                forecast,
+                utcnow(),
+                self.hass.config.latitude,
+                self.hass.config.longitude,
+                settings.scan_interval,
+                t_pool,
+                settings.max_temp,
+                fetched_at,
+                self.thermal_model.pool_model(),
+            )
+        except (ValueError, TypeError, KeyError) as err:
+            _LOGGER.warning("Could not build the day plan from the forecast: %s", err)
+            self.day_plan = None
+            return
+
+        if self.day_plan is not None:
+            _LOGGER.info(
+                "Plan del día actualizado: %d min de calentamiento, ganancia esperada %.1f°C",
+                self.day_plan.heating_minutes,
+                float(self.day_plan.gains.sum()),
+            )
+
     def _estimate_uv_from_elevation(self, elevation: float) -> float:
         """Estimate UV index from sun elevation when no sensor data is available.
         
@@ -461,32 +681,16 @@ class SolarPoolCoordinator(DataUpdateCoordinator[dict[str, Any]]):
         # Clamp to reasonable range (0-12)
         return round(max(0.0, min(12.0, estimated_uv)), 1)
 
-    def _get_sensor_value(self, sensor_id: str | None, default: float | None = None) -> float | None:
-        """Get a numeric value from a sensor entity."""
-        if not sensor_id:
-            return default
-        
-        state = self.hass.states.get(sensor_id)
-        if state and state.state not in ["unknown", "unavailable"]:
-            try:
-                return float(state.state)
-            except (ValueError, TypeError):
-                pass
-        return default
-
     async def _async_gather_context(self) -> dict[str, Any] | None:
         """Gather all required sensor data for the AI."""
         try:
-            pool_sensor = self.entry.data.get(CONF_POOL_SENSOR_ID)
-            return_sensor = self.entry.data.get(CONF_RETURN_SENSOR_ID)
-            weather_entity = self.entry.data.get(CONF_WEATHER_ENTITY_ID)
+            settings = self.settings
+            t_pool = settings.read_pool_temp()
+            t_return = settings.read_return_temp()
+            weather_state = self.hass.states.get(settings.weather_entity_id)
 
-            pool_state = self.hass.states.get(pool_sensor)
-            return_state = self.hass.states.get(return_sensor)
-            weather_state = self.hass.states.get(weather_entity)
-
-            if not (pool_state and return_state and weather_state):
-                _LOGGER.error("One or more entities not found")
+            if t_pool is None or t_return is None or weather_state is None:
+                _LOGGER.error("One or more entities not found or unavailable")
                 return None
 
             # Gather sun data
@@ -494,24 +698,11 @@ class SolarPoolCoordinator(DataUpdateCoordinator[dict[str, Any]]):
             sun_elevation = sun_state_obj.attributes.get("elevation", 0) if sun_state_obj else 0
             sun_azimuth = sun_state_obj.attributes.get("azimuth", 0) if sun_state_obj else 0
 
-            # Get optional sensor overrides (from options first, then data for backwards compat)
-            uv_sensor = self.entry.options.get(CONF_UV_SENSOR_ID, self.entry.data.get(CONF_UV_SENSOR_ID))
-            cloud_sensor = self.entry.options.get(CONF_CLOUD_COVERAGE_SENSOR_ID, self.entry.data.get(CONF_CLOUD_COVERAGE_SENSOR_ID))
-            wind_sensor = self.entry.options.get(CONF_WIND_SENSOR_ID, self.entry.data.get(CONF_WIND_SENSOR_ID))
-            ambient_sensor = self.entry.options.get(CONF_AMBIENT_TEMP_SENSOR_ID, self.entry.data.get(CONF_AMBIENT_TEMP_SENSOR_ID))
-
-            # Cloud coverage: Get from sensor if configured
-            cloud_coverage = self._get_sensor_value(cloud_sensor)
-            if cloud_coverage is None:
-                # Try weather entity attributes (some weather integrations have this)
-                cloud_coverage = weather_state.attributes.get("cloud_coverage", 0)
-            
-            # Clamp cloud coverage to 0-100 range
-            cloud_coverage = max(0, min(100, cloud_coverage or 0))
+            cloud_coverage = self._read_cloud_coverage(weather_state.attributes)
 
             # UV Index: Priority is sensor > weather attribute > estimation
             # IMPORTANT: If a sensor returns 0, that's valid data (cloudy day), don't override!
-            uv_index_raw = self._get_sensor_value(uv_sensor)
+            uv_index_raw = settings.read_uv()
             uv_source = "sensor" if uv_index_raw is not None else None
             
             if uv_index_raw is None:
@@ -546,18 +737,15 @@ class SolarPoolCoordinator(DataUpdateCoordinator[dict[str, Any]]):
                     _LOGGER.debug("UV from %s: %.1f", uv_source, uv_index)
 
             # Wind speed: Priority is sensor > weather attribute
-            wind_speed = self._get_sensor_value(wind_sensor)
+            wind_speed = settings.read_wind()
             if wind_speed is None:
                 wind_speed = weather_state.attributes.get("wind_speed", 0)
 
-            # Ambient temperature: Priority is sensor > weather attribute
-            temperature_ext = self._get_sensor_value(ambient_sensor)
-            if temperature_ext is None:
-                temperature_ext = weather_state.attributes.get("temperature")
+            temperature_ext = self._read_ambient_temp(weather_state.attributes)
 
             return {
-                "t_pool": float(pool_state.state),
-                "t_return": float(return_state.state),
+                "t_pool": t_pool,
+                "t_return": t_return,
                 "weather_state": weather_state.state,
                 "temperature_ext": temperature_ext,
                 "wind_speed": wind_speed,
@@ -572,6 +760,30 @@ class SolarPoolCoordinator(DataUpdateCoordinator[dict[str, Any]]):
             _LOGGER.error("Error parsing sensor data: %s", err)
             return None
 
+    def _read_cloud_coverage(self, weather_attributes: Mapping[str, Any]) -> float:
+        """Cloud coverage (0-100 %): sensor if configured, else the weather entity's attribute."""
+        cloud_coverage = self.settings.read_cloud_coverage()
+        if cloud_coverage is None:
+            # Try weather entity attributes (some weather integrations have this)
+            cloud_coverage = weather_attributes.get("cloud_coverage", 0)
+        return max(0, min(100, cloud_coverage or 0))
+
+    def _read_ambient_temp(self, weather_attributes: Mapping[str, Any]) -> float | None:
+        """Ambient temperature: sensor if configured, else the weather entity's attribute."""
+        temperature_ext = self.settings.read_ambient_temp()
+        if temperature_ext is None:
+            temperature_ext = weather_attributes.get("temperature")
+        return temperature_ext
+
+    def current_conditions(self) -> dict[str, Any]:
+        """Current ambient temperature and cloud coverage, for what-if rows that omit them."""
+        weather_state = self.hass.states.get(self.settings.weather_entity_id)
+        attributes = weather_state.attributes if weather_state is not None else {}
+        return {
+            "temperature_ext": self._read_ambient_temp(attributes),
+            "cloud_coverage": self._read_cloud_coverage(attributes),
+        }
+
     def _get_performance_summary(self) -> list[dict[str, Any]]:
         """Get a summary of recent cycle performance for the AI."""
         summary = []
@@ -592,30 +804,284 @@ class SolarPoolCoordinator(DataUpdateCoordinator[dict[str, Any]]):
                 })
         return summary
 
-    async def _async_update_cycle_history(self, current_pool_temp: float) -> None:
-        """Update cycle history with actual performance data and RL feedback."""
-        # Si hay un ciclo previo en el historial, calcular su ganancia real y dar feedback al RL
-        if self.cycle_history and self.cycle_history[-1].get("actual_gain") is None:
-            last_cycle = self.cycle_history[-1]
-            actual_gain = current_pool_temp - last_cycle["t_pool_start"]
-            last_cycle["actual_gain"] = round(actual_gain, 2)
-            
-            # Calculate reward and update RL agent
-            heating_duration = last_cycle.get("heating_duration", 0)
-            reward = self.rl_agent.calculate_reward(
-                actual_gain=actual_gain,
-                duration_minutes=heating_duration,
+    @callback
+    def _schedule_outcome_measurement(self, heating_duration: int) -> None:
+        """Schedule the gain measurement of the latest cycle.
+
+        It runs when the heating window ends plus the settle delay. If the next
+        cycle starts first, that cycle measures it instead (window cut short).
+        """
+        self._cancel_outcome_measurement()
+        delay_minutes = heating_duration + self.settings.settle_delay
+        self._outcome_timer = async_call_later(
+            self.hass, delay_minutes * 60, self._async_measure_cycle_outcome
+        )
+
+    @callback
+    def _cancel_outcome_measurement(self) -> None:
+        """Cancel a pending gain measurement, if any."""
+        if self._outcome_timer:
+            self._outcome_timer()
+            self._outcome_timer = None
+
+    async def _async_measure_cycle_outcome(self, _now: datetime | None = None) -> None:
+        """Measure the pending cycle once its heating window has settled."""
+        self._outcome_timer = None
+        t_pool = self.settings.read_pool_temp()
+        if t_pool is None:
+            _LOGGER.warning("Pool sensor unavailable, cycle gain will be measured at the next cycle")
+            return
+        if self._apply_cycle_outcome(t_pool):
+            await self._async_maintain_checkpoints()
+            self._persist_learning()
+
+    def _apply_cycle_outcome(self, current_pool_temp: float) -> bool:
+        """Close the pending cycle with its measured gain and give RL feedback.
+
+        The reward uses the net gain: measured change minus the passive change
+        the thermal model expects without pumping (solar gain and losses), so
+        the policy is only credited for what pumping added.
+
+        Returns:
+            Whether a pending cycle was closed
+        """
+        if not self.cycle_history or self.cycle_history[-1].get("actual_gain") is not None:
+            return False
+        self._cancel_outcome_measurement()
+
+        last_cycle = self.cycle_history[-1]
+        conditions = last_cycle["conditions"]
+        actual_gain = current_pool_temp - last_cycle["t_pool_start"]
+        last_cycle["actual_gain"] = round(actual_gain, 2)
+        
+        # Minutes actually pumped: the window may have been cut short by the next cycle
+        heating_duration = last_cycle.get("heating_duration", 0)
+        passive_gain = 0.0
+        started = parse_datetime(last_cycle.get("timestamp", ""))
+        if started is not None:
+            window_minutes = (utcnow() - started).total_seconds() / 60
+            heating_duration = min(heating_duration, int(window_minutes))
+            passive_gain = self.thermal_model.predict_gain(conditions, 0, window_minutes)
+            # Teach the thermal model how this pool responded over the window
+            self.thermal_model.observe_cycle(conditions, heating_duration, window_minutes, actual_gain)
+        net_gain = actual_gain - passive_gain
+        last_cycle["net_gain"] = round(net_gain, 2)
+        
+        # Calculate reward and let the policy learn from the transition
+        reward = calculate_reward(
+            actual_gain=net_gain,
+            duration_minutes=heating_duration,
+        )
+        # With the sun down no decision follows today: the transition ends the day
+        sun_state = self.hass.states.get("sun.sun")
+        terminal = sun_state is not None and (
+            sun_state.state != "above_horizon" or sun_state.attributes.get("elevation", 0) < 5
+        )
+        action_index = last_cycle.get("action_index")
+        if action_index is not None and last_cycle.get("policy", self.policy.name) == self.policy.name:
+            self.policy.observe(
+                Transition(context=conditions, action=action_index, reward=reward, terminal=terminal)
             )
-            self.rl_agent.update(reward=reward)
-            self.last_reward = reward
-            
+            self.metrics.q_updates.inc()
+            self.checkpoints.record_reward(reward)
+        else:
+            _LOGGER.debug("Cycle was decided by another policy/version, skipping learning update")
+        self.last_reward = reward
+        last_cycle["reward"] = reward
+        self.metrics.rewards.observe(reward)
+        self.tracer.outcome(
+            utcnow(),
+            actual_gain=last_cycle["actual_gain"],
+            net_gain=last_cycle["net_gain"],
+            passive_gain=round(passive_gain, 2),
+            heated_minutes=heating_duration,
+            reward=reward,
+            terminal=terminal,
+        )
+        
+        _LOGGER.debug(
+            "RL Feedback: expected=%.1f°C, actual=%.1f°C, passive=%.1f°C, duration=%dmin, reward=%.2f",
+            last_cycle.get("expected_delta", 0),
+            actual_gain,
+            passive_gain,
+            heating_duration,
+            reward,
+        )
+        return True
+
+    def _persist_learning(self) -> None:
+        """Persist cycle history, policy state and thermal model.
+
+        New containers each time: async_update_entry skips writes when data compares equal.
+        """
+        self._policy_states = {**self._policy_states, self.policy.name: self.policy.to_dict()}
+        new_data = {
+            key: value
+            for key, value in self.entry.data.items()
+            if key not in (CONF_Q_TABLE, CONF_RL_EPISODE_COUNT)  # Migrated to CONF_POLICY_STATES
+        }
+        new_data[CONF_CYCLE_HISTORY] = list(self.cycle_history)
+        new_data[CONF_POLICY_STATES] = self._policy_states
+        new_data[CONF_THERMAL_MODEL] = self.thermal_model.to_dict()
+        self.hass.config_entries.async_update_entry(self.entry, data=new_data)
+        self.metrics.persist_writes.inc()
+        self.metrics.persisted_size = None  # Re-measured on the next scrape
+
+    async def _async_maintain_checkpoints(self) -> None:
+        """Roll back after a reward drop, otherwise save a checkpoint when one is due."""
+        policy = self.policy
+        if policy.name in NOT_CHECKPOINTED:
+            return
+        checkpoints = self.checkpoints
+        try:
+            await checkpoints.async_load()
+            if checkpoints.reward_dropped:
+                checkpoint_id = await checkpoints.async_last_good(policy.name)
+                # Rewards that stay low after a rollback are the weather, not the policy
+                if checkpoint_id is not None and checkpoint_id != self._last_rollback_id:
+                    self._last_rollback_id = checkpoint_id
+                    await self.async_rollback(checkpoint_id, automatic=True)
+                    return
+                if not self._rollback_warned:
+                    _LOGGER.warning(
+                        "Recompensa promedio %.2f bajo el umbral, pero no hay un checkpoint bueno de '%s'",
+                        checkpoints.rolling_reward,
+                        policy.name,
+                    )
+                    self._rollback_warned = True
+            else:
+                self._rollback_warned = False
+            if checkpoints.due(policy.name, policy.episode_count):
+                await checkpoints.async_save(
+                    policy.name, policy.to_dict(), policy.episode_count, utcnow(), "periodic"
+                )
+                self.metrics.checkpoints.inc()
+        except OSError as err:
+            _LOGGER.warning("No se pudo guardar el checkpoint de la política: %s", err)
+
+    async def async_rollback(self, checkpoint_id: int | None = None, automatic: bool = False) -> dict[str, Any] | None:
+        """Restore the policy state of a checkpoint.
+
+        On a manual rollback the current state is checkpointed first, so it
+        can be undone; an automatic one discards the degraded state. A
+        checkpoint of another policy replaces that policy's saved state and is
+        used the next time it is selected.
+
+        Args:
+            checkpoint_id: Checkpoint to restore (None: newest of the active policy)
+            automatic: Triggered by a reward drop
+
+        Returns:
+            Metadata of the restored checkpoint, or None if it does not exist
+        """
+        checkpoints = self.checkpoints
+        await checkpoints.async_load()
+        if checkpoint_id is None:
+            own = [meta for meta in await checkpoints.async_list() if meta["policy"] == self.policy.name]
+            if not own:
+                return None
+            checkpoint_id = own[-1]["id"]
+        restored = await checkpoints.async_restore(checkpoint_id)
+        if restored is None:
+            return None
+        meta, state = restored
+
+        if meta["policy"] == self.policy.name:
+            current = self.policy
+            if not automatic:
+                await checkpoints.async_save(
+                    current.name, current.to_dict(), current.episode_count, utcnow(), "before_rollback"
+                )
+            self.policy = self._create_policy(meta["policy"], state)
+        else:
+            self._policy_states = {**self._policy_states, meta["policy"]: state}
+        checkpoints.rewards.clear()
+        self._persist_learning()
+        self.metrics.rollbacks.inc()
+        _LOGGER.warning(
+            "Política '%s' restaurada al checkpoint %d (episodio %d, %s)%s",
+            meta["policy"],
+            meta["id"],
+            meta["episode_count"],
+            meta["created"],
+            " por caída de la recompensa" if automatic else "",
+        )
+        return meta
+
+    async def async_simulate(
+        self, contexts: list[dict[str, Any]], pump_run_minutes: float | None = None
+    ) -> list[dict[str, Any]]:
+        """What the active policy and the safety overrides would decide for each context.
+
+        Runs in the executor on copies of the policy and the thermal model (a
+        10k-row grid takes a few hundred ms), so live decisions and learning
+        are never touched. Expected gains come from the thermal model, like
+        the live cycle's.
+        See ``what_if.simulate_decisions``.
+        """
+        policy = create_policy(self.policy.name, self.policy.to_dict())
+        thermal_model = ThermalModel.from_dict(self.thermal_model.to_dict())
+        scan_interval = self.settings.scan_interval
+        return await self.hass.async_add_executor_job(
+            simulate_decisions,
+            policy,
+            ExplanationEngine(self.settings.language),
+            contexts,
+            lambda context, minutes: thermal_model.predict_gain(context, minutes, max(minutes, scan_interval)),
+            self.settings.min_run_time,
+            pump_run_minutes,
+        )
+
+    def q_learning_state(self) -> dict[str, Any] | None:
+        """Q-learning state of the entry: the live agent's, or the saved one if another policy is active."""
+        if self.policy.name == POLICY_Q_LEARNING:
+            return self.policy.to_dict()
+        return self._policy_states.get(POLICY_Q_LEARNING)
+
+    async def async_import_agent(self, state: dict[str, Any], source: str) -> None:
+        """Replace the Q-learning state with an imported one.
+
+        The current state is checkpointed first ("before_import"), so a
+        rollback undoes the import. If another policy is active the imported
+        state is used the next time Q-learning is selected.
+
+        Args:
+            state: Q-table, visit counts and episode count (see agent_transfer)
+            source: Where it came from, for the log
+        """
+        current = self.q_learning_state()
+        if current is not None:
+            await self.checkpoints.async_save(
+                POLICY_Q_LEARNING, current, current.get("episode_count", 0), utcnow(), "before_import"
+            )
+        # Keep this entry's generator and return mode
+        imported = {**(current or {}), **state}
+        if self.policy.name == POLICY_Q_LEARNING:
+            self.policy = self._create_policy(POLICY_Q_LEARNING, imported)
+            self.checkpoints.rewards.clear()
+        else:
+            self._policy_states = {**self._policy_states, POLICY_Q_LEARNING: imported}
+        self._persist_learning()
+        _LOGGER.warning(
+            "Agente Q-learning importado de %s (episodio %d)", source, imported.get("episode_count", 0)
+        )
+
+    def apply_fleet_prior(self, prior: Any, prior_visits: Any) -> None:
+        """Apply the fleet's merged Q-table to this entry's policy, persisting it if it changed."""
+        result = apply_fleet_prior(self.policy, prior, prior_visits)
+        if result["episodes_credited"]:
             _LOGGER.info(
-                "RL Feedback: expected=%.1f°C, actual=%.1f°C, duration=%dmin, reward=%.2f",
-                last_cycle.get("expected_delta", 0),
-                actual_gain,
-                heating_duration,
-                reward,
+                "Política arrancada con lo aprendido por la flota: %d episodios de warmup acreditados",
+                result["episodes_credited"],
             )
+        if result["cells"] or result["episodes_credited"]:
+            self._persist_learning()
+
+    async def _async_update_cycle_history(self, current_pool_temp: float) -> None:
+        """Update cycle history with actual performance data and RL feedback."""
+        # Si el ciclo previo no se midió todavía, cerrarlo ahora y dar feedback al RL
+        if self._apply_cycle_outcome(current_pool_temp):
+            await self._async_maintain_checkpoints()
 
         # Añadir el ciclo actual al historial
         if self.current_cycle_data:
@@ -625,16 +1091,7 @@ class SolarPoolCoordinator(DataUpdateCoordinator[dict[str, Any]]):
             if len(self.cycle_history) > 10:
                 self.cycle_history = self.cycle_history[-10:]
             
-            # Persist both cycle history and RL agent state
-            rl_state = self.rl_agent.to_dict()
-            new_data = {
-                **self.entry.data,
-                CONF_CYCLE_HISTORY: self.cycle_history,
-                CONF_Q_TABLE: rl_state["q_table"],
-                CONF_RL_EPISODE_COUNT: rl_state["episode_count"],
-            }
-            self.hass.config_entries.async_update_entry(self.entry, data=new_data)
-            
+            self._persist_learning()
             self.current_cycle_data = None
 
     async def _async_set_state(self, state: str, reasoning: str) -> None:
@@ -646,14 +1103,16 @@ class SolarPoolCoordinator(DataUpdateCoordinator[dict[str, Any]]):
 
     async def _async_stop_heating(self, _now: datetime | None = None) -> None:
         """Stop heating cycle after duration expires."""
-        _LOGGER.info("Duración de calentamiento completada, apagando bomba")
+        _LOGGER.debug("Duración de calentamiento completada, apagando bomba")
         await self._async_set_state(STATE_IDLE, self.explanation_engine.get_status_message("heating_complete"))
         await self._async_control_pump(False)
         self._heating_timer = None
+        self.pump_is_heating = False
+        self.heating_start_time = None
 
     async def _async_control_pump(self, turn_on: bool) -> None:
         """Control the pool pump with shared-pump protection."""
-        pump_entity = self.entry.data.get(CONF_PUMP_ENTITY_ID)
+        pump_entity = self.settings.pump_entity_id
         
         if not pump_entity:
             _LOGGER.error("Pump entity ID not configured!")
@@ -670,7 +1129,7 @@ class SolarPoolCoordinator(DataUpdateCoordinator[dict[str, Any]]):
                 if not self._pump_started_by_us:
                     _LOGGER.debug("Bomba %s ya estaba encendida, SolarPool la usará sin tomar propiedad", pump_entity)
             else:
-                _LOGGER.info("Encendiendo bomba %s (Iniciado por SolarPool)", pump_entity)
+                _LOGGER.debug("Encendiendo bomba %s (Iniciado por SolarPool)", pump_entity)
                 await self.hass.services.async_call("switch", SERVICE_TURN_ON, {"entity_id": pump_entity}, blocking=True)
                 self._pump_started_by_us = True
                 self._last_pump_on_time = utcnow()
@@ -683,21 +1142,26 @@ class SolarPoolCoordinator(DataUpdateCoordinator[dict[str, Any]]):
                 return
 
             if self._pump_started_by_us:
-                _LOGGER.info("Turning OFF pump %s (was started by SolarPool)", pump_entity)
+                _LOGGER.debug("Turning OFF pump %s (was started by SolarPool)", pump_entity)
                 await self.hass.services.async_call("switch", SERVICE_TURN_OFF, {"entity_id": pump_entity}, blocking=True)
+                if self._last_pump_on_time is not None:
+                    self.metrics.pump_on_seconds.inc((utcnow() - self._last_pump_on_time).total_seconds())
                 self._pump_started_by_us = False
                 self._last_pump_on_time = None
             else:
-                _LOGGER.info("SolarPool cycle ended but pump %s was not started by us (filtering?). Keeping it ON.", pump_entity)
+                _LOGGER.debug("SolarPool cycle ended but pump %s was not started by us (filtering?). Keeping it ON.", pump_entity)
                 # We reset our tracking just in case
                 self._last_pump_on_time = None
 
-    async def stop(self):
-        """Stop the coordinator and cleanup."""
-        if self._unsub_interval:
-            self._unsub_interval()
-        if self._heating_timer:
-            self._heating_timer()  # Cancelar timer de calentamiento
+    async def stop(self) -> None:
+        """Stop the coordinator on unload: cancel every timer, flush traces and release the pump."""
+        for cancel in (self._start_timer, self._unsub_interval, self._sweep_timer, self._heating_timer):
+            if cancel:
+                cancel()
+        self._start_timer = self._unsub_interval = self._sweep_timer = self._heating_timer = None
+        self._cancel_outcome_measurement()
+        self.loop_monitor.disable()
+        await self.tracer.async_flush()
         # Always turn off pump on stop for safety if we were heating
         if self.state in [STATE_SWEEPING, STATE_HEATING]:
             await self._async_control_pump(False)
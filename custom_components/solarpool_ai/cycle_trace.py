@@ -0,0 +1,340 @@
+"""Structured per-cycle trace log for SolarPool AI.
+
+Each sampled cycle becomes one JSON line with its phases, the return
+temperature samples of its sweep, sensor readings, the policy's decision, the safety overrides applied, and (once measured)
+the outcome and reward. Records are buffered in memory and written in
+batches from the executor (serialization included), so the event loop only
+builds a small dict per cycle; the file rotates like a RotatingFileHandler.
+
+With ``sample_rate`` below 1 only that fraction of cycles is traced; the
+choice is made when the cycle starts, so unsampled cycles cost nothing.
+Read the files back with ``read_traces`` or from the command line::
+
+    python3 -m custom_components.solarpool_ai.cycle_trace /config/solarpool_ai/traces/ENTRY_ID.jsonl
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import random
+import threading
+from collections.abc import Awaitable, Callable, Iterator
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+_LOGGER = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+BATCH_SIZE = 20  # Records buffered before a write
+FLUSH_INTERVAL = 1800  # Segundos: escribir aunque el lote no esté completo
+MAX_BYTES = 1_000_000  # Size of a file before it rotates
+BACKUP_COUNT = 3  # Rotated files kept (.1 is the newest)
+
+# Context keys stored as readings
+READING_KEYS = (
+    "t_pool",
+    "t_return",
+    "uv_index",
+    "uv_index_raw",
+    "wind_speed",
+    "temperature_ext",
+    "cloud_coverage",
+    "sun_elevation",
+    "weather_state",
+)
+
+_WRITE_LOCK = threading.Lock()
+
+
+def _rotate(path: Path, backups: int) -> None:
+    """Shift path -> path.1 -> ... -> path.N, dropping the oldest."""
+    for index in range(backups - 1, 0, -1):
+        source = path.with_name(f"{path.name}.{index}")
+        if source.exists():
+            source.replace(path.with_name(f"{path.name}.{index + 1}"))
+    if backups > 0:
+        path.replace(path.with_name(f"{path.name}.1"))
+    else:
+        path.unlink()
+
+
+def write_batch(path: Path, records: list[dict[str, Any]], max_bytes: int = MAX_BYTES, backups: int = BACKUP_COUNT) -> int:
+    """Append records as JSON lines, rotating first if the file would overflow.
+
+    Blocking: runs in the executor.
+
+    Returns:
+        Bytes written
+    """
+    data = "".join(json.dumps(record, separators=(",", ":"), default=str) + "\n" for record in records)
+    encoded = data.encode("utf-8")
+    with _WRITE_LOCK:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if path.exists() and path.stat().st_size + len(encoded) > max_bytes:
+            _rotate(path, backups)
+        with open(path, "ab") as trace_file:
+            trace_file.write(encoded)
+    return len(encoded)
+
+
+def trace_files(path: str | Path) -> list[Path]:
+    """Existing trace files of a log, oldest first (rotated ones before the live one)."""
+    path = Path(path)
+    rotated = sorted(
+        (candidate for candidate in path.parent.glob(f"{path.name}.*") if candidate.suffix[1:].isdigit()),
+        key=lambda candidate: -int(candidate.suffix[1:]),
+    )
+    return [*rotated, path] if path.exists() else rotated
+
+
+def read_traces(
+    path: str | Path,
+    start: datetime | None = None,
+    end: datetime | None = None,
+) -> Iterator[dict[str, Any]]:
+    """Stream the records of a trace log (rotated files included), oldest first.
+
+    Args:
+        path: Live trace file
+        start: Only cycles started at or after this time
+        end: Only cycles started before this time
+
+    Yields:
+        One record per traced cycle; unreadable lines are skipped
+    """
+    for trace_path in trace_files(path):
+        with open(trace_path, encoding="utf-8") as trace_file:
+            for line in trace_file:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if start is not None or end is not None:
+                    started = datetime.fromisoformat(record["start"])
+                    if (start is not None and started < start) or (end is not None and started >= end):
+                        continue
+                yield record
+
+
+class CycleTracer:
+    """Builds the trace record of the running cycle and writes them in batches.
+
+    At most one cycle is open and at most one is waiting for its outcome,
+    like the coordinator's own cycle history: a new decision closes the
+    previous pending record even if its gain was never measured.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        run_in_executor: Callable[..., Awaitable[Any]],
+        sample_rate: float = 1.0,
+        entry_id: str | None = None,
+        batch_size: int = BATCH_SIZE,
+        flush_interval: float = FLUSH_INTERVAL,
+        max_bytes: int = MAX_BYTES,
+        backups: int = BACKUP_COUNT,
+    ) -> None:
+        """Initialize the tracer.
+
+        Args:
+            path: Live trace file (created on the first write)
+            run_in_executor: ``hass.async_add_executor_job``
+            sample_rate: Fraction of cycles traced (0 disables tracing)
+            entry_id: Config entry the records belong to
+            batch_size: Records buffered before a write
+            flush_interval: Seconds after which a partial batch is written
+            max_bytes: Size of a file before it rotates
+            backups: Rotated files kept
+        """
+        self.path = Path(path)
+        self.sample_rate = sample_rate
+        self.entry_id = entry_id
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.bytes_written = 0
+        self._run_in_executor = run_in_executor
+        self._rng = random.Random()
+        self._current: dict[str, Any] | None = None
+        self._pending: dict[str, Any] | None = None
+        self._start: datetime | None = None
+        self._buffer: list[dict[str, Any]] = []
+        self._buffer_since: datetime | None = None
+        self._writing: asyncio.Future | None = None
+
+    def start(self, now: datetime, sweep: bool) -> None:
+        """Open the record of a new cycle (if sampled).
+
+        Args:
+            now: Cycle start time
+            sweep: Whether the cycle starts with a sweep (False: pump already heating)
+        """
+        if self.sample_rate <= 0 or (self.sample_rate < 1 and self._rng.random() >= self.sample_rate):
+            self._current = None
+            return
+        self._start = now
+        self._current = {
+            "v": FORMAT_VERSION,
+            "entry_id": self.entry_id,
+            "start": now.isoformat(),
+            "sweep": sweep,
+            "phases": {},
+            "overrides": [],
+        }
+
+    def phase(self, name: str, now: datetime) -> None:
+        """Mark the start of a phase (seconds since the cycle started)."""
+        if self._current is not None:
+            self._current["phases"][name] = round((now - self._start).total_seconds(), 1)
+
+    def sweep_sample(self, now: datetime, t_return: float) -> None:
+        """Store a return temperature read during the sweep, as [seconds, °C]."""
+        if self._current is not None:
+            self._current.setdefault("sweep_trace", []).append(
+                [round((now - self._start).total_seconds(), 1), t_return]
+            )
+
+    def readings(self, context: dict[str, Any]) -> None:
+        """Store the sensor readings the decision was based on."""
+        if self._current is not None:
+            self._current["readings"] = {key: context.get(key) for key in READING_KEYS}
+
+    def override(self, rule: str) -> None:
+        """Note a safety rule that replaced the policy's decision."""
+        if self._current is not None:
+            self._current["overrides"].append(rule)
+
+    def decided(
+        self,
+        policy: str,
+        decision: dict[str, Any],
+        action: str,
+        minutes: int,
+        expected_gain: float,
+        consult_seconds: float,
+    ) -> None:
+        """Close the decision part of the record; it waits for its outcome.
+
+        Args:
+            policy: Policy name
+            decision: The policy's decision (before overrides)
+            action: Final action after overrides ("ON"/"OFF")
+            minutes: Final heating duration
+            expected_gain: Thermal model prediction (°C)
+            consult_seconds: Wall time of the measure-and-consult step
+        """
+        if self._pending is not None:
+            self._finish(self._pending)
+            self._pending = None
+        record = self._current
+        self._current = None
+        if record is None:
+            return
+        record["policy"] = policy
+        record["decision"] = {
+            "action_index": decision.get("action_index"),
+            "minutes": decision.get("heating_duration_minutes", 0),
+            "is_warmup": decision.get("is_warmup", False),
+            "propensity": decision.get("propensity"),
+        }
+        record["action"] = action
+        record["minutes"] = minutes
+        record["expected_gain"] = expected_gain
+        record["consult_ms"] = round(consult_seconds * 1000, 3)
+        self._pending = record
+
+    def outcome(self, now: datetime, **outcome: Any) -> None:
+        """Attach the measured outcome to the pending record and queue it."""
+        record = self._pending
+        self._pending = None
+        if record is None:
+            return
+        record["phases"]["outcome"] = round((now - datetime.fromisoformat(record["start"])).total_seconds(), 1)
+        record["outcome"] = outcome
+        self._finish(record, now)
+
+    def _finish(self, record: dict[str, Any], now: datetime | None = None) -> None:
+        """Buffer a complete record, writing the batch when due."""
+        self._buffer.append(record)
+        now = now or datetime.fromisoformat(record["start"])
+        if self._buffer_since is None:
+            self._buffer_since = now
+        if len(self._buffer) >= self.batch_size or (now - self._buffer_since).total_seconds() >= self.flush_interval:
+            self._schedule_write()
+
+    def _schedule_write(self) -> None:
+        """Hand the buffer to the executor (one write in flight at a time)."""
+        if not self._buffer or self._writing is not None:
+            return
+        records, self._buffer, self._buffer_since = self._buffer, [], None
+        self._writing = asyncio.ensure_future(self._async_write(records))
+
+    async def _async_write(self, records: list[dict[str, Any]]) -> None:
+        """Write one batch in the executor, then the next one if it filled up meanwhile."""
+        try:
+            self.bytes_written += await self._run_in_executor(
+                write_batch, self.path, records, self.max_bytes, self.backups
+            )
+        except OSError as err:
+            _LOGGER.warning("No se pudo escribir el trace de ciclos %s: %s", self.path, err)
+        finally:
+            self._writing = None
+        if len(self._buffer) >= self.batch_size:
+            self._schedule_write()
+
+    async def async_flush(self) -> None:
+        """Write everything buffered, including a pending cycle without outcome."""
+        if self._pending is not None:
+            self._buffer.append(self._pending)
+            self._pending = None
+        while self._writing is not None:
+            await self._writing
+        self._schedule_write()
+        if self._writing is not None:
+            await self._writing
+
+
+def summarize(records: list[dict[str, Any]]) -> dict[str, Any]:
+    """Headline numbers of a list of trace records."""
+    measured = [record for record in records if "outcome" in record]
+    rewards = [record["outcome"].get("reward", 0.0) for record in measured]
+    overrides: dict[str, int] = {}
+    for record in records:
+        for rule in record.get("overrides", []):
+            overrides[rule] = overrides.get(rule, 0) + 1
+    return {
+        "cycles": len(records),
+        "heating": sum(1 for record in records if record.get("action") == "ON"),
+        "measured": len(measured),
+        "mean_reward": sum(rewards) / len(rewards) if rewards else None,
+        "overrides": overrides,
+        "first": records[0]["start"] if records else None,
+        "last": records[-1]["start"] if records else None,
+    }
+
+
+def main() -> None:
+    """Print a summary (or the records, with --records) of a trace log."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Summarize a SolarPool AI cycle trace log")
+    parser.add_argument("path", help="Live trace file (rotated files are read too)")
+    parser.add_argument("--start", type=datetime.fromisoformat, help="ISO time, inclusive")
+    parser.add_argument("--end", type=datetime.fromisoformat, help="ISO time, exclusive")
+    parser.add_argument("--records", action="store_true", help="Print the records as JSON lines")
+    args = parser.parse_args()
+
+    records = read_traces(args.path, args.start, args.end)
+    if args.records:
+        for record in records:
+            print(json.dumps(record))
+        return
+    print(json.dumps(summarize(list(records)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""Diagnostics support for SolarPool AI."""
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN
+from .coordinator import SolarPoolCoordinator
+from .fleet import DATA_FLEET
+
+
+async def async_get_config_entry_diagnostics(hass: HomeAssistant, entry: ConfigEntry) -> dict[str, Any]:
+    """Return diagnostics for a config entry.
+
+    Learned state (Q-tables, thermal model) is summarized, not dumped.
+    """
+    coordinator: SolarPoolCoordinator = hass.data[DOMAIN][entry.entry_id]
+    policy = coordinator.policy
+    return {
+        "options": dict(entry.options),
+        "settings": repr(coordinator.settings),
+        "state": coordinator.state,
+        "enabled": coordinator.enabled,
+        "policy": {
+            "name": policy.name,
+            "episode_count": policy.episode_count,
+            "is_warmup": policy.is_warmup,
+            "exploration_rate": policy.exploration_rate,
+        },
+        "thermal_model_calibrated": coordinator.thermal_model.is_calibrated,
+        "cycle_history_length": len(coordinator.cycle_history),
+        "checkpoints": {
+            "rolling_reward": coordinator.checkpoints.rolling_reward,
+            "rollback_threshold": coordinator.checkpoints.rollback_threshold,
+        },
+        "loop_monitor": coordinator.loop_monitor.as_dict(),
+        "fleet": fleet.as_dict() if (fleet := hass.data.get(DATA_FLEET)) else None,
+    }
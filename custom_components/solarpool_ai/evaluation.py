@@ -0,0 +1,185 @@
+"""Off-policy evaluation of candidate Q-tables from logged cycles.
+
+Estimates how a greedy (or epsilon-greedy) policy over a candidate Q-table
+would have done on cycles that were actually decided by another policy,
+without running it on a pool. Each cycle's reward is measured right after
+its own heating window, so the cycles are evaluated as independent
+contextual-bandit samples:
+
+- Inverse propensity scoring (IPS) reweights each logged reward by
+  ``π(a|s) / μ(a|s)``, the candidate's over the logging policy's probability.
+- Self-normalized IPS divides by the sum of the weights (lower variance).
+- Doubly robust (DR) adds a per-(state, action) reward model and only
+  reweights its residuals, so it stays usable when few logged actions
+  match the candidate's.
+
+Every estimator is vectorized over the logged cycles and the candidates.
+"""
+from __future__ import annotations
+
+from collections.abc import Iterable
+from typing import Any, NamedTuple
+
+import numpy as np
+
+from .const import RL_ACTIONS
+from .rl_agent import RLAgent
+
+# Candidates evaluated per pass, bounds memory to chunk * cycles * actions floats
+CANDIDATE_CHUNK = 64
+# Pseudo-observations of the per-action mean in the reward model
+PRIOR_WEIGHT = 1.0
+
+
+class LoggedCycles(NamedTuple):
+    """Logged decisions as parallel arrays.
+
+    Attributes:
+        states: Discrete state of each cycle (RLAgent.discretize_states)
+        actions: Index into RL_ACTIONS that was executed
+        propensities: Probability the logging policy had of choosing it
+        rewards: Reward measured for the cycle
+    """
+
+    states: np.ndarray
+    actions: np.ndarray
+    propensities: np.ndarray
+    rewards: np.ndarray
+
+
+class OffPolicyEstimate(NamedTuple):
+    """Estimated value (mean reward per cycle) of each candidate.
+
+    Attributes:
+        ips: Inverse propensity scoring estimate
+        snips: Self-normalized IPS estimate
+        doubly_robust: Doubly robust estimate
+        stderr: Standard error of the doubly robust estimate
+        effective_samples: Effective sample size of the importance weights
+    """
+
+    ips: np.ndarray
+    snips: np.ndarray
+    doubly_robust: np.ndarray
+    stderr: np.ndarray
+    effective_samples: np.ndarray
+
+
+def logged_cycles(cycles: Iterable[dict[str, Any]]) -> LoggedCycles:
+    """Build LoggedCycles from coordinator cycle records.
+
+    Records without a reward or propensity (still pending, or decided by a
+    version that did not log them) and cycles whose action was overridden by
+    the safety rules are skipped: their reward does not belong to the logged
+    action.
+
+    Args:
+        cycles: Dicts with conditions, action_index, propensity and reward
+    """
+    usable = [
+        cycle
+        for cycle in cycles
+        if cycle.get("reward") is not None
+        and cycle.get("propensity")
+        and cycle.get("action_index") is not None
+        and not cycle.get("overridden", False)
+    ]
+    return LoggedCycles(
+        states=RLAgent.discretize_states([cycle["conditions"] for cycle in usable]).astype(np.int64),
+        actions=np.array([cycle["action_index"] for cycle in usable], dtype=np.int64),
+        propensities=np.array([cycle["propensity"] for cycle in usable], dtype=float),
+        rewards=np.array([cycle["reward"] for cycle in usable], dtype=float),
+    )
+
+
+def target_probabilities(q_tables: np.ndarray, states: np.ndarray, epsilon: float = 0.0) -> np.ndarray:
+    """Action probabilities of epsilon-greedy policies over candidate tables.
+
+    Args:
+        q_tables: Candidate tables, shape (candidates, states, actions)
+        states: Discrete states, shape (n,)
+        epsilon: Random-action probability of the candidates (0 = greedy)
+
+    Returns:
+        Array of shape (candidates, n, actions)
+    """
+    num_actions = q_tables.shape[-1]
+    greedy = np.argmax(q_tables[:, states], axis=-1)
+    probabilities = np.full(greedy.shape + (num_actions,), epsilon / num_actions)
+    np.put_along_axis(probabilities, greedy[..., None], 1 - epsilon + epsilon / num_actions, axis=-1)
+    return probabilities
+
+
+def reward_model(
+    logged: LoggedCycles,
+    num_states: int,
+    num_actions: int = len(RL_ACTIONS),
+    prior_weight: float = PRIOR_WEIGHT,
+) -> np.ndarray:
+    """Mean logged reward per (state, action), shrunk towards the action mean.
+
+    Pairs that were never logged get the mean reward of their action over
+    all states, so the doubly robust estimate has a prediction everywhere.
+
+    Returns:
+        Array of shape (num_states, num_actions)
+    """
+    sums = np.zeros((num_states, num_actions))
+    counts = np.zeros((num_states, num_actions))
+    np.add.at(sums, (logged.states, logged.actions), logged.rewards)
+    np.add.at(counts, (logged.states, logged.actions), 1)
+
+    action_counts = counts.sum(axis=0)
+    overall = logged.rewards.mean() if len(logged.rewards) else 0.0
+    action_means = np.where(action_counts > 0, sums.sum(axis=0) / np.maximum(action_counts, 1), overall)
+    return (sums + prior_weight * action_means) / (counts + prior_weight)
+
+
+def evaluate(
+    logged: LoggedCycles,
+    q_tables: Any,
+    epsilon: float = 0.0,
+    rewards_hat: np.ndarray | None = None,
+) -> OffPolicyEstimate:
+    """Estimate the value of candidate Q-tables on logged cycles.
+
+    Args:
+        logged: Logged cycles with the logging policy's propensities
+        q_tables: One table (states, actions) or many (candidates, states, actions)
+        epsilon: Random-action probability the candidates would run with
+        rewards_hat: Reward model for the doubly robust estimate
+            (defaults to reward_model fitted on the same log)
+
+    Returns:
+        Estimates with one entry per candidate
+    """
+    tables = np.asarray(q_tables, dtype=float)
+    if tables.ndim == 2:
+        tables = tables[None]
+    if len(logged.rewards) == 0:
+        empty = np.full(len(tables), np.nan)
+        return OffPolicyEstimate(empty, empty, empty, empty, np.zeros(len(tables)))
+    if rewards_hat is None:
+        rewards_hat = reward_model(logged, tables.shape[1], tables.shape[2])
+
+    n = len(logged.rewards)
+    cycles = np.arange(n)
+    predicted = rewards_hat[logged.states]  # (n, actions)
+    residuals = logged.rewards - predicted[cycles, logged.actions]
+
+    results = []
+    for start in range(0, len(tables), CANDIDATE_CHUNK):
+        probabilities = target_probabilities(tables[start:start + CANDIDATE_CHUNK], logged.states, epsilon)
+        weights = probabilities[:, cycles, logged.actions] / logged.propensities  # (chunk, n)
+        weight_sums = weights.sum(axis=1)
+        terms = (probabilities * predicted).sum(axis=-1) + weights * residuals
+        results.append(
+            (
+                (weights * logged.rewards).mean(axis=1),
+                np.where(weight_sums > 0, (weights * logged.rewards).sum(axis=1) / np.maximum(weight_sums, 1e-12), np.nan),
+                terms.mean(axis=1),
+                terms.std(axis=1, ddof=1) / np.sqrt(n) if n > 1 else np.zeros(len(terms)),
+                weight_sums**2 / np.maximum((weights**2).sum(axis=1), 1e-12),
+            )
+        )
+    return OffPolicyEstimate(*(np.concatenate(parts) for parts in zip(*results)))
@@ -12,13 +12,15 @@ from .translations import get_template, get_text
 class ExplanationEngine:
     """Engine for generating human-readable explanations."""
     
-    def __init__(self, language: str = "es") -> None:
+    def __init__(self, language: str = "es", rng: Any = None) -> None:
         """Initialize the explanation engine.
         
         Args:
             language: Language code ("es" or "en")
+            rng: numpy Generator used to vary the wording (optional)
         """
         self.language = language
+        self.rng = rng
     
     def set_language(self, language: str) -> None:
         """Set the language for explanations."""
@@ -50,19 +52,19 @@ class ExplanationEngine:
         
         # Warmup phase - using deterministic rules
         if is_warmup:
-            return get_template("warmup", self.language)
+            return get_template("warmup", self.language, rng=self.rng)
         
         # Learning/exploration mode
         if is_learning and action == "ON":
-            return get_template("on_learning", self.language)
+            return get_template("on_learning", self.language, rng=self.rng)
         
         # Decision is ON
         if action == "ON":
             # Check if conditions are optimal
             if uv >= 6 and wind < 15 and delta >= 4:
-                return get_template("on_optimal", self.language)
+                return get_template("on_optimal", self.language, rng=self.rng)
             else:
-                return get_template("on_marginal", self.language)
+                return get_template("on_marginal", self.language, rng=self.rng)
         
         # Decision is OFF - determine the main reason
         return self._get_off_reason(delta, wind, uv, elevation, weather)
@@ -81,30 +83,30 @@ class ExplanationEngine:
         """
         # Priority 1: Low delta T (most critical)
         if delta < 2.0:
-            return get_template("off_delta", self.language, delta=delta)
+            return get_template("off_delta", self.language, rng=self.rng, delta=delta)
         
         # Priority 2: Low sun elevation
         if elevation < 10:
-            return get_template("off_low_sun", self.language, elevation=elevation)
+            return get_template("off_low_sun", self.language, rng=self.rng, elevation=elevation)
         
         # Priority 3: High wind
         if wind > 25:
-            return get_template("off_wind", self.language, wind=wind)
+            return get_template("off_wind", self.language, rng=self.rng, wind=wind)
         
         # Priority 4: Low UV
         if uv < 3:
-            return get_template("off_low_uv", self.language, uv=uv)
+            return get_template("off_low_uv", self.language, rng=self.rng, uv=uv)
         
         # Priority 5: Cloudy weather
         if weather in ["cloudy", "rainy", "pouring", "fog"]:
-            return get_template("off_clouds", self.language)
+            return get_template("off_clouds", self.language, rng=self.rng)
         
         # Default: wind (moderate but factor)
         if wind > 15:
-            return get_template("off_wind", self.language, wind=wind)
+            return get_template("off_wind", self.language, rng=self.rng, wind=wind)
         
         # Fallback
-        return get_template("off_delta", self.language, delta=delta)
+        return get_template("off_delta", self.language, rng=self.rng, delta=delta)
     
     def get_status_message(self, key: str, **kwargs) -> str:
         """Get a translated status message.
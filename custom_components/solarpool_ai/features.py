@@ -0,0 +1,81 @@
+"""Continuous context features for SolarPool AI policies.
+
+The tabular agent bins delta, UV, wind and elevation into 144 states and
+ignores the ambient temperature and cloud cover. Function-approximation
+policies use these scaled continuous features instead.
+"""
+from __future__ import annotations
+
+from typing import Any
+
+import numpy as np
+
+# Order of the columns returned by context_matrix
+FEATURE_NAMES: tuple[str, ...] = (
+    "bias",
+    "delta",
+    "uv_index",
+    "wind_speed",
+    "sun_elevation",
+    "temperature_ext",
+    "cloud_coverage",
+    "delta_x_uv",
+)
+NUM_FEATURES = len(FEATURE_NAMES)
+
+# Raw value = (value - offset) / scale, so typical values land in about [-1, 1]
+_OFFSET = np.array([0.0, 0.0, 0.0, 0.0, 0.0, 20.0, 0.0, 0.0])
+_SCALE = np.array([1.0, 10.0, 10.0, 30.0, 90.0, 10.0, 100.0, 100.0])
+
+# Value used when an optional reading is missing (None) in a context
+_DEFAULT_TEMPERATURE_EXT = 20.0
+
+# Columns of raw_columns and their expected range (values outside are clipped
+# by the backends that partition this space)
+RAW_COLUMNS: tuple[str, ...] = (
+    "delta",
+    "uv_index",
+    "wind_speed",
+    "sun_elevation",
+    "temperature_ext",
+    "cloud_coverage",
+)
+RAW_LOW = np.array([-5.0, 0.0, 0.0, 0.0, 0.0, 0.0])
+RAW_HIGH = np.array([15.0, 12.0, 50.0, 90.0, 40.0, 100.0])
+
+
+def raw_columns(contexts: list[dict[str, Any]]) -> np.ndarray:
+    """Extract the unscaled context readings as an (n, 6) array.
+
+    Columns: delta, uv_index, wind_speed, sun_elevation, temperature_ext,
+    cloud_coverage. Missing or None values become neutral defaults.
+    """
+    n = len(contexts)
+    out = np.empty((n, len(RAW_COLUMNS)))
+    for i, c in enumerate(contexts):
+        temperature_ext = c.get("temperature_ext")
+        out[i, 0] = (c.get("t_return") or 0) - (c.get("t_pool") or 0)
+        out[i, 1] = c.get("uv_index") or 0
+        out[i, 2] = c.get("wind_speed") or 0
+        out[i, 3] = c.get("sun_elevation") or 0
+        out[i, 4] = _DEFAULT_TEMPERATURE_EXT if temperature_ext is None else temperature_ext
+        out[i, 5] = c.get("cloud_coverage") or 0
+    return out
+
+
+def context_matrix(contexts: list[dict[str, Any]]) -> np.ndarray:
+    """Build the scaled (n, NUM_FEATURES) feature matrix for many contexts."""
+    raw = raw_columns(contexts)
+    n = len(contexts)
+    features = np.empty((n, NUM_FEATURES))
+    features[:, 0] = 1.0
+    features[:, 1:7] = raw
+    features[:, 7] = raw[:, 0] * raw[:, 1]
+    features -= _OFFSET
+    features /= _SCALE
+    return features
+
+
+def context_features(context: dict[str, Any]) -> np.ndarray:
+    """Build the scaled feature vector of a single context."""
+    return context_matrix([context])[0]
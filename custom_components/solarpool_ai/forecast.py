@@ -0,0 +1,75 @@
+"""Weather forecast access for the SolarPool AI day planner."""
+from __future__ import annotations
+
+import logging
+from datetime import datetime, timedelta
+from typing import Any
+
+from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.util.dt import utcnow
+
+_LOGGER = logging.getLogger(__name__)
+
+# Forecasts change slowly; never ask the weather integration more often than this
+FORECAST_TTL = timedelta(hours=1)
+
+
+async def async_fetch_hourly_forecast(hass: HomeAssistant, entity_id: str) -> list[dict[str, Any]]:
+    """Fetch the hourly forecast of a weather entity.
+
+    Uses the weather.get_forecasts service and falls back to the legacy
+    ``forecast`` attribute for integrations that still provide it.
+
+    Returns:
+        Forecast entries (empty if none are available)
+    """
+    try:
+        response = await hass.services.async_call(
+            "weather",
+            "get_forecasts",
+            {"entity_id": entity_id, "type": "hourly"},
+            blocking=True,
+            return_response=True,
+        )
+        forecast = (response or {}).get(entity_id, {}).get("forecast")
+        if forecast:
+            return list(forecast)
+    except HomeAssistantError as err:
+        _LOGGER.debug("Hourly forecast not available from %s: %s", entity_id, err)
+
+    state = hass.states.get(entity_id)
+    if state is not None and state.attributes.get("forecast"):
+        return list(state.attributes["forecast"])
+    return []
+
+
+class ForecastCache:
+    """Hourly forecast of one weather entity, fetched at most once per TTL.
+
+    Failed or empty fetches are cached too, so an integration without
+    forecasts is not queried every cycle.
+    """
+
+    def __init__(self, ttl: timedelta = FORECAST_TTL) -> None:
+        """Initialize an empty cache."""
+        self.ttl = ttl
+        self.forecast: list[dict[str, Any]] = []
+        self.fetched_at: datetime | None = None
+        self._entity_id: str | None = None
+
+    async def async_get(self, hass: HomeAssistant, entity_id: str) -> list[dict[str, Any]]:
+        """Return the cached forecast, refreshing it when expired or the entity changed."""
+        now = utcnow()
+        if (
+            self.fetched_at is not None
+            and entity_id == self._entity_id
+            and now - self.fetched_at < self.ttl
+        ):
+            return self.forecast
+
+        self.forecast = await async_fetch_hourly_forecast(hass, entity_id)
+        self.fetched_at = now
+        self._entity_id = entity_id
+        _LOGGER.debug("Forecast refreshed from %s: %d entries", entity_id, len(self.forecast))
+        return self.forecast
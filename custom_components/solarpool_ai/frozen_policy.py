@@ -0,0 +1,211 @@
+"""Frozen exploitation-only policy for SolarPool AI ("locked" mode).
+
+A trained policy is compiled once into a small artifact: the greedy action
+of each of the 144 tabular states as one byte, plus the value of that
+action as a float32 array. Deciding is then a few bisects and one byte
+lookup, with no NumPy and no learning; pools that have finished learning
+can lock their behaviour in and stop exploring.
+
+The artifact carries the bin thresholds it was compiled with, so it keeps
+working if the learning agent's discretization changes later. Artifacts
+frozen before expected gains moved to the thermal model also carry a
+``gains`` array, which is ignored.
+"""
+from __future__ import annotations
+
+import base64
+import sys
+from array import array
+from bisect import bisect_right
+from typing import Any
+
+from .const import POLICY_FROZEN
+from .policy import Policy, Transition, make_decision
+from .rules import rule_based_action
+
+FORMAT_VERSION = 1
+
+# Representative temperatures of the contexts used to compile each state
+_REFERENCE_POOL_TEMP = 25.0
+
+
+def _encode_floats(values: array) -> str:
+    """float32 array as little-endian base64 (JSON-safe)."""
+    if sys.byteorder != "little":
+        values = array("f", values)
+        values.byteswap()
+    return base64.b64encode(values.tobytes()).decode("ascii")
+
+
+def _decode_floats(data: str) -> array:
+    """Inverse of _encode_floats."""
+    values = array("f", base64.b64decode(data))
+    if sys.byteorder != "little":
+        values.byteswap()
+    return values
+
+
+def _bin_centers(thresholds: list[float]) -> list[float]:
+    """One representative value per bin of ``[0, *thresholds, inf)``."""
+    edges = [0.0, *thresholds]
+    last_width = edges[-1] - edges[-2] if len(edges) > 1 else 1.0
+    edges.append(edges[-1] + last_width)
+    return [(low + high) / 2 for low, high in zip(edges, edges[1:])]
+
+
+def state_contexts(bins: list[tuple[str, list[float]]]) -> list[dict[str, Any]]:
+    """A representative context per discrete state, in state index order.
+
+    Args:
+        bins: (feature, inner thresholds) in the order of the state index,
+            most significant first ("delta" is t_return - t_pool)
+    """
+    contexts: list[dict[str, Any]] = [{}]
+    for feature, thresholds in bins:
+        expanded = []
+        for context in contexts:
+            for value in _bin_centers(thresholds):
+                expanded.append({**context, feature: value})
+        contexts = expanded
+
+    for context in contexts:
+        delta = context.pop("delta", 0.0)
+        context.update(
+            t_pool=_REFERENCE_POOL_TEMP,
+            t_return=_REFERENCE_POOL_TEMP + delta,
+            temperature_ext=_REFERENCE_POOL_TEMP,
+        )
+    return contexts
+
+
+def freeze(policy: Policy) -> dict[str, Any]:
+    """Compile a policy into a frozen artifact (the FrozenPolicy state).
+
+    The policy is queried through ``decide_batch(explore=False)`` with one
+    representative context per tabular state, so any policy can be frozen;
+    for the tabular agent this is exactly the argmax of each Q-table row.
+
+    Args:
+        policy: Trained policy to compile
+
+    Returns:
+        State for FrozenPolicy.from_dict
+    """
+    # Los umbrales del agente tabular definen los estados (importa NumPy, pero
+    # solo al congelar; cargar el artefacto no lo necesita)
+    from .rl_agent import RLAgent
+
+    bins = [
+        ("delta", RLAgent.DELTA_BINS[1:-1]),
+        ("uv_index", RLAgent.UV_BINS[1:-1]),
+        ("wind_speed", RLAgent.WIND_BINS[1:-1]),
+        ("sun_elevation", RLAgent.ELEVATION_BINS[1:-1]),
+    ]
+    contexts = state_contexts(bins)
+    decisions = policy.decide_batch(contexts, explore=False)
+    actions = bytes(decision["action_index"] for decision in decisions)
+    values = array(
+        "f",
+        (
+            decision["q_values"][action] if decision.get("q_values") else 0.0
+            for decision, action in zip(decisions, actions)
+        ),
+    )
+    return {
+        "format": FORMAT_VERSION,
+        "source": policy.name,
+        "source_episodes": policy.episode_count,
+        "bins": [[feature, list(thresholds)] for feature, thresholds in bins],
+        "actions": base64.b64encode(actions).decode("ascii"),
+        "values": _encode_floats(values),
+    }
+
+
+class FrozenPolicy:
+    """Exploitation-only policy backed by a precompiled action per state.
+
+    Without an artifact (nothing frozen yet) it applies the warmup rules.
+    """
+
+    name = POLICY_FROZEN
+
+    def __init__(
+        self,
+        artifact: dict[str, Any] | None = None,
+        episode_count: int = 0,
+    ) -> None:
+        """Initialize the frozen policy.
+
+        Args:
+            artifact: Output of freeze() (optional)
+            episode_count: Number of cycles already completed
+        """
+        self.episode_count = episode_count
+        self.artifact = artifact if artifact and artifact.get("format") == FORMAT_VERSION else None
+        self.actions = b""
+        self.values = array("f")
+        self._bins: list[tuple[str, list[float], int]] = []
+        if self.artifact is None:
+            return
+
+        self.actions = base64.b64decode(self.artifact["actions"])
+        self.values = _decode_floats(self.artifact["values"])
+        # Stride of each feature in the flat state index
+        stride = 1
+        for feature, thresholds in reversed(self.artifact["bins"]):
+            self._bins.insert(0, (feature, thresholds, stride))
+            stride *= len(thresholds) + 1
+
+    @property
+    def is_warmup(self) -> bool:
+        """A frozen policy never warms up."""
+        return False
+
+    @property
+    def exploration_rate(self) -> float:
+        """A frozen policy never explores."""
+        return 0.0
+
+    def state_index(self, context: dict[str, Any]) -> int:
+        """Discrete state of a context, with the artifact's thresholds."""
+        state = 0
+        for feature, thresholds, stride in self._bins:
+            if feature == "delta":
+                value = context.get("t_return", 0) - context.get("t_pool", 0)
+            else:
+                value = context.get(feature, 0)
+            state += bisect_right(thresholds, value) * stride
+        return state
+
+    def decide(self, context: dict[str, Any]) -> dict[str, Any]:
+        """Look up the frozen action of the context's state."""
+        if not self.actions:
+            action = rule_based_action(context)
+            return make_decision(action, is_learning=False, is_warmup=False)
+
+        state = self.state_index(context)
+        return make_decision(
+            self.actions[state],
+            is_learning=False,
+            is_warmup=False,
+            state_index=state,
+        )
+
+    def decide_batch(
+        self, contexts: list[dict[str, Any]], explore: bool = True
+    ) -> list[dict[str, Any]]:
+        """Look up many contexts (there is nothing to explore)."""
+        return [self.decide(context) for context in contexts]
+
+    def observe(self, transition: Transition) -> None:
+        """Count the cycle; a frozen policy does not learn."""
+        self.episode_count += 1
+
+    def to_dict(self) -> dict[str, Any]:
+        """Export policy state for persistence."""
+        return {"episode_count": self.episode_count, "artifact": self.artifact}
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "FrozenPolicy":
+        """Create policy from persisted state."""
+        return cls(artifact=data.get("artifact"), episode_count=data.get("episode_count", 0))
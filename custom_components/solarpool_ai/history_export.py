@@ -0,0 +1,314 @@
+"""Columnar export of the cycle trace logs for offline analysis.
+
+Streams the records of one or more trace logs (see ``cycle_trace``) into two
+tables, with one row per cycle and one row per sweep sample:
+
+- CSV: a header plus one line per row; missing values are empty.
+- ``.npz``: one array per column, loadable with ``numpy.load``. Times are
+  ``datetime64[ms]`` (UTC), text columns are dictionary encoded as int32 codes
+  (-1 when missing) plus a ``<column>__categories`` array, and missing numbers
+  are NaN (-1 for integers). This maps directly to Arrow dictionary and
+  timestamp columns.
+
+Records are read and written ``chunk_size`` rows at a time. For ``.npz`` each
+column is spooled to a temporary file beside the output and then copied into
+the archive, so memory stays bounded however long the range is. All of it is
+blocking: the service runs it in the executor. From the command line::
+
+    python3 -m custom_components.solarpool_ai.history_export /config/solarpool_ai/traces/*.jsonl \\
+        --format npz --start 2024-01-01 --end 2024-04-01 --out /tmp/season
+"""
+from __future__ import annotations
+
+import csv
+import shutil
+import tempfile
+import zipfile
+from collections.abc import Callable, Iterable
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+from .cycle_trace import READING_KEYS, read_traces
+
+CHUNK_SIZE = 1000  # Rows kept in memory per table
+
+KIND_TIME = "time"
+KIND_FLOAT = "float"
+KIND_INT = "int"
+KIND_BOOL = "bool"
+KIND_CATEGORY = "category"
+
+# Column dtype in .npz files
+_DTYPES = {
+    KIND_TIME: "datetime64[ms]",
+    KIND_FLOAT: "float32",
+    KIND_INT: "int32",
+    KIND_BOOL: "bool",
+    KIND_CATEGORY: "int32",
+}
+
+Column = tuple[str, str, Callable[[dict[str, Any]], Any]]
+
+
+def _outcome(key: str) -> Callable[[dict[str, Any]], Any]:
+    return lambda record: record.get("outcome", {}).get(key)
+
+
+def _reading(key: str) -> Callable[[dict[str, Any]], Any]:
+    return lambda record: record.get("readings", {}).get(key)
+
+
+def _phase(key: str) -> Callable[[dict[str, Any]], Any]:
+    return lambda record: record.get("phases", {}).get(key)
+
+
+def _decision(key: str) -> Callable[[dict[str, Any]], Any]:
+    return lambda record: record.get("decision", {}).get(key)
+
+
+CYCLE_COLUMNS: tuple[Column, ...] = (
+    ("start", KIND_TIME, lambda record: record["start"]),
+    ("entry_id", KIND_CATEGORY, lambda record: record.get("entry_id")),
+    ("policy", KIND_CATEGORY, lambda record: record.get("policy")),
+    ("sweep", KIND_BOOL, lambda record: record.get("sweep")),
+    ("action", KIND_CATEGORY, lambda record: record.get("action")),
+    ("minutes", KIND_INT, lambda record: record.get("minutes")),
+    ("policy_action_index", KIND_INT, _decision("action_index")),
+    ("policy_minutes", KIND_INT, _decision("minutes")),
+    ("is_warmup", KIND_BOOL, _decision("is_warmup")),
+    ("propensity", KIND_FLOAT, _decision("propensity")),
+    ("override_min_run_time", KIND_BOOL, lambda record: "min_run_time" in record.get("overrides", ())),
+    ("override_low_delta", KIND_BOOL, lambda record: "low_delta" in record.get("overrides", ())),
+    ("expected_gain", KIND_FLOAT, lambda record: record.get("expected_gain")),
+    ("consult_ms", KIND_FLOAT, lambda record: record.get("consult_ms")),
+    *(
+        (key, KIND_CATEGORY if key == "weather_state" else KIND_FLOAT, _reading(key))
+        for key in READING_KEYS
+    ),
+    ("sweep_samples", KIND_INT, lambda record: len(record.get("sweep_trace", ()))),
+    ("consult_at_s", KIND_FLOAT, _phase("consult")),
+    ("outcome_at_s", KIND_FLOAT, _phase("outcome")),
+    ("measured", KIND_BOOL, lambda record: "outcome" in record),
+    ("actual_gain", KIND_FLOAT, _outcome("actual_gain")),
+    ("net_gain", KIND_FLOAT, _outcome("net_gain")),
+    ("passive_gain", KIND_FLOAT, _outcome("passive_gain")),
+    ("heated_minutes", KIND_INT, _outcome("heated_minutes")),
+    ("reward", KIND_FLOAT, _outcome("reward")),
+    ("terminal", KIND_BOOL, _outcome("terminal")),
+)
+
+# Rows are built by sweep_rows(), the getters index them
+SWEEP_COLUMNS: tuple[Column, ...] = (
+    ("start", KIND_TIME, lambda row: row[0]),
+    ("entry_id", KIND_CATEGORY, lambda row: row[1]),
+    ("seconds", KIND_FLOAT, lambda row: row[2]),
+    ("t_return", KIND_FLOAT, lambda row: row[3]),
+)
+
+
+def cycle_row(record: dict[str, Any]) -> tuple:
+    """Flatten one trace record into a CYCLE_COLUMNS row."""
+    return tuple(get(record) for _name, _kind, get in CYCLE_COLUMNS)
+
+
+def sweep_rows(record: dict[str, Any]) -> list[tuple]:
+    """SWEEP_COLUMNS rows of the sweep samples of one trace record."""
+    return [
+        (record["start"], record.get("entry_id"), seconds, t_return)
+        for seconds, t_return in record.get("sweep_trace", ())
+    ]
+
+
+def _csv_value(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return int(value)
+    return value
+
+
+class CsvTableWriter:
+    """Appends rows to a CSV file with a header line."""
+
+    def __init__(self, path: Path, columns: tuple[Column, ...]) -> None:
+        """Create the file and write the header."""
+        self.path = path
+        self.rows = 0
+        self._file = open(path, "w", newline="", encoding="utf-8")
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(name for name, _kind, _get in columns)
+
+    def write(self, rows: list[tuple]) -> None:
+        """Append a chunk of rows."""
+        self._writer.writerows([_csv_value(value) for value in row] for row in rows)
+        self.rows += len(rows)
+
+    def close(self) -> None:
+        """Close the file."""
+        self._file.close()
+
+
+class NpzTableWriter:
+    """Builds a ``.npz`` archive column by column, spooling chunks to disk."""
+
+    def __init__(self, path: Path, columns: tuple[Column, ...]) -> None:
+        """Open one spool file per column next to the output."""
+        import numpy as np  # Only this format needs NumPy
+
+        self._np = np
+        self.path = path
+        self.columns = columns
+        self.rows = 0
+        self._spool = tempfile.TemporaryDirectory(prefix=".solarpool_export_", dir=path.parent)
+        self._files = [open(Path(self._spool.name) / f"{index}.bin", "wb") for index in range(len(columns))]
+        # Dictionary of each text column (value -> code), in code order
+        self._categories = [{} if kind == KIND_CATEGORY else None for _name, kind, _get in columns]
+
+    def _array(self, values: list[Any], kind: str, categories: dict[str, int] | None) -> Any:
+        np = self._np
+        if kind == KIND_TIME:
+            millis = [int(datetime.fromisoformat(value).timestamp() * 1000) for value in values]
+            return np.array(millis, dtype=np.int64).view(_DTYPES[kind])
+        if kind == KIND_CATEGORY:
+            codes = [-1 if value is None else categories.setdefault(str(value), len(categories)) for value in values]
+            return np.array(codes, dtype=_DTYPES[kind])
+        if kind == KIND_FLOAT:
+            return np.array([np.nan if value is None else value for value in values], dtype=_DTYPES[kind])
+        if kind == KIND_INT:
+            return np.array([-1 if value is None else value for value in values], dtype=_DTYPES[kind])
+        return np.array([bool(value) for value in values], dtype=_DTYPES[kind])
+
+    def write(self, rows: list[tuple]) -> None:
+        """Append a chunk of rows to the column spools."""
+        for index, (_name, kind, _get) in enumerate(self.columns):
+            array = self._array([row[index] for row in rows], kind, self._categories[index])
+            array.tofile(self._files[index])
+        self.rows += len(rows)
+
+    def close(self) -> None:
+        """Write the archive from the spools (compressed, like ``numpy.savez_compressed``)."""
+        np = self._np
+        for spool in self._files:
+            spool.close()
+        try:
+            with zipfile.ZipFile(self.path, "w", zipfile.ZIP_DEFLATED) as archive:
+                for index, (name, kind, _get) in enumerate(self.columns):
+                    header = {
+                        "descr": np.lib.format.dtype_to_descr(np.dtype(_DTYPES[kind])),
+                        "fortran_order": False,
+                        "shape": (self.rows,),
+                    }
+                    with archive.open(f"{name}.npy", "w", force_zip64=True) as member:
+                        np.lib.format.write_array_header_1_0(member, header)
+                        with open(self._files[index].name, "rb") as spool:
+                            shutil.copyfileobj(spool, member)
+                    if self._categories[index] is not None:
+                        with archive.open(f"{name}__categories.npy", "w") as member:
+                            np.save(member, np.array(list(self._categories[index]), dtype=str))
+        finally:
+            self._spool.cleanup()
+
+
+WRITERS: dict[str, type[CsvTableWriter] | type[NpzTableWriter]] = {
+    "csv": CsvTableWriter,
+    "npz": NpzTableWriter,
+}
+FORMATS = tuple(WRITERS)
+
+
+def _utc(value: datetime | None) -> datetime | None:
+    """Naive times are taken as UTC (the trace log stores UTC)."""
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def export_history(
+    trace_paths: Iterable[str | Path],
+    directory: str | Path,
+    fmt: str = "csv",
+    start: datetime | None = None,
+    end: datetime | None = None,
+    prefix: str = "solarpool",
+    chunk_size: int = CHUNK_SIZE,
+) -> dict[str, Any]:
+    """Export trace logs to a cycles table and a sweeps table.
+
+    Blocking: runs in the executor.
+
+    Args:
+        trace_paths: Live trace files (their rotated files are read too)
+        directory: Output directory (created if missing)
+        fmt: One of FORMATS
+        start: Only cycles started at or after this time
+        end: Only cycles started before this time
+        prefix: File name prefix (``<prefix>_cycles.<fmt>``, ``<prefix>_sweeps.<fmt>``)
+        chunk_size: Rows buffered per table before a write
+
+    Returns:
+        Format, row counts and the files written
+    """
+    if fmt not in WRITERS:
+        raise ValueError(f"Unknown export format '{fmt}'. Available: {', '.join(FORMATS)}")
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    start, end = _utc(start), _utc(end)
+
+    writer_class = WRITERS[fmt]
+    cycles = writer_class(directory / f"{prefix}_cycles.{fmt}", CYCLE_COLUMNS)
+    try:
+        sweeps = writer_class(directory / f"{prefix}_sweeps.{fmt}", SWEEP_COLUMNS)
+    except BaseException:
+        cycles.close()
+        raise
+    try:
+        cycle_chunk: list[tuple] = []
+        sweep_chunk: list[tuple] = []
+        for path in trace_paths:
+            for record in read_traces(path, start, end):
+                cycle_chunk.append(cycle_row(record))
+                sweep_chunk.extend(sweep_rows(record))
+                if len(cycle_chunk) >= chunk_size:
+                    cycles.write(cycle_chunk)
+                    cycle_chunk = []
+                if len(sweep_chunk) >= chunk_size:
+                    sweeps.write(sweep_chunk)
+                    sweep_chunk = []
+        if cycle_chunk:
+            cycles.write(cycle_chunk)
+        if sweep_chunk:
+            sweeps.write(sweep_chunk)
+    finally:
+        cycles.close()
+        sweeps.close()
+
+    return {
+        "format": fmt,
+        "cycles": cycles.rows,
+        "sweep_samples": sweeps.rows,
+        "files": [str(cycles.path), str(sweeps.path)],
+    }
+
+
+def main() -> None:
+    """Export trace logs from the command line."""
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Export SolarPool AI cycle traces to CSV or .npz")
+    parser.add_argument("paths", nargs="+", help="Live trace files (rotated files are read too)")
+    parser.add_argument("--format", choices=FORMATS, default="csv")
+    parser.add_argument("--start", type=datetime.fromisoformat, help="ISO time, inclusive (UTC if naive)")
+    parser.add_argument("--end", type=datetime.fromisoformat, help="ISO time, exclusive (UTC if naive)")
+    parser.add_argument("--out", default=".", help="Output directory")
+    parser.add_argument("--prefix", default="solarpool")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    args = parser.parse_args()
+
+    summary = export_history(args.paths, args.out, args.format, args.start, args.end, args.prefix, args.chunk_size)
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+"""Opt-in event-loop blocking detector for SolarPool AI.
+
+When enabled (``loop_monitor`` option), every SolarPool timer callback,
+coordinator update and entity state write is timed step by step: a
+coroutine is measured between each resumption, since only the synchronous
+stretch between two awaits blocks the loop. Steps longer than the threshold
+are kept with a stack sample, taken by a watchdog thread while the step is
+still running (a stack taken after it returns would only show the caller).
+
+Typical findings are translation file reads (``translations._load_translations``),
+NumPy calls inside a decision and building the config entry data for
+``async_update_entry``. Results are exposed through the diagnostics download.
+"""
+from __future__ import annotations
+
+import functools
+import inspect
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timezone
+from typing import Any
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_THRESHOLD = 0.05  # Segundos; asyncio avisa recién a los 0.1 s en modo debug
+MAX_RECORDS = 50
+STACK_LIMIT = 12
+
+_DISABLED = nullcontext()
+
+
+class _MonitoredStep:
+    """Awaitable that drives a coroutine, timing each step on the monitor."""
+
+    __slots__ = ("_monitor", "_name", "_coro")
+
+    def __init__(self, monitor: LoopMonitor, name: str, coro: Any) -> None:
+        self._monitor = monitor
+        self._name = name
+        self._coro = coro
+
+    def __await__(self) -> _MonitoredStep:
+        return self
+
+    def __iter__(self) -> _MonitoredStep:
+        return self
+
+    def __next__(self) -> Any:
+        return self.send(None)
+
+    def send(self, value: Any) -> Any:
+        with self._monitor.measure(self._name):
+            return self._coro.send(value)
+
+    def throw(self, *args: Any) -> Any:
+        with self._monitor.measure(self._name):
+            return self._coro.throw(*args)
+
+    def close(self) -> None:
+        self._coro.close()
+
+
+class LoopMonitor:
+    """Records SolarPool steps that hold the event loop for too long.
+
+    Measurements do not nest: a step started inside another one (e.g. an
+    entity state write during a cycle step) is recorded under its own name
+    when slow, but the stack sample and the step count belong to the
+    outermost step.
+    """
+
+    def __init__(self, threshold: float = DEFAULT_THRESHOLD) -> None:
+        """Initialize a disabled monitor.
+
+        Args:
+            threshold: Seconds a step may hold the loop before it is recorded
+        """
+        self.threshold = threshold
+        self.enabled = False
+        self.steps = 0
+        self.slow_steps: deque[dict[str, Any]] = deque(maxlen=MAX_RECORDS)
+        self.stats: dict[str, dict[str, float]] = {}
+        # (token, start, name) of the outermost running step, read by the watchdog
+        self._current: tuple[int, float, str] | None = None
+        self._token = 0
+        self._samples: dict[int, list[str]] = {}
+        self._loop_thread: int | None = None
+        self._stop: threading.Event | None = None
+
+    def enable(self) -> None:
+        """Start measuring (call from the event loop thread)."""
+        if self.enabled:
+            return
+        self.enabled = True
+        self._loop_thread = threading.get_ident()
+        self._stop = threading.Event()
+        threading.Thread(
+            target=self._watch, args=(self._stop,), name="solarpool_loop_monitor", daemon=True
+        ).start()
+        _LOGGER.info("Loop monitor enabled (threshold %.0f ms)", self.threshold * 1000)
+
+    def disable(self) -> None:
+        """Stop measuring; recorded steps are kept for diagnostics."""
+        if not self.enabled:
+            return
+        self.enabled = False
+        if self._stop is not None:
+            self._stop.set()
+        self._current = None
+        self._samples.clear()
+
+    def _watch(self, stop: threading.Event) -> None:
+        """Watchdog thread: sample the loop thread's stack during long steps."""
+        while not stop.wait(self.threshold / 2):
+            current = self._current
+            if current is None:
+                continue
+            token, start, _name = current
+            if token in self._samples or time.perf_counter() - start < self.threshold:
+                continue
+            frame = sys._current_frames().get(self._loop_thread)
+            if frame is not None:
+                self._samples[token] = traceback.format_stack(frame, limit=STACK_LIMIT)
+
+    def measure(self, name: str):
+        """Context manager timing one synchronous step (no-op when disabled)."""
+        if not self.enabled:
+            return _DISABLED
+        return self._measure(name)
+
+    @contextmanager
+    def _measure(self, name: str) -> Iterator[None]:
+        outermost = self._current is None
+        token = 0
+        start = time.perf_counter()
+        if outermost:
+            self._token = token = self._token + 1
+            self._current = (token, start, name)
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            if outermost:
+                self._current = None
+                self.steps += 1
+            self._record(name, elapsed, self._samples.pop(token, None) if outermost else None)
+
+    def _record(self, name: str, elapsed: float, stack: list[str] | None) -> None:
+        """Update the per-name stats and keep the step if it was slow."""
+        stats = self.stats.get(name)
+        if stats is None:
+            stats = self.stats[name] = {"calls": 0, "slow": 0, "total_ms": 0.0, "max_ms": 0.0}
+        elapsed_ms = elapsed * 1000
+        stats["calls"] += 1
+        stats["total_ms"] += elapsed_ms
+        stats["max_ms"] = max(stats["max_ms"], elapsed_ms)
+        if elapsed < self.threshold:
+            return
+
+        stats["slow"] += 1
+        self.slow_steps.append(
+            {
+                "name": name,
+                "duration_ms": round(elapsed_ms, 1),
+                "at": datetime.now(timezone.utc).isoformat(),
+                "stack": [line.rstrip() for line in stack] if stack else None,
+            }
+        )
+        _LOGGER.debug("Paso lento de SolarPool: %s bloqueó el loop %.0f ms", name, elapsed_ms)
+
+    def wrap(self, name: str, func: Callable[..., Any]) -> Callable[..., Any]:
+        """Wrap a callback or coroutine function so each of its steps is measured.
+
+        The wrapper keeps the kind of the wrapped function, so Home Assistant
+        still schedules coroutine functions as tasks.
+        """
+        if getattr(func, "_loop_monitor_wrapped", False):
+            return func
+
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def monitored_async(*args: Any, **kwargs: Any) -> Any:
+                coro = func(*args, **kwargs)
+                if not self.enabled or self._current is not None:
+                    # Called inside a measured step: its steps belong to that one
+                    return await coro
+                return await _MonitoredStep(self, name, coro)
+
+            monitored_async._loop_monitor_wrapped = True
+            return monitored_async
+
+        @functools.wraps(func)
+        def monitored(*args: Any, **kwargs: Any) -> Any:
+            with self.measure(name):
+                return func(*args, **kwargs)
+
+        monitored._loop_monitor_wrapped = True
+        return monitored
+
+    def as_dict(self) -> dict[str, Any]:
+        """Diagnostics view: settings, per-name stats and the slow steps."""
+        return {
+            "enabled": self.enabled,
+            "threshold_ms": round(self.threshold * 1000, 1),
+            "steps": self.steps,
+            "stats": {
+                name: {**stats, "total_ms": round(stats["total_ms"], 1), "max_ms": round(stats["max_ms"], 1)}
+                for name, stats in sorted(self.stats.items(), key=lambda item: -item[1]["max_ms"])
+            },
+            "slow_steps": list(self.slow_steps),
+        }
+
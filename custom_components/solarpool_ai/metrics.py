@@ -0,0 +1,240 @@
+"""In-process metrics for SolarPool AI (Prometheus text exposition format).
+
+Counters, gauges and fixed-bucket histograms are plain Python objects: an
+update is an attribute add (plus one bisect for a histogram), with no locks,
+labels lookups or string formatting on the hot path. Gauges that mirror
+coordinator state read it through a callback at scrape time, so they cost
+nothing between scrapes. Rendering happens only when the metrics view is
+requested.
+"""
+from __future__ import annotations
+
+import json
+import math
+from bisect import bisect_left
+from collections.abc import Callable, Iterable
+from typing import TYPE_CHECKING, Any
+
+from .const import RL_ACTIONS
+
+if TYPE_CHECKING:
+    from .coordinator import SolarPoolCoordinator
+
+PREFIX = "solarpool_"
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Bucket upper bounds (+Inf is implicit)
+SWEEP_BUCKETS = (60, 90, 120, 150, 180, 240, 300, 450, 600)  # Segundos de barrido
+CONSULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25)  # Segundos de CPU
+HEATING_BUCKETS = tuple(RL_ACTIONS)  # Minutos decididos
+REWARD_BUCKETS = (-2.0, -1.0, -0.5, -0.25, 0.0, 0.25, 0.5, 1.0, 2.0, 4.0)
+
+
+class Counter:
+    """Monotonic counter."""
+
+    __slots__ = ("value",)
+    kind = "counter"
+
+    def __init__(self) -> None:
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        """Add a non-negative amount."""
+        self.value += amount
+
+
+class Gauge:
+    """Value that goes up and down, set directly or read from a callback."""
+
+    __slots__ = ("value", "_read")
+    kind = "gauge"
+
+    def __init__(self, read: Callable[[], float | None] | None = None) -> None:
+        self.value = 0.0
+        self._read = read
+
+    def set(self, value: float) -> None:
+        """Set the current value."""
+        self.value = value
+
+    def get(self) -> float | None:
+        """Current value (None when the callback has nothing to report)."""
+        return self._read() if self._read is not None else self.value
+
+
+class Histogram:
+    """Fixed-bucket histogram (bucket counts are cumulated when rendered)."""
+
+    __slots__ = ("bounds", "counts", "sum", "count")
+    kind = "histogram"
+
+    def __init__(self, bounds: Iterable[float]) -> None:
+        self.bounds = tuple(sorted(bounds))
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        """Record one observation."""
+        # Prometheus buckets are "less or equal": the first bound >= value
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+Metric = Counter | Gauge | Histogram
+
+
+class MetricsRegistry:
+    """Named metric families, each with one metric per fixed label set."""
+
+    def __init__(self) -> None:
+        """Initialize an empty registry."""
+        # name -> (help, kind, {labels: metric})
+        self._families: dict[str, tuple[str, str, dict[tuple[tuple[str, str], ...], Metric]]] = {}
+
+    def _register(self, name: str, documentation: str, metric: Metric, labels: dict[str, str]) -> Metric:
+        family = self._families.setdefault(PREFIX + name, (documentation, metric.kind, {}))
+        if family[1] != metric.kind:
+            raise ValueError(f"{name} is already registered as a {family[1]}")
+        return family[2].setdefault(tuple(sorted(labels.items())), metric)
+
+    def counter(self, name: str, documentation: str, **labels: str) -> Counter:
+        """Get or create a counter (``_total`` is appended to the name)."""
+        return self._register(f"{name}_total", documentation, Counter(), labels)
+
+    def gauge(
+        self, name: str, documentation: str, read: Callable[[], float | None] | None = None, **labels: str
+    ) -> Gauge:
+        """Get or create a gauge, optionally read from a callback at scrape time."""
+        return self._register(name, documentation, Gauge(read), labels)
+
+    def histogram(self, name: str, documentation: str, buckets: Iterable[float], **labels: str) -> Histogram:
+        """Get or create a fixed-bucket histogram."""
+        return self._register(name, documentation, Histogram(buckets), labels)
+
+    def families(self):
+        """(name, help, kind, {labels: metric}) of every registered family."""
+        for name, (documentation, kind, metrics) in self._families.items():
+            yield name, documentation, kind, metrics
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if math.isnan(value):
+        return "NaN"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Iterable[tuple[str, str]]) -> str:
+    pairs = [f'{key}="{_escape(value)}"' for key, value in labels]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def render(registries: Iterable[tuple[dict[str, str], MetricsRegistry]]) -> str:
+    """Render registries in the Prometheus text exposition format (0.0.4).
+
+    Args:
+        registries: (extra labels, registry) pairs, e.g. one per config entry;
+            families with the same name are merged under one HELP/TYPE header
+
+    Returns:
+        The exposition text
+    """
+    merged: dict[str, tuple[str, str, list[tuple[tuple[tuple[str, str], ...], Metric]]]] = {}
+    for extra, registry in registries:
+        extra_labels = tuple(sorted(extra.items()))
+        for name, documentation, kind, metrics in registry.families():
+            family = merged.setdefault(name, (documentation, kind, []))
+            family[2].extend((extra_labels + labels, metric) for labels, metric in metrics.items())
+
+    lines = []
+    for name, (documentation, kind, samples) in merged.items():
+        lines.append(f"# HELP {name} {documentation}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, metric in samples:
+            if isinstance(metric, Histogram):
+                cumulative = 0
+                for bound, count in zip((*metric.bounds, math.inf), metric.counts):
+                    cumulative += count
+                    bucket_labels = _format_labels((*labels, ("le", _format_value(bound))))
+                    lines.append(f"{name}_bucket{bucket_labels} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(metric.sum)}")
+                lines.append(f"{name}_count{_format_labels(labels)} {metric.count}")
+                continue
+            value = metric.get() if isinstance(metric, Gauge) else metric.value
+            if value is not None:
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+class SolarPoolMetrics:
+    """The metrics one coordinator updates, with direct attribute access."""
+
+    def __init__(self, coordinator: SolarPoolCoordinator) -> None:
+        """Register every metric of a coordinator.
+
+        Args:
+            coordinator: Coordinator whose state the scrape-time gauges read
+        """
+        self.registry = registry = MetricsRegistry()
+        self.cycles = registry.counter("cycles", "Cycles started by the interval timer or manually")
+        self.decisions_on = registry.counter("decisions", "Heating decisions after safety rules", action="on")
+        self.decisions_off = registry.counter("decisions", "Heating decisions after safety rules", action="off")
+        self.sweeps = registry.counter("sweeps", "Sweeps started (pump on to measure)")
+        self.sweep_duration = registry.histogram(
+            "sweep_duration_seconds", "Sweep length until stable or timed out", SWEEP_BUCKETS
+        )
+        self.consult_duration = registry.histogram(
+            "consult_duration_seconds", "Wall time of a measure-and-consult step", CONSULT_BUCKETS
+        )
+        self.heating_duration = registry.histogram(
+            "heating_duration_minutes", "Decided heating duration", HEATING_BUCKETS
+        )
+        self.pump_on_seconds = registry.counter("pump_on_seconds", "Seconds the pump ran after being started by SolarPool")
+        self.override_min_run = registry.counter(
+            "overrides", "Policy decisions replaced by a safety rule", rule="min_run_time"
+        )
+        self.override_low_delta = registry.counter(
+            "overrides", "Policy decisions replaced by a safety rule", rule="low_delta"
+        )
+        self.rewards = registry.histogram("reward", "Reward of each learned cycle", REWARD_BUCKETS)
+        self.q_updates = registry.counter("policy_updates", "Transitions the policy learned from")
+        self.persist_writes = registry.counter("persist_writes", "Config entry writes")
+        self.checkpoints = registry.counter("checkpoints", "Periodic policy checkpoints saved")
+        self.rollbacks = registry.counter("rollbacks", "Policy rollbacks to a checkpoint (manual or automatic)")
+
+        # Callbacks go through the coordinator: the policy object is swapped on option changes
+        registry.gauge("episodes", "Cycles completed by the active policy", lambda: coordinator.policy.episode_count)
+        registry.gauge(
+            "exploration_rate", "Exploration rate of the active policy", lambda: coordinator.policy.exploration_rate
+        )
+        registry.gauge("expected_gain_celsius", "Expected gain of the latest decision", lambda: coordinator.expected_gain)
+        registry.gauge("daily_gain_celsius", "Pool temperature gain since the day started", lambda: coordinator.daily_gain)
+        registry.gauge("last_reward", "Reward of the latest learned cycle", lambda: coordinator.last_reward)
+        registry.gauge("pump_heating", "1 while SolarPool is heating", lambda: float(coordinator.pump_is_heating))
+
+        # Cached size of the entry data: the coordinator clears it on every write,
+        # so it is serialized once per write (and only if scraped), not per scrape
+        self.persisted_size: int | None = None
+
+        def read_persisted_bytes() -> int:
+            if self.persisted_size is None:
+                self.persisted_size = persisted_bytes(coordinator.entry.data)
+            return self.persisted_size
+
+        registry.gauge(
+            "persisted_bytes", "Size of the persisted config entry data (JSON, measured once per write)",
+            read_persisted_bytes,
+        )
+
+
+def persisted_bytes(data: Any) -> int:
+    """JSON size of config entry data, as Home Assistant stores it."""
+    return len(json.dumps(data, default=str))
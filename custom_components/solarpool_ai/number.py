@@ -75,12 +75,10 @@ class SolarPoolNumberBase(NumberEntity):
     async def async_set_native_value(self, value: float) -> None:
         """Set new value."""
         new_options = {**self.entry.options, self._key: value}
+        # The entry update listener rebuilds the coordinator settings
+        # (and reschedules the cycle timer if the interval changed)
         self.hass.config_entries.async_update_entry(self.entry, options=new_options)
         
-        # Notify coordinator of the change
-        if hasattr(self.coordinator, 'async_update_interval') and self._key == CONF_SCAN_INTERVAL:
-            self.coordinator.async_update_interval(int(value))
-        
         _LOGGER.info("SolarPool %s updated to %s", self._key, value)
 
 
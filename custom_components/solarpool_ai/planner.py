@@ -0,0 +1,363 @@
+"""Day planner (model-predictive control) for SolarPool AI.
+
+Turns an hourly weather forecast into a plan for the rest of today's daylight:
+the forecast is resampled onto the cycle grid, batches of RL_ACTIONS
+sequences are rolled out at once through the pool thermal model, and the
+sequence with the best total reward becomes the plan. The coordinator looks
+the plan up every cycle and skips sweeps in slots where it rules heating out.
+
+Like the simulator, this module does not depend on Home Assistant.
+"""
+from __future__ import annotations
+
+import math
+from datetime import datetime, timedelta
+from typing import Any, NamedTuple
+
+import numpy as np
+
+from .const import RL_ACTIONS
+from .policy import (
+    EFFICIENCY_BONUS,
+    EFFICIENT_GAIN,
+    MISSED_GAIN,
+    MISSED_GAIN_PENALTY,
+    OFF_REWARD,
+    PUMP_COST_PER_HOUR,
+)
+from .simulator import PoolModel, pool_gain
+
+# Candidate action sequences per search iteration, and iterations per plan
+PLAN_ROLLOUTS = 256
+PLAN_ITERATIONS = 5
+# Same threshold the coordinator uses to skip cycles (°)
+MIN_PLAN_ELEVATION = 5.0
+# Cloud coverage (%) assumed from the forecast condition when it has none
+CONDITION_CLOUD_COVERAGE: dict[str, float] = {
+    "sunny": 5.0,
+    "clear-night": 5.0,
+    "partlycloudy": 50.0,
+    "windy": 30.0,
+    "windy-variant": 60.0,
+    "cloudy": 90.0,
+    "fog": 100.0,
+    "rainy": 90.0,
+    "pouring": 100.0,
+    "lightning": 90.0,
+    "lightning-rainy": 100.0,
+    "hail": 100.0,
+    "snowy": 100.0,
+    "snowy-rainy": 100.0,
+    "exceptional": 100.0,
+}
+_DEFAULT_CLOUD_COVERAGE = 50.0
+
+_ACTION_MINUTES = np.array(RL_ACTIONS)
+
+
+def solar_elevation(latitude: float, longitude: float, timestamps: np.ndarray) -> np.ndarray:
+    """Approximate sun elevation (°) for POSIX timestamps (vectorized).
+
+    Low-precision solar ephemeris, accurate to a fraction of a degree, which
+    is plenty for planning.
+    """
+    days = timestamps / 86400.0 - 10957.5  # Days since J2000.0
+    mean_anomaly = np.radians(357.529 + 0.98560028 * days)
+    mean_longitude = 280.459 + 0.98564736 * days
+    ecliptic_longitude = np.radians(
+        mean_longitude + 1.915 * np.sin(mean_anomaly) + 0.020 * np.sin(2 * mean_anomaly)
+    )
+    obliquity = np.radians(23.439 - 0.00000036 * days)
+
+    right_ascension = np.arctan2(
+        np.cos(obliquity) * np.sin(ecliptic_longitude), np.cos(ecliptic_longitude)
+    )
+    declination = np.arcsin(np.sin(obliquity) * np.sin(ecliptic_longitude))
+    sidereal_hours = (18.697374558 + 24.06570982441908 * days) % 24
+    hour_angle = np.radians(sidereal_hours * 15 + longitude) - right_ascension
+
+    lat = math.radians(latitude)
+    sin_elevation = (
+        math.sin(lat) * np.sin(declination)
+        + math.cos(lat) * np.cos(declination) * np.cos(hour_angle)
+    )
+    return np.degrees(np.arcsin(np.clip(sin_elevation, -1.0, 1.0)))
+
+
+class DaySlots(NamedTuple):
+    """Forecast resampled onto the decision grid for the rest of the day."""
+
+    start: datetime
+    slot_minutes: int
+    elevation: np.ndarray
+    uv_index: np.ndarray  # Effective UV (cloud factor applied, like the coordinator)
+    cloud_coverage: np.ndarray
+    wind_speed: np.ndarray
+    temperature_ext: np.ndarray
+
+
+def build_slots(
+    forecast: list[dict[str, Any]],
+    start: datetime,
+    latitude: float,
+    longitude: float,
+    slot_minutes: int,
+) -> DaySlots | None:
+    """Resample an hourly forecast onto decision slots until sunset.
+
+    Args:
+        forecast: Entries as returned by weather.get_forecasts (datetime,
+            temperature, wind_speed, and optionally cloud_coverage, uv_index,
+            condition)
+        start: First slot (timezone-aware)
+        latitude: Location latitude (°)
+        longitude: Location longitude (°)
+        slot_minutes: Minutes between decisions
+
+    Returns:
+        Slots, or None if the sun is already too low or the forecast is empty
+    """
+    entries = []
+    for entry in forecast:
+        try:
+            when = datetime.fromisoformat(str(entry["datetime"])).timestamp()
+        except (KeyError, ValueError):
+            continue
+        entries.append((when, entry))
+    if not entries:
+        return None
+    entries.sort(key=lambda item: item[0])
+
+    # Daylight part of the next 24 h on the slot grid
+    count = 24 * 60 // slot_minutes
+    times = start.timestamp() + np.arange(count) * slot_minutes * 60
+    elevation = solar_elevation(latitude, longitude, times)
+    below = np.nonzero(elevation < MIN_PLAN_ELEVATION)[0]
+    end = int(below[0]) if len(below) else count
+    if end == 0:
+        return None
+    times, elevation = times[:end], elevation[:end]
+
+    stamps = np.array([when for when, _ in entries])
+
+    def column(key: str, default: float) -> np.ndarray:
+        values = np.array([
+            default if entry.get(key) is None else float(entry[key]) for _, entry in entries
+        ])
+        return np.interp(times, stamps, values)
+
+    clouds = np.array([
+        entry["cloud_coverage"] if entry.get("cloud_coverage") is not None
+        else CONDITION_CLOUD_COVERAGE.get(entry.get("condition"), _DEFAULT_CLOUD_COVERAGE)
+        for _, entry in entries
+    ], dtype=float)
+    cloud_coverage = np.clip(np.interp(times, stamps, clouds), 0, 100)
+
+    # UV from the forecast when it has it, otherwise the coordinator's
+    # elevation estimate; the cloud factor is applied to both
+    clear_sky_uv = np.clip(12.0 * np.sin(np.radians(elevation)), 0, 12)
+    if all(entry.get("uv_index") is not None for _, entry in entries):
+        uv_raw = column("uv_index", 0.0)
+    else:
+        uv_raw = clear_sky_uv
+    cloud_factor = np.maximum(0.15, 1 - 0.85 * cloud_coverage / 100)
+
+    return DaySlots(
+        start=start,
+        slot_minutes=slot_minutes,
+        elevation=elevation,
+        uv_index=uv_raw * cloud_factor,
+        cloud_coverage=cloud_coverage,
+        wind_speed=column("wind_speed", 0.0),
+        temperature_ext=column("temperature", 20.0),
+    )
+
+
+def _rewards(gains: np.ndarray, minutes: np.ndarray) -> np.ndarray:
+    """Vectorized policy.calculate_reward (same constants, without rounding)."""
+    hours = minutes / 60
+    on_reward = gains - PUMP_COST_PER_HOUR * hours
+    on_reward = np.where((gains > EFFICIENT_GAIN) & (hours < 1.0), on_reward + EFFICIENCY_BONUS, on_reward)
+    off_reward = np.where(gains < MISSED_GAIN, OFF_REWARD, MISSED_GAIN_PENALTY)
+    return np.where(minutes == 0, off_reward, on_reward)
+
+
+class DayPlan(NamedTuple):
+    """Best action sequence found for the rest of the day.
+
+    ``actions`` holds an RL_ACTIONS index per slot, or -1 for slots covered
+    by a run started in an earlier slot.
+    """
+
+    created_at: datetime
+    start: datetime
+    slot_minutes: int
+    actions: np.ndarray
+    gains: np.ndarray
+    expected_reward: float
+
+    def action_at(self, when: datetime) -> int | None:
+        """Planned action index for the slot containing ``when`` (None outside the plan)."""
+        slot = int((when - self.start).total_seconds() // (self.slot_minutes * 60))
+        if 0 <= slot < len(self.actions):
+            return int(self.actions[slot])
+        return None
+
+    @property
+    def heating_minutes(self) -> int:
+        """Total planned pump time."""
+        planned = self.actions[self.actions > 0]
+        return int(_ACTION_MINUTES[planned].sum())
+
+    def as_attributes(self) -> dict[str, Any]:
+        """Compact representation for entity attributes (heating runs only)."""
+        runs = [
+            {
+                "start": (self.start + timedelta(minutes=int(slot) * self.slot_minutes)).isoformat(),
+                "minutes": int(_ACTION_MINUTES[self.actions[slot]]),
+                "expected_gain": round(float(self.gains[slot]), 2),
+            }
+            for slot in np.nonzero(self.actions > 0)[0]
+        ]
+        return {
+            "created_at": self.created_at.isoformat(),
+            "start": self.start.isoformat(),
+            "slot_minutes": self.slot_minutes,
+            "expected_gain": round(float(self.gains.sum()), 2),
+            "expected_reward": round(self.expected_reward, 2),
+            "runs": runs,
+        }
+
+
+def _rollout(
+    slots: DaySlots,
+    candidates: np.ndarray,
+    t_pool: float,
+    max_temp: float,
+    pool: PoolModel,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Roll out many candidate sequences through the thermal model at once.
+
+    Every row of ``candidates`` holds one action per slot; an action started
+    in a slot covers it and, for long runs, the following ones (as in the
+    simulator). All rollouts advance in the same NumPy step, each with its
+    own slot pointer and pool temperature. Like live learning, rewards score
+    the net gain: the window's gain minus what the pool gains with the pump off.
+
+    Returns:
+        (total reward per rollout, action taken per slot or -1, gain per slot)
+    """
+    num_rollouts, num_slots = candidates.shape
+    rows = np.arange(num_rollouts)
+    pointer = np.zeros(num_rollouts, dtype=np.int64)
+    temperature = np.full(num_rollouts, float(t_pool))
+    total = np.zeros(num_rollouts)
+    chosen = np.full((num_rollouts, num_slots), -1, dtype=np.int64)
+    gains = np.zeros((num_rollouts, num_slots))
+
+    while True:
+        alive = pointer < num_slots
+        if not alive.any():
+            break
+        slot = np.minimum(pointer, num_slots - 1)
+        action = np.where(temperature >= max_temp, 0, candidates[rows, slot])
+        minutes = _ACTION_MINUTES[action]
+        window = np.maximum(minutes, slots.slot_minutes)
+        conditions = (temperature, slots.uv_index[slot], slots.wind_speed[slot], slots.temperature_ext[slot])
+        gain = np.where(alive, pool_gain(pool, *conditions, minutes, window), 0.0)
+        passive = pool_gain(pool, *conditions, 0, window)
+        total += np.where(alive, _rewards(gain - passive, minutes), 0.0)
+        temperature += gain
+        chosen[rows[alive], slot[alive]] = action[alive]
+        gains[rows[alive], slot[alive]] = gain[alive]
+        pointer += np.where(alive, np.maximum(1, -(-minutes // slots.slot_minutes)), 0)
+
+    return total, chosen, gains
+
+
+def plan_day(
+    slots: DaySlots,
+    t_pool: float,
+    max_temp: float,
+    created_at: datetime,
+    pool: PoolModel | None = None,
+    rollouts: int = PLAN_ROLLOUTS,
+    iterations: int = PLAN_ITERATIONS,
+    seed: int = 0,
+    rng: np.random.Generator | None = None,
+) -> DayPlan:
+    """Search the best action sequence for the rest of the day.
+
+    Cross-entropy method: candidates are drawn from a per-slot distribution
+    over actions, rolled out together, and the distribution moves towards
+    the best tenth of them. Constant sequences (always OFF, always 20 min,
+    ...) are part of every batch.
+
+    Args:
+        slots: Forecast slots from build_slots
+        t_pool: Current pool temperature (°C)
+        max_temp: Pool temperature at which heating stops (°C)
+        created_at: Timestamp of the forecast the plan is based on
+        pool: Thermal model parameters (defaults to PoolModel())
+        rollouts: Candidate sequences per iteration
+        iterations: Refinement iterations
+        seed: Seed for the candidate sampling
+        rng: Generator to sample from instead of one built from seed
+
+    Returns:
+        The best plan found
+    """
+    pool = pool or PoolModel()
+    num_slots = len(slots.elevation)
+    num_actions = len(RL_ACTIONS)
+    rollouts = max(rollouts, 2 * num_actions)
+    elite = max(1, rollouts // 10)
+    rng = rng if rng is not None else np.random.default_rng(seed)
+
+    probabilities = np.full((num_slots, num_actions), 1 / num_actions)
+    best: tuple[float, np.ndarray, np.ndarray] | None = None
+    for _ in range(iterations):
+        cumulative = np.cumsum(probabilities, axis=1)
+        draws = rng.random((rollouts, num_slots, 1))
+        candidates = np.minimum((draws > cumulative).sum(axis=2), num_actions - 1)
+        candidates[:num_actions] = np.arange(num_actions)[:, None]
+
+        total, chosen, gains = _rollout(slots, candidates, t_pool, max_temp, pool)
+        top = int(np.argmax(total))
+        if best is None or total[top] > best[0]:
+            best = (float(total[top]), chosen[top], gains[top])
+
+        elite_actions = candidates[np.argsort(total)[-elite:]]  # (elite, slots)
+        frequencies = (elite_actions[:, :, None] == np.arange(num_actions)).mean(axis=0)
+        probabilities = 0.5 * probabilities + 0.5 * frequencies
+
+    expected_reward, actions, slot_gains = best
+    return DayPlan(
+        created_at=created_at,
+        start=slots.start,
+        slot_minutes=slots.slot_minutes,
+        actions=actions,
+        gains=slot_gains,
+        expected_reward=expected_reward,
+    )
+
+
+def make_day_plan(
+    forecast: list[dict[str, Any]],
+    start: datetime,
+    latitude: float,
+    longitude: float,
+    slot_minutes: int,
+    t_pool: float,
+    max_temp: float,
+    created_at: datetime,
+    pool: PoolModel | None = None,
+) -> DayPlan | None:
+    """Build slots from a forecast and plan them (None when there is nothing to plan).
+
+    Meant to run in an executor job.
+    """
+    slots = build_slots(forecast, start, latitude, longitude, slot_minutes)
+    if slots is None:
+        return None
+    return plan_day(slots, t_pool, max_temp, created_at, pool)
@@ -0,0 +1,238 @@
+"""Decision policy interface for SolarPool AI.
+
+The coordinator talks to any policy through the small protocol defined here,
+so the Q-learning agent, the fixed warmup rules and the contextual bandit are
+interchangeable and can be selected in the config flow.
+
+This module is intentionally free of NumPy: policy implementations are only
+imported when they are created.
+"""
+from __future__ import annotations
+
+import importlib
+import logging
+from typing import Any, NamedTuple, Protocol, runtime_checkable
+
+from .const import (
+    RL_ACTIONS,
+    DEFAULT_RL_WARMUP_EPISODES,
+    DEFAULT_RL_EXPLORATION_RATE,
+    DEFAULT_RL_MIN_EXPLORATION,
+    POLICY_Q_LEARNING,
+    POLICY_RULES,
+    POLICY_BANDIT,
+    POLICY_LINUCB,
+    POLICY_Q_TILES,
+    POLICY_Q_TREE,
+    POLICY_FROZEN,
+    DEFAULT_POLICY,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+# Episodes that use the deterministic rules before any learning policy explores
+BOOTSTRAP_EPISODES = 10
+
+# Reward constants, shared with the planner's vectorized copy of calculate_reward
+PUMP_COST_PER_HOUR = 0.05  # Penalty per hour of pumping
+EFFICIENCY_BONUS = 0.5  # Bonus for gaining over EFFICIENT_GAIN in under an hour
+EFFICIENT_GAIN = 1.0  # °C
+OFF_REWARD = 0.1  # OFF in a window that could not have gained much
+MISSED_GAIN = 0.5  # °C gained with the pump OFF above which the OFF was a miss
+MISSED_GAIN_PENALTY = -0.5
+
+
+class Transition(NamedTuple):
+    """A completed decision and its measured outcome.
+
+    Attributes:
+        context: Sensor context the decision was made with
+        action: Index into RL_ACTIONS that was chosen
+        reward: Reward computed from the measured gain
+        next_context: Context at the following decision (None if unknown)
+        terminal: No decision follows (e.g. the last cycle of the day)
+    """
+
+    context: dict[str, Any]
+    action: int
+    reward: float
+    next_context: dict[str, Any] | None = None
+    terminal: bool = False
+
+
+@runtime_checkable
+class Policy(Protocol):
+    """Protocol every decision policy implements.
+
+    Decisions are dicts with the keys returned by ``make_decision``.
+    """
+
+    name: str
+    episode_count: int
+
+    @property
+    def is_warmup(self) -> bool:
+        """Whether the policy is still in its warmup phase."""
+
+    @property
+    def exploration_rate(self) -> float:
+        """Current probability of taking an exploratory action."""
+
+    def decide(self, context: dict[str, Any]) -> dict[str, Any]:
+        """Choose an action for a single context."""
+
+    def decide_batch(
+        self, contexts: list[dict[str, Any]], explore: bool = True
+    ) -> list[dict[str, Any]]:
+        """Choose actions for many contexts in one pass (no learning side effects)."""
+
+    def observe(self, transition: Transition) -> None:
+        """Learn from a completed transition."""
+
+    def to_dict(self) -> dict[str, Any]:
+        """Export the policy state for persistence."""
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> Policy:
+        """Restore a policy from persisted state."""
+
+
+def exploration_schedule(
+    episode_count: int,
+    warmup_episodes: int = DEFAULT_RL_WARMUP_EPISODES,
+    initial_rate: float = DEFAULT_RL_EXPLORATION_RATE,
+    min_rate: float = DEFAULT_RL_MIN_EXPLORATION,
+) -> float:
+    """Epsilon schedule shared by the learning policies.
+
+    100% during bootstrap, linear decay until the end of warmup, then the
+    minimum rate.
+    """
+    if episode_count < BOOTSTRAP_EPISODES:
+        return 1.0
+    if episode_count < warmup_episodes:
+        progress = (episode_count - BOOTSTRAP_EPISODES) / (warmup_episodes - BOOTSTRAP_EPISODES)
+        return initial_rate * (1 - progress) + min_rate * progress
+    return min_rate
+
+
+def calculate_reward(
+    actual_gain: float,
+    duration_minutes: int,
+    pump_cost_per_hour: float = PUMP_COST_PER_HOUR,
+    efficiency_bonus: float = EFFICIENCY_BONUS,
+) -> float:
+    """Calculate reward for a completed cycle.
+
+    Args:
+        actual_gain: Temperature increase credited to the decision (°C); the
+            coordinator passes the net gain (measured minus passive)
+        duration_minutes: How long the pump was on
+        pump_cost_per_hour: Cost penalty per hour of pump operation
+        efficiency_bonus: Extra reward for gaining over 1°C in under an hour
+
+    Returns:
+        Reward value (positive = good decision, negative = bad decision)
+    """
+    if duration_minutes == 0:
+        # OFF decision - small reward if correct (no potential gain wasted)
+        return OFF_REWARD if actual_gain < MISSED_GAIN else MISSED_GAIN_PENALTY
+
+    # ON decision - reward based on efficiency
+    hours = duration_minutes / 60
+    pump_cost = pump_cost_per_hour * hours
+
+    # Reward = thermal benefit - cost
+    reward = actual_gain - pump_cost
+
+    # Bonus for efficient decisions
+    if actual_gain > EFFICIENT_GAIN and hours < 1.0:
+        reward += efficiency_bonus  # Bonus for quick efficient heating
+
+    return round(reward, 2)
+
+
+def make_decision(
+    action: int,
+    is_learning: bool,
+    is_warmup: bool,
+    state_index: int | None = None,
+    q_values: list[float] | None = None,
+    epsilon: float = 0.0,
+    propensity: float = 1.0,
+) -> dict[str, Any]:
+    """Build the decision dict every policy returns.
+
+    Policies only choose; the expected gain of the final action (after the
+    safety overrides) comes from the pool's thermal model.
+
+    Args:
+        action: Index into RL_ACTIONS
+        is_learning: Whether this was an exploratory action
+        is_warmup: Whether the policy is in warmup
+        state_index: Discrete state (if the policy uses one)
+        q_values: Per-action values for the state (if available)
+        epsilon: Random-action probability used for this decision
+        propensity: Probability the policy had of choosing this action
+            (1.0 for deterministic decisions), logged for off-policy evaluation
+    """
+    return {
+        "action": "OFF" if action == 0 else "ON",
+        "action_index": action,
+        "heating_duration_minutes": RL_ACTIONS[action],
+        "is_learning": is_learning,
+        "is_warmup": is_warmup,
+        "state_index": state_index,
+        "q_values": q_values if q_values is not None else [],
+        "epsilon": epsilon,
+        "propensity": propensity,
+    }
+
+
+def epsilon_greedy_propensity(epsilon: Any, action: Any, greedy: Any, num_actions: int) -> Any:
+    """Probability that epsilon-greedy picked ``action`` (scalars or arrays).
+
+    A random draw may land on the greedy action too, so the greedy action has
+    probability ``1 - epsilon + epsilon / num_actions``.
+    """
+    return epsilon / num_actions + (1 - epsilon) * (action == greedy)
+
+
+# Policy name -> "module:Class", imported on first use
+POLICY_REGISTRY: dict[str, str] = {
+    POLICY_Q_LEARNING: "rl_agent:RLAgent",
+    POLICY_RULES: "rules:RulesPolicy",
+    POLICY_BANDIT: "bandit:ContextualBanditPolicy",
+    POLICY_LINUCB: "bandit:LinUCBPolicy",
+    POLICY_Q_TILES: "tile_coding:TileCodedAgent",
+    POLICY_Q_TREE: "adaptive_tree:AdaptiveTreeAgent",
+    POLICY_FROZEN: "frozen_policy:FrozenPolicy",
+}
+
+
+def get_policy_class(name: str) -> type[Policy]:
+    """Resolve a policy name to its class, importing the module lazily.
+
+    Unknown names fall back to the default policy.
+    """
+    target = POLICY_REGISTRY.get(name)
+    if target is None:
+        _LOGGER.warning("Unknown policy '%s', using '%s'", name, DEFAULT_POLICY)
+        target = POLICY_REGISTRY[DEFAULT_POLICY]
+    module_name, class_name = target.split(":")
+    module = importlib.import_module(f"{__package__}.{module_name}")
+    return getattr(module, class_name)
+
+
+def create_policy(name: str, state: dict[str, Any] | None = None) -> Policy:
+    """Create a policy by name, restoring persisted state when available.
+
+    Args:
+        name: One of SUPPORTED_POLICIES
+        state: Output of a previous ``to_dict`` call (optional)
+
+    Returns:
+        Policy instance
+    """
+    policy_cls = get_policy_class(name)
+    return policy_cls.from_dict(state or {})
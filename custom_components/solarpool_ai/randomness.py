@@ -0,0 +1,112 @@
+"""Seeded random number generation for the SolarPool AI policies.
+
+Every stochastic policy draws from its own ``numpy.random.Generator`` instead
+of the global ``random``/``np.random`` state, so simulations and backtests can
+run side by side (or in other processes) and still be reproduced. The seed and
+the generator state are persisted with the policy.
+
+In deterministic mode each live decision draws from a generator derived from
+``(seed, decision number)``, so the decision stream for a given input trace is
+bit-identical no matter what else (what-if queries, batch decisions) used the
+policy's generator in between.
+"""
+from __future__ import annotations
+
+import secrets
+from typing import Any
+
+import numpy as np
+
+
+def new_seed() -> int:
+    """Fresh 63-bit seed from OS entropy (fits a JSON/orjson integer)."""
+    return secrets.randbits(63)
+
+
+def _encode_state(value: Any) -> Any:
+    """Make a bit generator state JSON-safe (128-bit integers become strings)."""
+    if isinstance(value, dict):
+        return {key: _encode_state(item) for key, item in value.items()}
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, int) and not isinstance(value, bool) and abs(value) >= 2**53:
+        return str(value)
+    return value
+
+
+def _decode_state(value: Any) -> Any:
+    """Inverse of _encode_state."""
+    if isinstance(value, dict):
+        return {key: _decode_state(item) for key, item in value.items()}
+    if isinstance(value, str) and value.lstrip("-").isdigit():
+        return int(value)
+    return value
+
+
+class SeededRandom:
+    """A policy's generator together with everything needed to reproduce it."""
+
+    def __init__(
+        self,
+        seed: int | None = None,
+        state: dict[str, Any] | None = None,
+        deterministic: bool = False,
+        decisions: int = 0,
+        rng: np.random.Generator | None = None,
+    ) -> None:
+        """Initialize the generator.
+
+        Args:
+            seed: Seed (a fresh one is drawn if None)
+            state: Persisted bit generator state to resume from (optional)
+            deterministic: Derive each decision's draws from (seed, decisions)
+            decisions: Live decisions made so far
+            rng: Generator to use instead of one built from the seed
+        """
+        self.seed = new_seed() if seed is None else int(seed)
+        self.deterministic = deterministic
+        self.decisions = decisions
+        self.generator = rng if rng is not None else np.random.default_rng(self.seed)
+        if state and rng is None:
+            try:
+                self.generator.bit_generator.state = _decode_state(state)
+            except (TypeError, ValueError, KeyError):
+                # A state from another bit generator: keep the fresh seeded one
+                self.generator = np.random.default_rng(self.seed)
+
+    def for_decision(self) -> np.random.Generator:
+        """Generator to draw the next live decision from."""
+        if self.deterministic:
+            return np.random.default_rng([self.seed, self.decisions])
+        return self.generator
+
+    def for_query(self) -> np.random.Generator:
+        """Generator for batch or what-if decisions.
+
+        In deterministic mode these must not disturb the live stream, so they
+        get their own generator derived from the current decision number.
+        """
+        if self.deterministic:
+            return np.random.default_rng([self.seed, self.decisions, 1])
+        return self.generator
+
+    def to_dict(self) -> dict[str, Any]:
+        """Export seed and generator state for persistence."""
+        return {
+            "seed": self.seed,
+            "state": _encode_state(self.generator.bit_generator.state),
+            "deterministic": self.deterministic,
+            "decisions": self.decisions,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any] | None, rng: np.random.Generator | None = None) -> "SeededRandom":
+        """Restore from persisted state; an injected generator takes precedence."""
+        data = data or {}
+        return cls(
+            seed=data.get("seed"),
+            state=data.get("state"),
+            deterministic=data.get("deterministic", False),
+            decisions=data.get("decisions", 0),
+            rng=rng,
+        )
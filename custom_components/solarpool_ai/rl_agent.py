@@ -7,7 +7,6 @@ from __future__ import annotations
 
 import logging
 import json
-import random
 from typing import Any
 
 import numpy as np
@@ -17,10 +16,29 @@ from .const import (
     DEFAULT_RL_WARMUP_EPISODES,
     DEFAULT_RL_EXPLORATION_RATE,
     DEFAULT_RL_MIN_EXPLORATION,
+    POLICY_Q_LEARNING,
+    RETURN_DOUBLE_Q,
+    RETURN_MODES,
+    RETURN_N_STEP,
+    RETURN_ONE_STEP,
 )
+from .policy import (
+    BOOTSTRAP_EPISODES,
+    Transition,
+    calculate_reward,
+    epsilon_greedy_propensity,
+    exploration_schedule,
+    make_decision,
+)
+from .randomness import SeededRandom
+from .rules import rule_based_action
 
 _LOGGER = logging.getLogger(__name__)
 
+# Successor markers in the transition history
+_NEXT_TERMINAL = -1
+_NEXT_PENDING = -2
+
 
 class RLAgent:
     """Q-Learning agent for solar pool pump control.
@@ -34,8 +52,14 @@ class RLAgent:
     Total de estados: 4 × 4 × 3 × 3 = 144 estados posibles
     
     Acciones: [APAGADO, ON_20min, ON_40min, ON_60min, ON_90min]
+    
+    Implementa el protocolo Policy (decide/decide_batch/observe).
     """
     
+    name = POLICY_Q_LEARNING
+    num_states = 4 * 4 * 3 * 3  # 144 states
+    num_actions = len(RL_ACTIONS)  # 5 actions
+    
     # Búferes para la discretización de estados (conversión de valores continuos a categorías)
     DELTA_BINS = [0, 2, 4, 6, float('inf')]
     UV_BINS = [0, 3, 6, 9, float('inf')]
@@ -43,22 +67,61 @@ class RLAgent:
     ELEVATION_BINS = [0, 20, 45, float('inf')]
     
     # Hiperparámetros de Q-Learning
-    ALPHA = 0.1  # Tasa de aprendizaje (qué tanto valoramos la nueva información)
+    ALPHA = 0.1  # Tasa de aprendizaje fija (backends sin conteo de visitas)
+    INIT_Q_MAX = 0.01  # Valores iniciales aleatorios en [0, INIT_Q_MAX) para desempatar
     GAMMA = 0.9  # Factor de descuento (valor de recompensas futuras)
     
+    # Tasa de aprendizaje por par (estado, acción): max(MIN_ALPHA, 1 / n^LR_DECAY).
+    # Los pares nuevos aprenden rápido y los muy visitados se estabilizan, sin
+    # dejar de seguir los cambios de estación.
+    LR_DECAY = 0.5
+    MIN_ALPHA = 0.1
+    # Bono de exploración UCB: UCB_C * sqrt(ln(1 + N_estado) / (1 + n_acción))
+    UCB_C = 0.05
+    # Tras el warmup, epsilon de cada estado decae como sqrt(K / N_estado) a
+    # partir de K visitas: los estados frecuentes dejan de explorar al azar
+    EXPLORATION_VISITS = 50
+    # Calendario de epsilon: decae de INITIAL_EXPLORATION a MIN_EXPLORATION
+    # durante WARMUP_EPISODES ciclos (ver policy.exploration_schedule)
+    WARMUP_EPISODES = DEFAULT_RL_WARMUP_EPISODES
+    INITIAL_EXPLORATION = DEFAULT_RL_EXPLORATION_RATE
+    MIN_EXPLORATION = DEFAULT_RL_MIN_EXPLORATION
+    
+    # Historial de transiciones para los modos double_q / n_step
+    N_STEP = 3
+    HISTORY_SIZE = 512
+    # Actualizaciones entre copias de la tabla que evalúa en double_q
+    TARGET_SYNC = 25
+    
     def __init__(
         self,
         q_table: list[list[float]] | None = None,
         episode_count: int = 0,
+        visit_counts: list[list[int]] | None = None,
+        return_mode: str = RETURN_ONE_STEP,
+        n_step: int | None = None,
+        random_state: dict[str, Any] | None = None,
+        rng: np.random.Generator | None = None,
+        pending: dict[str, Any] | None = None,
+        history: dict[str, list] | None = None,
     ) -> None:
         """Initialize the RL agent.
         
         Args:
             q_table: Pre-trained Q-table (optional)
             episode_count: Number of episodes already completed
+            visit_counts: Updates per (state, action) (optional)
+            return_mode: Learning target, one of RETURN_MODES
+            n_step: Steps of the n_step return (defaults to N_STEP)
+            random_state: Persisted seed and generator state (optional)
+            rng: Generator to draw from instead of one seeded from random_state
+            pending: Persisted one_step transition still waiting for its successor
+            history: Persisted history tail with the transitions not learned yet
         """
-        self.num_states = 4 * 4 * 3 * 3  # 144 states
-        self.num_actions = len(RL_ACTIONS)  # 5 actions
+        if return_mode not in RETURN_MODES:
+            raise ValueError(f"Unknown return mode '{return_mode}'. Available: {', '.join(RETURN_MODES)}")
+        # Generador propio (semilla y estado se guardan en to_dict)
+        self.random = SeededRandom.from_dict(random_state, rng)
         
         # Initialize Q-table
         if q_table is not None and len(q_table) == self.num_states:
@@ -68,28 +131,56 @@ class RLAgent:
                 _LOGGER.warning("RL Agent: Q-table size mismatch (expected %d, got %d). Resetting.", 
                               self.num_states, len(q_table))
             # Initialize with small random values to break ties
-            self.q_table = np.random.uniform(0, 0.01, (self.num_states, self.num_actions))
+            self.q_table = self.random.generator.uniform(0, self.INIT_Q_MAX, (self.num_states, self.num_actions))
+        
+        # Conteo de visitas por (estado, acción), junto a la tabla Q
+        shape = (self.num_states, self.num_actions)
+        if visit_counts is not None and np.shape(visit_counts) == shape:
+            self.visit_counts = np.array(visit_counts, dtype=np.int64)
+        elif q_table is not None and len(q_table) == self.num_states:
+            # Tabla entrenada antes de existir el conteo: los pares que salieron
+            # del rango inicial se asumen ya en el paso fijo anterior, para no
+            # pisar lo aprendido; los demás nunca se visitaron y arrancan en 0
+            legacy_visits = int(np.ceil(self.ALPHA ** (-1 / self.LR_DECAY)))
+            trained = (self.q_table < 0) | (self.q_table > self.INIT_Q_MAX)
+            self.visit_counts = np.where(trained, legacy_visits, 0).astype(np.int64)
+        else:
+            self.visit_counts = np.zeros(shape, dtype=np.int64)
         
         self.episode_count = episode_count
         self.last_state: int | None = None
+        self.last_state_index: int | None = None
         self.last_action: int | None = None
         
+        self.return_mode = return_mode
+        self.n_step = max(1, n_step or self.N_STEP) if return_mode == RETURN_N_STEP else 1
+        # Tabla que evalúa la acción elegida por q_table (double_q); se copia cada TARGET_SYNC
+        self._q_target = self.q_table.copy() if return_mode == RETURN_DOUBLE_Q else None
+        self._updates_since_sync = 0
+        # one_step: transición cuyo sucesor todavía no se conoce (estado, índice, acción, recompensa)
+        self._pending: tuple[Any, int, int, float] | None = None
+        # Historial: estado, acción, recompensa, sucesor y si ya se aprendió
+        # (se persiste solo desde la primera transición sin aprender)
+        size = self.HISTORY_SIZE
+        self._history_states = np.zeros(size, dtype=np.int64)
+        self._history_actions = np.zeros(size, dtype=np.int64)
+        self._history_rewards = np.zeros(size)
+        self._history_next = np.full(size, _NEXT_TERMINAL, dtype=np.int64)
+        self._history_learned = np.zeros(size, dtype=bool)
+        self._history_len = 0
+        self._restore_unlearned(pending, history)
+        
     @property
     def is_warmup(self) -> bool:
         """Check if agent is still in warmup phase."""
-        return self.episode_count < DEFAULT_RL_WARMUP_EPISODES
+        return self.episode_count < self.WARMUP_EPISODES
     
     @property
     def exploration_rate(self) -> float:
         """Calculate current exploration rate (epsilon)."""
-        if self.episode_count < 10:
-            return 1.0  # 100% exploration in first 10 episodes
-        elif self.episode_count < DEFAULT_RL_WARMUP_EPISODES:
-            # Linear decay from initial to minimum
-            progress = (self.episode_count - 10) / (DEFAULT_RL_WARMUP_EPISODES - 10)
-            return DEFAULT_RL_EXPLORATION_RATE * (1 - progress) + DEFAULT_RL_MIN_EXPLORATION * progress
-        else:
-            return DEFAULT_RL_MIN_EXPLORATION
+        return exploration_schedule(
+            self.episode_count, self.WARMUP_EPISODES, self.INITIAL_EXPLORATION, self.MIN_EXPLORATION
+        )
     
     def discretize_state(self, context: dict[str, Any]) -> int:
         """Convierte los datos de los sensores en un índice de estado único (0-143).
@@ -120,130 +211,434 @@ class RLAgent:
                 return i
         return len(bins) - 2
     
+    @classmethod
+    def discretize_states(cls, contexts: list[dict[str, Any]]) -> np.ndarray:
+        """Vectorized version of discretize_state for many contexts.
+        
+        Returns:
+            Integer array of state indices, one per context
+        """
+        n = len(contexts)
+        t_return = np.fromiter((c.get("t_return", 0) for c in contexts), float, n)
+        t_pool = np.fromiter((c.get("t_pool", 0) for c in contexts), float, n)
+        uv = np.fromiter((c.get("uv_index", 0) for c in contexts), float, n)
+        wind = np.fromiter((c.get("wind_speed", 0) for c in contexts), float, n)
+        elevation = np.fromiter((c.get("sun_elevation", 0) for c in contexts), float, n)
+        
+        # searchsorted over the inner thresholds matches _bin_value
+        delta_bin = np.searchsorted(cls.DELTA_BINS[1:-1], t_return - t_pool, side="right")
+        uv_bin = np.searchsorted(cls.UV_BINS[1:-1], uv, side="right")
+        wind_bin = np.searchsorted(cls.WIND_BINS[1:-1], wind, side="right")
+        elevation_bin = np.searchsorted(cls.ELEVATION_BINS[1:-1], elevation, side="right")
+        
+        return delta_bin * 36 + uv_bin * 9 + wind_bin * 3 + elevation_bin
+    
+    def _exploration_bonus(self, state_indices: np.ndarray) -> np.ndarray:
+        """UCB bonus per action for one state (actions,) or many (n, actions).
+        
+        Acciones poco probadas en un estado reciben un bono que decrece con
+        sus visitas, así los estados raros siguen explorándose tras el warmup.
+        """
+        counts = self.visit_counts[state_indices]
+        state_visits = counts.sum(axis=-1, keepdims=True)
+        return self.UCB_C * np.sqrt(np.log1p(state_visits) / (1 + counts))
+    
+    def _state_exploration_rates(self, state_indices: np.ndarray) -> np.ndarray:
+        """Epsilon for each discrete state (global schedule scaled by its visits)."""
+        rate = self.exploration_rate
+        state_visits = self.visit_counts[state_indices].sum(axis=-1)
+        if self.is_warmup:
+            return np.full(np.shape(state_visits), rate)
+        return rate * np.sqrt(self.EXPLORATION_VISITS / np.maximum(self.EXPLORATION_VISITS, state_visits))
+    
+    def _learning_rate(self, state_index: int, action: int) -> float:
+        """Step size for a (state, action) pair from its visit count."""
+        visits = max(int(self.visit_counts[state_index, action]), 1)
+        return max(self.MIN_ALPHA, visits ** -self.LR_DECAY)
+    
+    # --- Q-function backend ---
+    # The tabular agent uses the discrete state index as its representation.
+    # Function-approximation subclasses override these four methods and keep
+    # the get_action/update/to_dict API unchanged.
+    
+    def _encode(self, context: dict[str, Any], state_index: int) -> Any:
+        """Representation of a context used by the Q-function."""
+        return state_index
+    
+    def _encode_batch(self, contexts: list[dict[str, Any]], state_indices: np.ndarray) -> Any:
+        """Vectorized _encode for many contexts."""
+        return state_indices
+    
+    def _q(self, state: Any) -> np.ndarray:
+        """Q-values of every action for an encoded state (or batch of states)."""
+        return self.q_table[state]
+    
+    def _td_update(self, state: Any, action: int, target: float) -> tuple[float, float]:
+        """Move Q(state, action) towards target.
+        
+        Returns:
+            (old_q, new_q)
+        """
+        old_q = float(self.q_table[state, action])
+        # Fórmula: NuevoQ = ViejoQ + alpha(n) * (Objetivo - ViejoQ)
+        new_q = old_q + self._learning_rate(state, action) * (target - old_q)
+        self.q_table[state, action] = new_q
+        return old_q, new_q
+    
     def get_action(self, context: dict[str, Any]) -> dict[str, Any]:
         """Determina la mejor acción a tomar según el contexto actual.
         
         Utiliza una estrategia epsilon-greedy: la mayoría de las veces elige la mejor acción
         conocida, pero ocasionalmente 'explora' nuevas opciones para seguir aprendiendo.
         """
-        state = self.discretize_state(context)
+        state_index = self.discretize_state(context)
+        state = self._encode(context, state_index)
+        q_values = self._q(state)
         self.last_state = state
+        self.last_state_index = state_index
         
         # Durante los primeros 10 ciclos (bootstrap), usamos reglas lógicas fijas
-        if self.is_warmup and self.episode_count < 10:
+        epsilon = 0.0
+        propensity = 1.0
+        if self.is_warmup and self.episode_count < BOOTSTRAP_EPISODES:
             action, is_learning = self._get_warmup_action(context)
         else:
             # Selección de acción Epsilon-greedy
-            if random.random() < self.exploration_rate:
+            epsilon = float(self._state_exploration_rates(state_index))
+            optimistic = int(np.argmax(q_values + self._exploration_bonus(state_index)))
+            rng = self.random.for_decision()
+            if rng.random() < epsilon:
                 # EXPLORACIÓN: Elegimos una acción al azar
-                action = random.randint(0, self.num_actions - 1)
+                action = int(rng.integers(self.num_actions))
                 is_learning = True
-                _LOGGER.debug("RL Agent: Explorando (ε=%.2f), acción=%d", self.exploration_rate, action)
+                _LOGGER.debug("RL Agent: Explorando (ε=%.2f), acción=%d", epsilon, action)
             else:
-                # EXPLOTACIÓN: Elegimos la acción con el valor Q más alto para este estado
-                action = int(np.argmax(self.q_table[state]))
-                is_learning = False
+                # EXPLOTACIÓN: la acción con mayor Q + bono UCB de este estado
+                # (si el bono cambia la elección, cuenta como aprendizaje)
+                greedy = int(np.argmax(q_values))
+                action = optimistic
+                is_learning = action != greedy
                 _LOGGER.debug("RL Agent: Explotando conocimiento, estado=%d, acción=%d, Q=%.3f", 
-                            state, action, self.q_table[state, action])
+                            state_index, action, q_values[action])
+            propensity = float(epsilon_greedy_propensity(epsilon, action, optimistic, self.num_actions))
         
         self.last_action = action
-        duration = RL_ACTIONS[action]
-        
-        # UV is already properly set by coordinator (sensor > weather > estimation)
-        uv = context.get("uv_index", 0)
-        
-        return {
-            "action": "OFF" if action == 0 else "ON",
-            "heating_duration_minutes": duration,
-            "expected_gain": self._estimate_gain(context, duration),
-            "is_learning": is_learning,
-            "is_warmup": self.is_warmup,
-            "state_index": state,
-            "q_values": self.q_table[state].tolist(),
-        }
+        self.random.decisions += 1
+        
+        return make_decision(
+            action,
+            is_learning=is_learning,
+            is_warmup=self.is_warmup,
+            state_index=state_index,
+            q_values=q_values.tolist(),
+            epsilon=epsilon,
+            propensity=propensity,
+        )
     
-    def _get_warmup_action(self, context: dict[str, Any]) -> tuple[int, bool]:
-        """Get action using deterministic rules during warmup.
+    def decide(self, context: dict[str, Any]) -> dict[str, Any]:
+        """Policy protocol: choose an action for a single context."""
+        return self.get_action(context)
+    
+    def decide_batch(
+        self, contexts: list[dict[str, Any]], explore: bool = True
+    ) -> list[dict[str, Any]]:
+        """Policy protocol: choose actions for many contexts in one pass.
         
-        Conservative rules: only ON if delta > 4°C and UV > 5
+        Does not touch last_state/last_action, so it is safe for what-if
+        queries and benchmarks.
         
-        Returns:
-            (action_index, is_learning)
+        Args:
+            contexts: Sensor contexts
+            explore: Apply epsilon-greedy exploration (False = pure greedy)
         """
-        delta = context.get("t_return", 0) - context.get("t_pool", 0)
-        uv = context.get("uv_index", 0)
-        wind = context.get("wind_speed", 0)
-        
-        # Conservative OFF conditions
-        if delta < 4.0 or uv < 5:
-            return 0, False  # OFF
-        
-        if wind > 25:
-            return 0, False  # OFF
-        
-        # Determine duration based on conditions
-        if delta > 6 and uv > 7 and wind < 15:
-            return 4, False  # ON_90min
-        elif delta > 5 and uv > 6:
-            return 3, False  # ON_60min
+        n = len(contexts)
+        if n == 0:
+            return []
+        states = self.discretize_states(contexts)
+        q_values = self._q(self._encode_batch(contexts, states))
+        is_learning = np.zeros(n, dtype=bool)
+        epsilons = np.zeros(n)
+        propensities = np.ones(n)
+        
+        if self.is_warmup and self.episode_count < BOOTSTRAP_EPISODES:
+            actions = np.fromiter((rule_based_action(c) for c in contexts), int, n)
         else:
-            return 2, False  # ON_40min
+            actions = np.argmax(q_values, axis=1)
+            if explore:
+                optimistic = np.argmax(q_values + self._exploration_bonus(states), axis=1)
+                is_learning = optimistic != actions
+                actions = optimistic
+                rng = self.random.for_query()
+                epsilons = self._state_exploration_rates(states)
+                is_epsilon = rng.random(n) < epsilons
+                is_learning |= is_epsilon
+                random_actions = rng.integers(0, self.num_actions, n)
+                actions = np.where(is_epsilon, random_actions, actions)
+                propensities = epsilon_greedy_propensity(epsilons, actions, optimistic, self.num_actions)
+        
+        is_warmup = self.is_warmup
+        return [
+            make_decision(
+                int(action),
+                is_learning=bool(learning),
+                is_warmup=is_warmup,
+                state_index=int(state),
+                q_values=values,
+                epsilon=float(epsilon),
+                propensity=float(propensity),
+            )
+            for action, learning, state, values, epsilon, propensity in zip(
+                actions, is_learning, states, q_values.tolist(), epsilons, propensities
+            )
+        ]
     
-    def _estimate_gain(self, context: dict[str, Any], duration: int) -> float:
-        """Estimate thermal gain for a given duration.
+    def observe(self, transition: Transition) -> None:
+        """Policy protocol: learn from a completed transition.
         
-        Args:
-            context: Sensor context with uv_index, t_return, t_pool
-            duration: Pump duration in minutes
-            
-        Returns:
-            Estimated temperature gain in °C
+        The state is recomputed from the stored context, so learning does
+        not depend on the in-memory last_state surviving a restart.
         """
-        if duration == 0:
-            return 0.0
-        
-        delta = context.get("t_return", 0) - context.get("t_pool", 0)
-        uv = context.get("uv_index", 0)
-        
-        # Efficiency factor: combines UV and delta influence
-        # With UV=0 (cloudy), efficiency is very low
-        efficiency_factor = max(0.05, min(1.0, uv / 10) * min(1.0, delta / 5))
-        base_gain_per_hour = 1.0  # 1°C per hour under ideal conditions
+        self.last_state_index = self.discretize_state(transition.context)
+        self.last_state = self._encode(transition.context, self.last_state_index)
+        self.last_action = transition.action
+        self.update(transition.reward, transition.next_context, transition.terminal)
+    
+    def _get_warmup_action(self, context: dict[str, Any]) -> tuple[int, bool]:
+        """Get action using deterministic rules during warmup.
         
-        return round(max(0.0, efficiency_factor * base_gain_per_hour * (duration / 60)), 2)
+        Returns:
+            (action_index, is_learning)
+        """
+        return rule_based_action(context), False
     
-    def update(self, reward: float, next_context: dict[str, Any] | None = None) -> None:
+    def update(
+        self,
+        reward: float,
+        next_context: dict[str, Any] | None = None,
+        terminal: bool = False,
+    ) -> None:
         """Actualiza la tabla Q basándose en la recompensa recibida tras la acción.
         
         Este es el núcleo del aprendizaje: ajusta los valores de la tabla Q para que
         las acciones que dieron buenos resultados sean más probables en el futuro.
+        
+        En los modos double_q y n_step la transición se guarda en el historial y
+        se aprende cuando su objetivo se puede calcular (al conocerse el sucesor).
+        En one_step, sin next_context ni terminal, queda pendiente hasta la
+        siguiente observación, cuyo estado es el sucesor.
         """
         if self.last_state is None or self.last_action is None:
             _LOGGER.warning("RL Agent: No se puede actualizar, falta estado/acción previa")
             return
         
+        if self.return_mode != RETURN_ONE_STEP:
+            next_state = _NEXT_PENDING
+            if next_context is not None:
+                next_state = self.discretize_state(next_context)
+            elif terminal:
+                next_state = _NEXT_TERMINAL
+            self._remember(self.last_state_index, self.last_action, reward, next_state)
+            self._learn_from_history()
+            self.episode_count += 1
+            self.last_state = None
+            self.last_state_index = None
+            self.last_action = None
+            return
+        
+        # La transición pendiente tiene como sucesor al estado que se observa ahora
+        if self._pending is not None:
+            state, state_index, action, pending_reward = self._pending
+            self._pending = None
+            self._learn_one_step(state, state_index, action, pending_reward, float(np.max(self._q(self.last_state))))
+        
         # Estimamos el valor máximo del siguiente estado (Bellman Equation)
         if next_context is not None:
-            next_state = self.discretize_state(next_context)
-            max_next_q = np.max(self.q_table[next_state])
+            next_state = self._encode(next_context, self.discretize_state(next_context))
+            max_next_q = float(np.max(self._q(next_state)))
+            self._learn_one_step(self.last_state, self.last_state_index, self.last_action, reward, max_next_q)
+        elif terminal:
+            self._learn_one_step(self.last_state, self.last_state_index, self.last_action, reward, 0.0)
         else:
-            max_next_q = 0
-        
-        # Actualización de Q-Learning
-        old_q = self.q_table[self.last_state, self.last_action]
-        # Fórmula: NuevoQ = ViejoQ + ALPHA * (Recompensa + GAMMA * MaxSiguienteQ - ViejoQ)
-        new_q = old_q + self.ALPHA * (reward + self.GAMMA * max_next_q - old_q)
-        self.q_table[self.last_state, self.last_action] = new_q
-        
-        _LOGGER.info(
-            "RL Update: estado=%d, acción=%d, recompensa=%.2f, Q: %.3f -> %.3f",
-            self.last_state, self.last_action, reward, old_q, new_q
-        )
+            # El coordinador mide un ciclo antes de la próxima decisión: se
+            # aprende cuando la siguiente transición muestra el sucesor
+            self._pending = (self.last_state, self.last_state_index, self.last_action, reward)
         
         self.episode_count += 1
         self.last_state = None
+        self.last_state_index = None
         self.last_action = None
     
+    # --- Transition history (tabular only) ---
+    
+    def _learn_one_step(
+        self, state: Any, state_index: int | None, action: int, reward: float, max_next_q: float
+    ) -> None:
+        """One-step Q-learning update: target = reward + GAMMA * max Q(successor)."""
+        # Contamos la visita antes de actualizar: el paso depende de ella
+        if state_index is not None:
+            self.visit_counts[state_index, action] += 1
+        old_q, new_q = self._td_update(state, action, reward + self.GAMMA * max_next_q)
+        _LOGGER.debug(
+            "RL Update: acción=%d, recompensa=%.2f, Q: %.3f -> %.3f",
+            action, reward, old_q, new_q
+        )
+    
+    def _remember(self, state: int, action: int, reward: float, next_state: int) -> None:
+        """Append a transition, linking the previous one if its successor was unknown."""
+        n = self._history_len
+        if n and self._history_next[n - 1] == _NEXT_PENDING:
+            self._history_next[n - 1] = state
+        if n == self.HISTORY_SIZE:
+            # Drop the oldest half in one copy instead of shifting every update
+            keep = self.HISTORY_SIZE // 2
+            for array in (
+                self._history_states,
+                self._history_actions,
+                self._history_rewards,
+                self._history_next,
+                self._history_learned,
+            ):
+                array[:keep] = array[n - keep:n]
+            n = keep
+        self._history_states[n] = state
+        self._history_actions[n] = action
+        self._history_rewards[n] = reward
+        self._history_next[n] = next_state
+        self._history_learned[n] = False
+        self._history_len = n + 1
+    
+    def _restore_unlearned(self, pending: dict[str, Any] | None, history: dict[str, list] | None) -> None:
+        """Restore the transitions measured but not learned yet when the agent was saved.
+
+        They may come from another return mode (the coordinator rebuilds the
+        agent from to_dict when the mode changes): a pending one_step transition
+        enters the history with an unknown successor, and history entries whose
+        successor is already known are learned one-step right away.
+        """
+        if history:
+            entries = zip(
+                history["states"], history["actions"], history["rewards"], history["next"], history["learned"]
+            )
+            for state, action, reward, next_state, learned in list(entries)[-self.HISTORY_SIZE:]:
+                if self.return_mode != RETURN_ONE_STEP:
+                    self._remember(state, action, reward, next_state)
+                    self._history_learned[self._history_len - 1] = learned
+                elif learned:
+                    continue
+                elif next_state == _NEXT_PENDING:
+                    self._pending = (state, state, action, reward)
+                else:
+                    max_next_q = float(np.max(self._q(next_state))) if next_state >= 0 else 0.0
+                    self._learn_one_step(state, state, action, reward, max_next_q)
+        if pending:
+            state = pending["state"]
+            state = np.asarray(state) if isinstance(state, list) else state
+            state_index, action, reward = pending["state_index"], pending["action"], pending["reward"]
+            if self.return_mode == RETURN_ONE_STEP:
+                self._pending = (state, state_index, action, reward)
+            elif state_index is not None:
+                self._remember(state_index, action, reward, _NEXT_PENDING)
+
+    def _unlearned_to_dict(self) -> dict[str, Any]:
+        """Transitions measured but not learned yet, for to_dict."""
+        data: dict[str, Any] = {}
+        if self._pending is not None:
+            state, state_index, action, reward = self._pending
+            data["pending"] = {
+                "state": np.asarray(state).tolist(),
+                "state_index": None if state_index is None else int(state_index),
+                "action": int(action),
+                "reward": float(reward),
+            }
+        unlearned = np.flatnonzero(~self._history_learned[:self._history_len])
+        if len(unlearned):
+            # Desde la primera sin aprender: los retornos n-step siguen la cadena
+            tail = slice(int(unlearned[0]), self._history_len)
+            data["history"] = {
+                "states": self._history_states[tail].tolist(),
+                "actions": self._history_actions[tail].tolist(),
+                "rewards": self._history_rewards[tail].tolist(),
+                "next": self._history_next[tail].tolist(),
+                "learned": self._history_learned[tail].tolist(),
+            }
+        return data
+
+    def _bootstrap(self, next_states: np.ndarray) -> np.ndarray:
+        """Value of the successor states (vectorized) for the current return mode."""
+        q_next = self.q_table[next_states]
+        if self.return_mode == RETURN_DOUBLE_Q:
+            # q_table elige la acción, la copia retrasada la evalúa (menos sobreestimación)
+            best = np.argmax(q_next, axis=1)
+            return self._q_target[next_states, best]
+        return q_next.max(axis=1)
+    
+    def history_targets(self, indices: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Learning targets for history entries, vectorized over the entries.
+        
+        The n-step return follows the chain of consecutive transitions while
+        each successor is the state of the next stored transition; it stops
+        early at a terminal transition or a break in the chain.
+        
+        Args:
+            indices: Positions in the history
+            
+        Returns:
+            (targets, ready): ready is False where the return still depends on
+            transitions that have not been observed yet
+        """
+        length = self._history_len
+        states = self._history_states[:length]
+        next_states = self._history_next[:length]
+        rewards = self._history_rewards[:length]
+        
+        targets = np.zeros(len(indices))
+        ready = np.zeros(len(indices), dtype=bool)
+        discount = np.ones(len(indices))
+        alive = np.ones(len(indices), dtype=bool)
+        for k in range(self.n_step):
+            position = indices + k
+            at = np.minimum(position, length - 1)
+            targets += np.where(alive, discount * rewards[at], 0.0)
+            nxt = next_states[at]
+            has_successor = position + 1 < length
+            successor = states[np.minimum(position + 1, length - 1)]
+            chained = alive & (nxt >= 0) & has_successor & (successor == nxt)
+            
+            ready |= alive & (nxt == _NEXT_TERMINAL)
+            if k == self.n_step - 1:
+                bootstrap = alive & (nxt >= 0)
+            else:
+                bootstrap = alive & (nxt >= 0) & has_successor & ~chained
+            if bootstrap.any():
+                targets[bootstrap] += (
+                    discount[bootstrap] * self.GAMMA * self._bootstrap(nxt[bootstrap])
+                )
+            ready |= bootstrap
+            alive = chained
+            discount = discount * self.GAMMA
+        return targets, ready
+    
+    def _learn_from_history(self) -> None:
+        """Apply the online update to every history entry whose target is now known."""
+        pending = np.nonzero(~self._history_learned[:self._history_len])[0]
+        if len(pending) == 0:
+            return
+        targets, ready = self.history_targets(pending)
+        for index, target in zip(pending[ready], targets[ready]):
+            state = int(self._history_states[index])
+            action = int(self._history_actions[index])
+            self.visit_counts[state, action] += 1
+            old_q, new_q = self._td_update(state, action, float(target))
+            self._history_learned[index] = True
+            _LOGGER.debug(
+                "RL Update (%s): estado=%d, acción=%d, Q: %.3f -> %.3f",
+                self.return_mode, state, action, old_q, new_q,
+            )
+            self._updates_since_sync += 1
+        if self._q_target is not None and self._updates_since_sync >= self.TARGET_SYNC:
+            self._q_target = self.q_table.copy()
+            self._updates_since_sync = 0
+    
     def calculate_reward(
         self,
         actual_gain: float,
@@ -260,29 +655,45 @@ class RLAgent:
         Returns:
             Reward value (positive = good decision, negative = bad decision)
         """
-        if duration_minutes == 0:
-            # OFF decision - small reward if correct (no potential gain wasted)
-            return 0.1 if actual_gain < 0.5 else -0.5
-        
-        # ON decision - reward based on efficiency
-        hours = duration_minutes / 60
-        pump_cost = pump_cost_per_hour * hours
-        
-        # Reward = thermal benefit - cost
-        reward = actual_gain - pump_cost
-        
-        # Bonus for efficient decisions
-        if actual_gain > 1.0 and hours < 1.0:
-            reward += 0.5  # Bonus for quick efficient heating
-        
-        return round(reward, 2)
+        return calculate_reward(actual_gain, duration_minutes, pump_cost_per_hour)
     
+    def apply_prior(self, prior: np.ndarray, prior_visits: np.ndarray) -> int:
+        """Warm-start the cells this agent never tried from a prior table.
+
+        Only cells with no own visits and some prior visits take the prior
+        value; everything this agent has learned is left as is. Applying a
+        newer prior again just replaces the still-unvisited cells, so repeated
+        merges never pull learned cells toward the consensus. Visit counts are
+        not changed: the first own update of a warm-started cell uses the full
+        learning rate.
+
+        Args:
+            prior: Prior Q-values, shape (num_states, num_actions)
+            prior_visits: Visits behind each prior value
+
+        Returns:
+            Cells updated
+        """
+        cells = (prior_visits > 0) & (self.visit_counts == 0)
+        cells &= self.q_table != prior
+        self.q_table[cells] = prior[cells]
+        if self._q_target is not None:
+            self._q_target[cells] = prior[cells]
+        return int(cells.sum())
+
     def to_dict(self) -> dict[str, Any]:
         """Export agent state for persistence."""
-        return {
+        data = {
             "q_table": self.q_table.tolist(),
+            "visit_counts": self.visit_counts.tolist(),
             "episode_count": self.episode_count,
+            "random": self.random.to_dict(),
         }
+        if self.return_mode != RETURN_ONE_STEP:
+            data["return_mode"] = self.return_mode
+            data["n_step"] = self.n_step
+        data.update(self._unlearned_to_dict())
+        return data
     
     @classmethod
     def from_dict(cls, data: dict[str, Any]) -> "RLAgent":
@@ -290,4 +701,10 @@ class RLAgent:
         return cls(
             q_table=data.get("q_table"),
             episode_count=data.get("episode_count", 0),
+            visit_counts=data.get("visit_counts"),
+            return_mode=data.get("return_mode", RETURN_ONE_STEP),
+            n_step=data.get("n_step"),
+            random_state=data.get("random"),
+            pending=data.get("pending"),
+            history=data.get("history"),
         )
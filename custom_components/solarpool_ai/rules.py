@@ -0,0 +1,92 @@
+"""Rule-based decision policy for SolarPool AI.
+
+These are the conservative rules the Q-learning agent uses during bootstrap,
+exposed as a standalone policy for pools that prefer predictable behaviour
+(and as a baseline for benchmarks).
+"""
+from __future__ import annotations
+
+from typing import Any
+
+from .const import POLICY_RULES
+from .policy import Transition, make_decision
+
+
+def rule_based_action(context: dict[str, Any]) -> int:
+    """Get action using deterministic rules.
+
+    Conservative rules: only ON if delta > 4°C and UV > 5
+
+    Returns:
+        Action index into RL_ACTIONS
+    """
+    delta = context.get("t_return", 0) - context.get("t_pool", 0)
+    uv = context.get("uv_index", 0)
+    wind = context.get("wind_speed", 0)
+
+    # Conservative OFF conditions
+    if delta < 4.0 or uv < 5:
+        return 0  # OFF
+
+    if wind > 25:
+        return 0  # OFF
+
+    # Determine duration based on conditions
+    if delta > 6 and uv > 7 and wind < 15:
+        return 4  # ON_90min
+    elif delta > 5 and uv > 6:
+        return 3  # ON_60min
+    else:
+        return 2  # ON_40min
+
+
+class RulesPolicy:
+    """Policy that always applies the deterministic warmup rules."""
+
+    name = POLICY_RULES
+
+    def __init__(self, episode_count: int = 0) -> None:
+        """Initialize the rules policy.
+
+        Args:
+            episode_count: Number of cycles already completed
+        """
+        self.episode_count = episode_count
+
+    @property
+    def is_warmup(self) -> bool:
+        """Rules never warm up."""
+        return False
+
+    @property
+    def exploration_rate(self) -> float:
+        """Rules never explore."""
+        return 0.0
+
+    def decide(self, context: dict[str, Any]) -> dict[str, Any]:
+        """Apply the rules to a single context."""
+        action = rule_based_action(context)
+        return make_decision(
+            action,
+            is_learning=False,
+            is_warmup=False,
+        )
+
+    def decide_batch(
+        self, contexts: list[dict[str, Any]], explore: bool = True
+    ) -> list[dict[str, Any]]:
+        """Apply the rules to many contexts."""
+        return [self.decide(context) for context in contexts]
+
+    def observe(self, transition: Transition) -> None:
+        """Count the cycle; rules do not learn."""
+        self.episode_count += 1
+
+    def to_dict(self) -> dict[str, Any]:
+        """Export policy state for persistence."""
+        return {"episode_count": self.episode_count}
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "RulesPolicy":
+        """Create policy from persisted state."""
+        return cls(episode_count=data.get("episode_count", 0))
@@ -7,9 +7,9 @@ from homeassistant.components.sensor import (
     SensorStateClass,
 )
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import UnitOfTemperature
+from homeassistant.const import UnitOfTemperature, UnitOfTime
 from homeassistant.util.dt import utcnow
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from homeassistant.helpers.entity import EntityCategory
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
@@ -36,6 +36,7 @@ async def async_setup_entry(
             SolarPoolRLEpsilonSensor(coordinator),
             SolarPoolRLRewardSensor(coordinator),
             SolarPoolDailyGainSensor(coordinator),
+            SolarPoolDayPlanSensor(coordinator),
         ]
     )
 
@@ -54,6 +55,12 @@ class SolarPoolBaseSensor(CoordinatorEntity[SolarPoolCoordinator], SensorEntity)
             "model": "RL Swimming Pool Controller",
         }
 
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Write the state (property reads included), timed by the loop monitor."""
+        with self.coordinator.loop_monitor.measure(self.entity_id):
+            super()._handle_coordinator_update()
+
 class SolarPoolStatusSensor(SolarPoolBaseSensor):
     """Sensor for SolarPool Status."""
     _attr_icon = "mdi:pool"
@@ -82,6 +89,14 @@ class SolarPoolExpectedGainSensor(SolarPoolBaseSensor):
     @property
     def native_value(self) -> float:
         return self.coordinator.expected_gain
+    @property
+    def extra_state_attributes(self) -> dict:
+        model = self.coordinator.thermal_model
+        return {
+            "model_calibrated": model.is_calibrated,
+            "model_cycles": model.gain.samples,
+            "heating_rate": round(float(model.gain.theta[0]), 4),
+        }
 
 class SolarPoolNextRunSensor(SolarPoolBaseSensor):
     """Sensor for SolarPool Next Run Time."""
@@ -101,7 +116,7 @@ class SolarPoolRLEpisodesSensor(SolarPoolBaseSensor):
         super().__init__(coordinator, "rl_episodes", "RL Episodes")
     @property
     def native_value(self) -> int:
-        return self.coordinator.rl_agent.episode_count
+        return self.coordinator.policy.episode_count
     
     _attr_entity_category = EntityCategory.DIAGNOSTIC
 
@@ -112,7 +127,7 @@ class SolarPoolRLPhaseSensor(SolarPoolBaseSensor):
         super().__init__(coordinator, "rl_phase", "RL Phase")
     @property
     def native_value(self) -> str:
-        count = self.coordinator.rl_agent.episode_count
+        count = self.coordinator.policy.episode_count
         lang = self.coordinator.explanation_engine.language
         from .translations import get_text
         if count < 10:
@@ -131,7 +146,7 @@ class SolarPoolRLEpsilonSensor(SolarPoolBaseSensor):
         super().__init__(coordinator, "rl_epsilon", "RL Exploration Rate")
     @property
     def native_value(self) -> float:
-        return round(self.coordinator.rl_agent.exploration_rate, 3)
+        return round(self.coordinator.policy.exploration_rate, 3)
     
     _attr_entity_category = EntityCategory.DIAGNOSTIC
 
@@ -156,3 +171,18 @@ class SolarPoolDailyGainSensor(SolarPoolBaseSensor):
     @property
     def native_value(self) -> float:
         return self.coordinator.daily_gain
+
+class SolarPoolDayPlanSensor(SolarPoolBaseSensor):
+    """Sensor for the forecast-based day plan (planned heating minutes)."""
+    _attr_icon = "mdi:calendar-clock"
+    _attr_native_unit_of_measurement = UnitOfTime.MINUTES
+    def __init__(self, coordinator: SolarPoolCoordinator) -> None:
+        super().__init__(coordinator, "day_plan", "Day Plan")
+    @property
+    def native_value(self) -> int | None:
+        plan = self.coordinator.day_plan
+        return plan.heating_minutes if plan is not None else None
+    @property
+    def extra_state_attributes(self) -> dict | None:
+        plan = self.coordinator.day_plan
+        return plan.as_attributes() if plan is not None else None
@@ -0,0 +1,263 @@
+"""Services of the SolarPool AI integration."""
+from __future__ import annotations
+
+import logging
+from functools import partial
+from pathlib import Path
+
+import voluptuous as vol
+
+from homeassistant.core import HomeAssistant, ServiceCall, ServiceResponse, SupportsResponse
+from homeassistant.exceptions import HomeAssistantError
+import homeassistant.helpers.config_validation as cv
+from homeassistant.util import dt as dt_util
+
+from .agent_transfer import FILE_SUFFIX, AgentFileError, read_agent_file, write_agent_files
+from .const import (
+    DOMAIN,
+    POLICY_Q_LEARNING,
+    SERVICE_EXPORT_AGENT,
+    SERVICE_EXPORT_HISTORY,
+    SERVICE_IMPORT_AGENT,
+    SERVICE_LIST_CHECKPOINTS,
+    SERVICE_ROLLBACK,
+    SERVICE_SIMULATE,
+)
+from .coordinator import SolarPoolCoordinator
+from .history_export import FORMATS, export_history
+from .what_if import CONTEXT_KEYS, build_contexts
+
+_LOGGER = logging.getLogger(__name__)
+
+ATTR_ENTRY_ID = "entry_id"
+ATTR_FORMAT = "format"
+ATTR_START = "start"
+ATTR_END = "end"
+ATTR_DIRECTORY = "directory"
+ATTR_CHECKPOINT_ID = "checkpoint_id"
+ATTR_PATH = "path"
+ATTR_CONTEXTS = "contexts"
+ATTR_GRID = "grid"
+ATTR_PUMP_RUN_MINUTES = "pump_run_minutes"
+
+EXPORT_HISTORY_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_ENTRY_ID): vol.All(cv.ensure_list, [cv.string]),
+        vol.Optional(ATTR_FORMAT, default="csv"): vol.In(FORMATS),
+        vol.Optional(ATTR_START): cv.datetime,
+        vol.Optional(ATTR_END): cv.datetime,
+        vol.Optional(ATTR_DIRECTORY): cv.string,
+    }
+)
+
+LIST_CHECKPOINTS_SCHEMA = vol.Schema({vol.Required(ATTR_ENTRY_ID): cv.string})
+
+ROLLBACK_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_ENTRY_ID): cv.string,
+        vol.Optional(ATTR_CHECKPOINT_ID): cv.positive_int,
+    }
+)
+
+EXPORT_AGENT_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_ENTRY_ID): vol.All(cv.ensure_list, [cv.string]),
+        vol.Optional(ATTR_DIRECTORY): cv.string,
+    }
+)
+
+IMPORT_AGENT_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_ENTRY_ID): vol.All(cv.ensure_list, [cv.string]),
+        vol.Required(ATTR_PATH): cv.string,
+    }
+)
+
+SIMULATE_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_ENTRY_ID): cv.string,
+        vol.Optional(ATTR_CONTEXTS): vol.All(
+            cv.ensure_list, [vol.Schema({vol.Optional(key): vol.Coerce(float) for key in CONTEXT_KEYS})]
+        ),
+        vol.Optional(ATTR_GRID): vol.Schema(
+            {vol.Optional(key): vol.All(cv.ensure_list, [vol.Coerce(float)]) for key in CONTEXT_KEYS}
+        ),
+        vol.Optional(ATTR_PUMP_RUN_MINUTES): vol.All(vol.Coerce(float), vol.Range(min=0)),
+    }
+)
+
+
+def _coordinators(hass: HomeAssistant, entry_ids: list[str] | None) -> dict[str, SolarPoolCoordinator]:
+    """Loaded coordinators of the requested entries (all of them when None)."""
+    loaded: dict[str, SolarPoolCoordinator] = hass.data.get(DOMAIN, {})
+    if entry_ids is None:
+        return dict(loaded)
+    missing = [entry_id for entry_id in entry_ids if entry_id not in loaded]
+    if missing:
+        raise HomeAssistantError(f"SolarPool AI entries not loaded: {', '.join(missing)}")
+    return {entry_id: loaded[entry_id] for entry_id in entry_ids}
+
+
+def _coordinator(hass: HomeAssistant, entry_id: str) -> SolarPoolCoordinator:
+    """Loaded coordinator of one entry."""
+    return _coordinators(hass, [entry_id])[entry_id]
+
+
+def _checked_path(hass: HomeAssistant, path: str) -> str:
+    """Absolute path (relative ones are in the config folder) the integration may use.
+
+    Raises:
+        HomeAssistantError: Outside solarpool_ai/ and allowlist_external_dirs
+    """
+    path = hass.config.path(path)
+    own = Path(hass.config.path(DOMAIN)).resolve()
+    if not Path(path).resolve().is_relative_to(own) and not hass.config.is_allowed_path(path):
+        raise HomeAssistantError(f"{path} is not in allowlist_external_dirs")
+    return path
+
+
+async def _async_export_history(hass: HomeAssistant, call: ServiceCall) -> ServiceResponse:
+    """Export the cycle traces of some entries to CSV or .npz files."""
+    coordinators = _coordinators(hass, call.data.get(ATTR_ENTRY_ID))
+    directory = call.data.get(ATTR_DIRECTORY)
+    directory = _checked_path(hass, directory) if directory is not None else hass.config.path(DOMAIN, "exports")
+
+    # Selector times are local; the trace log stores UTC
+    start = call.data.get(ATTR_START)
+    end = call.data.get(ATTR_END)
+    start = dt_util.as_utc(start) if start is not None else None
+    end = dt_util.as_utc(end) if end is not None else None
+
+    # Cycles still buffered in memory belong in the export
+    for coordinator in coordinators.values():
+        await coordinator.tracer.async_flush()
+
+    stamp = dt_util.utcnow().strftime("%Y%m%dT%H%M%SZ")
+    try:
+        summary = await hass.async_add_executor_job(
+            export_history,
+            [coordinator.tracer.path for coordinator in coordinators.values()],
+            directory,
+            call.data[ATTR_FORMAT],
+            start,
+            end,
+            f"solarpool_{stamp}",
+        )
+    except OSError as err:
+        raise HomeAssistantError(f"Could not export SolarPool AI history: {err}") from err
+    _LOGGER.info(
+        "Historial exportado: %d ciclos y %d muestras de barrido en %s",
+        summary["cycles"],
+        summary["sweep_samples"],
+        directory,
+    )
+    return summary
+
+
+async def _async_list_checkpoints(hass: HomeAssistant, call: ServiceCall) -> ServiceResponse:
+    """List the policy checkpoints of an entry."""
+    coordinator = _coordinator(hass, call.data[ATTR_ENTRY_ID])
+    return {"checkpoints": await coordinator.checkpoints.async_list()}
+
+
+async def _async_rollback(hass: HomeAssistant, call: ServiceCall) -> ServiceResponse:
+    """Restore a policy checkpoint of an entry (the newest one by default)."""
+    coordinator = _coordinator(hass, call.data[ATTR_ENTRY_ID])
+    try:
+        restored = await coordinator.async_rollback(call.data.get(ATTR_CHECKPOINT_ID))
+    except OSError as err:
+        raise HomeAssistantError(f"Could not read the SolarPool AI checkpoints: {err}") from err
+    if restored is None:
+        raise HomeAssistantError("No matching SolarPool AI checkpoint to roll back to")
+    return {"restored": restored}
+
+
+async def _async_export_agent(hass: HomeAssistant, call: ServiceCall) -> ServiceResponse:
+    """Write the Q-learning agent of some entries (all by default) to binary files."""
+    coordinators = _coordinators(hass, call.data.get(ATTR_ENTRY_ID))
+    directory = call.data.get(ATTR_DIRECTORY)
+    directory = _checked_path(hass, directory) if directory is not None else hass.config.path(DOMAIN, "agents")
+
+    now = dt_util.utcnow()
+    stamp = now.strftime("%Y%m%dT%H%M%SZ")
+    agents, skipped = [], []
+    for entry_id, coordinator in coordinators.items():
+        state = coordinator.q_learning_state()
+        if state is None:
+            skipped.append(entry_id)
+            continue
+        metadata = {"entry_id": entry_id, "title": coordinator.entry.title, "exported": now.isoformat()}
+        agents.append((Path(directory, f"solarpool_{stamp}_{entry_id}{FILE_SUFFIX}"), state, metadata))
+    if not agents:
+        raise HomeAssistantError("None of the SolarPool AI entries has a Q-learning agent to export")
+
+    try:
+        files = await hass.async_add_executor_job(write_agent_files, agents)
+    except OSError as err:
+        raise HomeAssistantError(f"Could not export the SolarPool AI agents: {err}") from err
+    _LOGGER.info("%d agentes exportados a %s", len(files), directory)
+    return {
+        "files": {metadata["entry_id"]: path for (_, _, metadata), path in zip(agents, files)},
+        "skipped": skipped,
+    }
+
+
+async def _async_import_agent(hass: HomeAssistant, call: ServiceCall) -> ServiceResponse:
+    """Load an agent file into the Q-learning policy of some entries (all by default)."""
+    from .rl_agent import RLAgent  # NumPy, only needed here
+
+    coordinators = _coordinators(hass, call.data.get(ATTR_ENTRY_ID))
+    path = _checked_path(hass, call.data[ATTR_PATH])
+    try:
+        metadata, state = await hass.async_add_executor_job(
+            read_agent_file, path, RLAgent.num_states, RLAgent.num_actions
+        )
+    except AgentFileError as err:
+        raise HomeAssistantError(f"Invalid SolarPool AI agent file {path}: {err}") from err
+    except OSError as err:
+        raise HomeAssistantError(f"Could not read {path}: {err}") from err
+
+    for coordinator in coordinators.values():
+        await coordinator.async_import_agent(state, path)
+    return {
+        "imported": list(coordinators),
+        "active": [entry_id for entry_id, c in coordinators.items() if c.policy.name == POLICY_Q_LEARNING],
+        "metadata": metadata,
+    }
+
+
+async def _async_simulate(hass: HomeAssistant, call: ServiceCall) -> ServiceResponse:
+    """What an entry would decide for a list or grid of conditions (read-only)."""
+    coordinator = _coordinator(hass, call.data[ATTR_ENTRY_ID])
+    try:
+        contexts = build_contexts(
+            call.data.get(ATTR_CONTEXTS), call.data.get(ATTR_GRID), coordinator.current_conditions()
+        )
+    except ValueError as err:
+        raise HomeAssistantError(str(err)) from err
+    decisions = await coordinator.async_simulate(contexts, call.data.get(ATTR_PUMP_RUN_MINUTES))
+    return {
+        "policy": coordinator.policy.name,
+        "count": len(decisions),
+        "on": sum(decision["action"] == "ON" for decision in decisions),
+        "decisions": decisions,
+    }
+
+
+def async_setup_services(hass: HomeAssistant) -> None:
+    """Register the integration's services (once, they are domain wide)."""
+    if hass.services.has_service(DOMAIN, SERVICE_EXPORT_HISTORY):
+        return
+
+    services = (
+        (SERVICE_EXPORT_HISTORY, _async_export_history, EXPORT_HISTORY_SCHEMA, SupportsResponse.OPTIONAL),
+        (SERVICE_LIST_CHECKPOINTS, _async_list_checkpoints, LIST_CHECKPOINTS_SCHEMA, SupportsResponse.ONLY),
+        (SERVICE_ROLLBACK, _async_rollback, ROLLBACK_SCHEMA, SupportsResponse.OPTIONAL),
+        (SERVICE_EXPORT_AGENT, _async_export_agent, EXPORT_AGENT_SCHEMA, SupportsResponse.OPTIONAL),
+        (SERVICE_IMPORT_AGENT, _async_import_agent, IMPORT_AGENT_SCHEMA, SupportsResponse.OPTIONAL),
+        (SERVICE_SIMULATE, _async_simulate, SIMULATE_SCHEMA, SupportsResponse.ONLY),
+    )
+    for service, handler, schema, supports_response in services:
+        hass.services.async_register(
+            DOMAIN, service, partial(handler, hass), schema=schema, supports_response=supports_response
+        )
@@ -0,0 +1,258 @@
+"""Resolved runtime settings for SolarPool AI.
+
+The coordinator used to resolve every option on each cycle with lookups like
+``entry.options.get(key, entry.data.get(key, default))``. This module resolves
+them once into an immutable object that is rebuilt only when the config entry
+options change, so the hot path just reads attributes.
+"""
+from __future__ import annotations
+
+from collections.abc import Callable
+from typing import Any
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import (
+    CONF_PUMP_ENTITY_ID,
+    CONF_POOL_SENSOR_ID,
+    CONF_RETURN_SENSOR_ID,
+    CONF_WEATHER_ENTITY_ID,
+    CONF_UV_SENSOR_ID,
+    CONF_WIND_SENSOR_ID,
+    CONF_AMBIENT_TEMP_SENSOR_ID,
+    CONF_CLOUD_COVERAGE_SENSOR_ID,
+    CONF_SWEEP_DURATION,
+    CONF_MAX_TEMP,
+    CONF_SCAN_INTERVAL,
+    CONF_SETTLE_DELAY,
+    CONF_LANGUAGE,
+    CONF_POLICY,
+    CONF_LOOP_MONITOR,
+    CONF_TRACE_SAMPLE_RATE,
+    CONF_CHECKPOINT_RETENTION,
+    CONF_AUTO_ROLLBACK,
+    CONF_ROLLBACK_REWARD,
+    CONF_FLEET_SHARING,
+    CONF_RETURN_MODE,
+    DEFAULT_SWEEP_DURATION,
+    DEFAULT_MAX_TEMP,
+    DEFAULT_SCAN_INTERVAL,
+    DEFAULT_MIN_RUN_TIME,
+    DEFAULT_SETTLE_DELAY,
+    DEFAULT_LANGUAGE,
+    DEFAULT_POLICY,
+    DEFAULT_LOOP_MONITOR,
+    DEFAULT_TRACE_SAMPLE_RATE,
+    DEFAULT_CHECKPOINT_RETENTION,
+    DEFAULT_AUTO_ROLLBACK,
+    DEFAULT_ROLLBACK_REWARD,
+    DEFAULT_FLEET_SHARING,
+    DEFAULT_RETURN_MODE,
+    RETURN_MODES,
+)
+
+SensorReader = Callable[[], "float | None"]
+
+_INVALID_STATES = frozenset(("unknown", "unavailable"))
+
+
+def _read_nothing() -> float | None:
+    """Reader used when no sensor is configured."""
+    return None
+
+
+def make_sensor_reader(hass: HomeAssistant, entity_id: str | None) -> SensorReader:
+    """Build a callable that returns the numeric state of an entity.
+
+    The entity ID and the state machine lookup are bound once, so each read
+    is a single ``states.get`` plus a float conversion.
+
+    Args:
+        hass: Home Assistant instance
+        entity_id: Entity to read (None or empty returns a reader that yields None)
+
+    Returns:
+        Callable returning the state as float, or None if missing/unavailable
+    """
+    if not entity_id:
+        return _read_nothing
+
+    get_state = hass.states.get
+
+    def _read() -> float | None:
+        state = get_state(entity_id)
+        if state is None or state.state in _INVALID_STATES:
+            return None
+        try:
+            return float(state.state)
+        except (ValueError, TypeError):
+            return None
+
+    return _read
+
+
+class SolarPoolSettings:
+    """Immutable, pre-resolved view of a config entry.
+
+    Values follow the same precedence the options flow uses:
+    options > data > default. Instances are never mutated; an options
+    update swaps the whole object on the coordinator.
+    """
+
+    __slots__ = (
+        "options",
+        "pump_entity_id",
+        "pool_sensor_id",
+        "return_sensor_id",
+        "weather_entity_id",
+        "uv_sensor_id",
+        "cloud_sensor_id",
+        "wind_sensor_id",
+        "ambient_sensor_id",
+        "sweep_duration",
+        "max_temp",
+        "scan_interval",
+        "min_run_time",
+        "settle_delay",
+        "language",
+        "policy",
+        "return_mode",
+        "loop_monitor",
+        "trace_sample_rate",
+        "checkpoint_retention",
+        "rollback_reward",
+        "fleet_sharing",
+        "read_pool_temp",
+        "read_return_temp",
+        "read_uv",
+        "read_cloud_coverage",
+        "read_wind",
+        "read_ambient_temp",
+    )
+
+    options: dict[str, Any]
+    pump_entity_id: str | None
+    pool_sensor_id: str | None
+    return_sensor_id: str | None
+    weather_entity_id: str | None
+    uv_sensor_id: str | None
+    cloud_sensor_id: str | None
+    wind_sensor_id: str | None
+    ambient_sensor_id: str | None
+    sweep_duration: int
+    max_temp: float
+    scan_interval: int
+    min_run_time: int
+    settle_delay: int
+    language: str
+    policy: str
+    return_mode: str
+    loop_monitor: bool
+    trace_sample_rate: float
+    checkpoint_retention: int
+    rollback_reward: float | None
+    fleet_sharing: bool
+    read_pool_temp: SensorReader
+    read_return_temp: SensorReader
+    read_uv: SensorReader
+    read_cloud_coverage: SensorReader
+    read_wind: SensorReader
+    read_ambient_temp: SensorReader
+
+    def __init__(self, **values: Any) -> None:
+        """Initialize from keyword values (one per slot)."""
+        for name in self.__slots__:
+            object.__setattr__(self, name, values[name])
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        """Reject mutation; rebuild with from_entry instead."""
+        raise AttributeError(f"SolarPoolSettings is immutable (tried to set {name})")
+
+    def __delattr__(self, name: str) -> None:
+        """Reject attribute deletion."""
+        raise AttributeError(f"SolarPoolSettings is immutable (tried to delete {name})")
+
+    def __repr__(self) -> str:
+        """Return a compact representation for logs."""
+        return (
+            f"SolarPoolSettings(sweep={self.sweep_duration}s, max_temp={self.max_temp}, "
+            f"interval={self.scan_interval}min, language={self.language}, policy={self.policy})"
+        )
+
+    @classmethod
+    def from_entry(cls, hass: HomeAssistant, entry: ConfigEntry) -> SolarPoolSettings:
+        """Resolve all settings from a config entry.
+
+        Args:
+            hass: Home Assistant instance (used to bind the sensor readers)
+            entry: Config entry to resolve
+
+        Returns:
+            A new immutable settings object
+        """
+        options = dict(entry.options)
+        data = entry.data
+
+        def resolve(key: str, default: Any = None) -> Any:
+            return options.get(key, data.get(key, default))
+
+        # Empty values coming from the number/selector UI fall back to defaults
+        sweep_duration = resolve(CONF_SWEEP_DURATION)
+        max_temp = resolve(CONF_MAX_TEMP)
+        scan_interval = resolve(CONF_SCAN_INTERVAL)
+        settle_delay = resolve(CONF_SETTLE_DELAY)
+        trace_sample_rate = resolve(CONF_TRACE_SAMPLE_RATE)
+        checkpoint_retention = resolve(CONF_CHECKPOINT_RETENTION)
+        rollback_reward = resolve(CONF_ROLLBACK_REWARD)
+
+        pool_sensor = data.get(CONF_POOL_SENSOR_ID)
+        return_sensor = data.get(CONF_RETURN_SENSOR_ID)
+        uv_sensor = resolve(CONF_UV_SENSOR_ID)
+        cloud_sensor = resolve(CONF_CLOUD_COVERAGE_SENSOR_ID)
+        wind_sensor = resolve(CONF_WIND_SENSOR_ID)
+        ambient_sensor = resolve(CONF_AMBIENT_TEMP_SENSOR_ID)
+
+        return cls(
+            options=options,
+            pump_entity_id=data.get(CONF_PUMP_ENTITY_ID),
+            pool_sensor_id=pool_sensor,
+            return_sensor_id=return_sensor,
+            weather_entity_id=data.get(CONF_WEATHER_ENTITY_ID),
+            uv_sensor_id=uv_sensor,
+            cloud_sensor_id=cloud_sensor,
+            wind_sensor_id=wind_sensor,
+            ambient_sensor_id=ambient_sensor,
+            sweep_duration=int(sweep_duration) if sweep_duration else DEFAULT_SWEEP_DURATION,
+            max_temp=float(max_temp) if max_temp else DEFAULT_MAX_TEMP,
+            scan_interval=int(scan_interval) if scan_interval else DEFAULT_SCAN_INTERVAL,
+            min_run_time=DEFAULT_MIN_RUN_TIME,
+            settle_delay=int(settle_delay) if settle_delay is not None else DEFAULT_SETTLE_DELAY,
+            language=resolve(CONF_LANGUAGE) or DEFAULT_LANGUAGE,
+            policy=resolve(CONF_POLICY) or DEFAULT_POLICY,
+            return_mode=(
+                return_mode if (return_mode := resolve(CONF_RETURN_MODE)) in RETURN_MODES else DEFAULT_RETURN_MODE
+            ),
+            loop_monitor=bool(resolve(CONF_LOOP_MONITOR, DEFAULT_LOOP_MONITOR)),
+            trace_sample_rate=(
+                min(max(float(trace_sample_rate), 0.0), 1.0)
+                if trace_sample_rate is not None
+                else DEFAULT_TRACE_SAMPLE_RATE
+            ),
+            checkpoint_retention=(
+                max(int(checkpoint_retention), 1) if checkpoint_retention else DEFAULT_CHECKPOINT_RETENTION
+            ),
+            # None disables automatic rollback
+            rollback_reward=(
+                (float(rollback_reward) if rollback_reward is not None else DEFAULT_ROLLBACK_REWARD)
+                if resolve(CONF_AUTO_ROLLBACK, DEFAULT_AUTO_ROLLBACK)
+                else None
+            ),
+            fleet_sharing=bool(resolve(CONF_FLEET_SHARING, DEFAULT_FLEET_SHARING)),
+            read_pool_temp=make_sensor_reader(hass, pool_sensor),
+            read_return_temp=make_sensor_reader(hass, return_sensor),
+            read_uv=make_sensor_reader(hass, uv_sensor),
+            read_cloud_coverage=make_sensor_reader(hass, cloud_sensor),
+            read_wind=make_sensor_reader(hass, wind_sensor),
+            read_ambient_temp=make_sensor_reader(hass, ambient_sensor),
+        )
@@ -0,0 +1,231 @@
+"""Solar pool simulator for SolarPool AI.
+
+A small, deterministic-per-seed model of a pool with roof collectors, used to
+benchmark and tune decision policies without waiting for real cycles. It does
+not depend on Home Assistant: contexts have the same keys the coordinator
+builds in ``_async_gather_context``.
+"""
+from __future__ import annotations
+
+import math
+from typing import Any, NamedTuple
+
+import numpy as np
+
+from .const import RL_ACTIONS, DEFAULT_SCAN_INTERVAL
+from .policy import calculate_reward
+from .thermal_model import PoolModel
+
+
+class ClimateProfile(NamedTuple):
+    """Daily weather statistics for a simulated location."""
+
+    name: str
+    peak_elevation: float  # Sun elevation at solar noon (°)
+    day_length_hours: float
+    uv_peak: float  # Clear-sky UV index at solar noon
+    cloud_mean: float  # Mean cloud coverage (%)
+    cloud_persistence: float  # AR(1) coefficient between cycles (0-1)
+    wind_mean: float  # Mean wind speed (km/h)
+    temp_mean: float  # Mean ambient temperature (°C)
+    temp_swing: float  # Half of the daily ambient amplitude (°C)
+    t_pool_start: float  # Pool temperature on the first morning (°C)
+
+
+def return_delta(
+    pool: PoolModel, uv: Any, wind: Any, temperature_ext: Any, t_pool: Any
+) -> Any:
+    """Noise-free collector return delta (°C); works on scalars or arrays."""
+    wind_factor = np.maximum(0.0, 1 - pool.wind_loss * wind)
+    ambient_term = pool.ambient_coupling * (temperature_ext - t_pool)
+    return pool.collector_gain * uv * wind_factor + ambient_term
+
+
+def pool_gain(
+    pool: PoolModel,
+    t_pool: Any,
+    uv: Any,
+    wind: Any,
+    temperature_ext: Any,
+    on_minutes: Any,
+    window_minutes: Any,
+) -> Any:
+    """Noise-free pool gain (°C) over a window with the pump on part of it.
+
+    Passive gain/loss applies to the whole window, collector gain only while
+    pumping. All arguments broadcast, so rollouts can be evaluated at once.
+    """
+    passive = pool.direct_solar * uv - pool.loss_rate * (t_pool - temperature_ext)
+    pumping = pool.heating_rate * return_delta(pool, uv, wind, temperature_ext, t_pool)
+    return passive * (window_minutes / 60) + pumping * (on_minutes / 60)
+
+
+CLIMATE_PROFILES: dict[str, ClimateProfile] = {
+    "sunny": ClimateProfile("sunny", 75.0, 14.0, 11.0, 10.0, 0.95, 8.0, 29.0, 6.0, 25.0),
+    "temperate": ClimateProfile("temperate", 60.0, 13.0, 8.0, 40.0, 0.9, 14.0, 23.0, 5.0, 22.0),
+    "windy": ClimateProfile("windy", 65.0, 13.5, 9.0, 30.0, 0.85, 28.0, 22.0, 4.0, 22.0),
+    "cloudy": ClimateProfile("cloudy", 55.0, 12.0, 7.0, 70.0, 0.9, 12.0, 19.0, 4.0, 20.0),
+}
+
+
+class PoolSimulator:
+    """Simulates one pool over consecutive days of decision cycles.
+
+    Usage::
+
+        sim = PoolSimulator("temperate", seed=1)
+        while not sim.done:
+            context = sim.context()
+            gain = sim.step(action_index)
+
+    ``step`` runs the chosen action for its full duration (OFF covers one
+    cycle interval) and advances the clock accordingly. ``reset_day`` starts
+    the next morning.
+    """
+
+    def __init__(
+        self,
+        profile: str | ClimateProfile = "temperate",
+        pool: PoolModel | None = None,
+        seed: int | None = None,
+        cycle_minutes: int = DEFAULT_SCAN_INTERVAL,
+        rng: np.random.Generator | None = None,
+    ) -> None:
+        """Initialize the simulator.
+
+        Args:
+            profile: Climate profile name (see CLIMATE_PROFILES) or instance
+            pool: Pool physics (defaults to PoolModel())
+            seed: Seed for the random generator
+            cycle_minutes: Minutes between decisions
+            rng: Generator to draw from instead of one built from seed
+        """
+        self.profile = CLIMATE_PROFILES[profile] if isinstance(profile, str) else profile
+        self.pool = pool or PoolModel()
+        self.rng = rng if rng is not None else np.random.default_rng(seed)
+        self.cycle_minutes = cycle_minutes
+        self.t_pool = self.profile.t_pool_start
+        self.day = -1
+        self.reset_day()
+
+    def reset_day(self) -> None:
+        """Generate the weather of the next day and move to sunrise."""
+        profile = self.profile
+        rng = self.rng
+        if self.day >= 0:
+            self.t_pool -= self.pool.night_loss
+        self.day += 1
+
+        n = int(profile.day_length_hours * 60 / self.cycle_minutes)
+        day_fraction = (np.arange(n) + 0.5) / n
+        sun = np.sin(np.pi * day_fraction)
+
+        self._elevation = profile.peak_elevation * sun
+        self._temp = profile.temp_mean + profile.temp_swing * (sun - 0.5) * 2
+
+        # Clouds: AR(1) around the daily mean, day-level offset for variety
+        daily_mean = np.clip(profile.cloud_mean + rng.normal(0, 20), 0, 100)
+        noise = rng.normal(0, 15, n)
+        clouds = np.empty(n)
+        level = daily_mean
+        rho = profile.cloud_persistence
+        for i in range(n):
+            level = rho * level + (1 - rho) * daily_mean + noise[i] * math.sqrt(1 - rho**2)
+            clouds[i] = level
+        self._clouds = np.clip(clouds, 0, 100)
+
+        cloud_factor = np.maximum(0.15, 1 - 0.85 * self._clouds / 100)
+        self._uv_raw = profile.uv_peak * np.sin(np.radians(self._elevation)) / math.sin(
+            math.radians(profile.peak_elevation)
+        )
+        self._uv = np.round(self._uv_raw * cloud_factor, 1)
+        self._wind = np.maximum(0.0, rng.gamma(4.0, profile.wind_mean / 4.0, n))
+        self._slot = 0
+        self._n = n
+
+    @property
+    def done(self) -> bool:
+        """Whether the simulated day is over."""
+        return self._slot >= self._n
+
+    @property
+    def minute_of_day(self) -> int:
+        """Minutes since sunrise for the current slot."""
+        return self._slot * self.cycle_minutes
+
+    @property
+    def day_minutes(self) -> int:
+        """Minutes from sunrise to sunset."""
+        return self._n * self.cycle_minutes
+
+    def weather_at(self, minute: float) -> dict[str, float]:
+        """Noise-free weather at a minute since sunrise (clamped to the day).
+
+        For clock-driven simulations that evolve the pool themselves instead
+        of calling ``step``.
+        """
+        slot = min(max(int(minute // self.cycle_minutes), 0), self._n - 1)
+        return {
+            "uv_index": float(self._uv[slot]),
+            "uv_index_raw": float(self._uv_raw[slot]),
+            "wind_speed": float(self._wind[slot]),
+            "temperature_ext": float(self._temp[slot]),
+            "cloud_coverage": float(self._clouds[slot]),
+            "sun_elevation": float(self._elevation[slot]),
+        }
+
+    def _return_delta(self, slot: int) -> float:
+        """Noise-free collector return delta (°C) for a slot."""
+        return float(return_delta(self.pool, self._uv[slot], self._wind[slot], self._temp[slot], self.t_pool))
+
+    def context(self) -> dict[str, Any]:
+        """Build the sensor context for the current slot (with sensor noise)."""
+        slot = min(self._slot, self._n - 1)
+        noise = self.rng.normal(0, self.pool.sensor_noise, 2)
+        t_pool = round(self.t_pool + noise[0], 2)
+        return {
+            "t_pool": t_pool,
+            "t_return": round(self.t_pool + self._return_delta(slot) + noise[1], 2),
+            "weather_state": "cloudy" if self._clouds[slot] > 70 else "sunny",
+            "temperature_ext": round(float(self._temp[slot]), 1),
+            "wind_speed": round(float(self._wind[slot]), 1),
+            "uv_index": float(self._uv[slot]),
+            "uv_index_raw": round(float(self._uv_raw[slot]), 1),
+            "cloud_coverage": round(float(self._clouds[slot]), 0),
+            "sun_elevation": round(float(self._elevation[slot]), 1),
+            "sun_azimuth": 0.0,
+        }
+
+    def expected_gains(self) -> np.ndarray:
+        """Noise-free pool gain (°C) of every action from the current slot."""
+        slot = min(self._slot, self._n - 1)
+        on_minutes = np.array(RL_ACTIONS)
+        return pool_gain(
+            self.pool,
+            self.t_pool,
+            self._uv[slot],
+            self._wind[slot],
+            self._temp[slot],
+            on_minutes,
+            np.maximum(on_minutes, self.cycle_minutes),
+        )
+
+    def expected_rewards(self) -> np.ndarray:
+        """Reward every action would earn in expectation (for regret)."""
+        gains = self.expected_gains()
+        return np.array([calculate_reward(g, d) for g, d in zip(gains, RL_ACTIONS)])
+
+    def step(self, action_index: int) -> float:
+        """Run an action and advance the clock.
+
+        Args:
+            action_index: Index into RL_ACTIONS
+
+        Returns:
+            Measured pool gain (°C) over the action window
+        """
+        gain = float(self.expected_gains()[action_index])
+        self.t_pool += gain
+        slots = max(1, math.ceil(RL_ACTIONS[action_index] / self.cycle_minutes))
+        self._slot += slots
+        return gain + float(self.rng.normal(0, self.pool.sensor_noise * math.sqrt(2)))
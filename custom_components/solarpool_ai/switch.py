@@ -5,7 +5,7 @@ from typing import Any
 
 from homeassistant.components.switch import SwitchEntity
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.const import STATE_ON
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
@@ -55,6 +55,12 @@ class SolarPoolMasterSwitch(CoordinatorEntity[SolarPoolCoordinator], SwitchEntit
                 # On startup, we probably just want to update the logical state.
                 pass
 
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Write the state, timed by the loop monitor."""
+        with self.coordinator.loop_monitor.measure(self.entity_id):
+            super()._handle_coordinator_update()
+
     @property
     def is_on(self) -> bool:
         """Return true if the switch is on."""
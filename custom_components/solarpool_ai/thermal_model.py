@@ -0,0 +1,255 @@
+"""Online thermal model identification for SolarPool AI.
+
+Learns the heat balance of the actual pool and collectors from the cycles it
+runs, instead of assuming a fixed gain per hour. Two small linear models are
+fitted with recursive least squares (O(features²) per update, no history):
+
+- Return delta, from every sweep:
+  ``delta = collector_gain * uv - collector_gain * wind_loss * uv * wind
+  + ambient_coupling * (t_ext - t_pool)``
+- Pool gain, from every completed cycle:
+  ``gain = heating_rate * delta * on_h + direct_solar * uv * window_h
+  - loss_rate * (t_pool - t_ext) * window_h``
+
+These are the equations the simulator uses, so the learned coefficients
+convert directly into a PoolModel for the planner and the simulator. The
+model is plain Python (no NumPy), so it loads with the integration at no
+noticeable cost.
+"""
+from __future__ import annotations
+
+import logging
+from typing import Any, NamedTuple
+
+_LOGGER = logging.getLogger(__name__)
+
+# Cycles with a longer measurement window (e.g. measured the next morning)
+# mix in unmodelled overnight losses and are not used for learning
+MAX_GAIN_WINDOW_MINUTES = 240
+# Samples of each model before it is reported as calibrated to this pool
+MIN_SAMPLES = 5
+
+
+class PoolModel(NamedTuple):
+    """Physical parameters of the simulated pool and collectors."""
+
+    collector_gain: float = 0.9  # Return delta (°C) per UV point with no wind
+    wind_loss: float = 0.02  # Fraction of collector delta lost per km/h of wind
+    ambient_coupling: float = 0.1  # Return delta (°C) per °C of ambient above pool
+    heating_rate: float = 0.12  # Pool °C/h per °C of return delta while pumping
+    loss_rate: float = 0.03  # Passive loss (1/h) towards ambient temperature
+    direct_solar: float = 0.02  # Direct solar gain on the pool surface (°C/h per UV)
+    night_loss: float = 0.6  # Overnight cooling (°C) between simulated days
+    sensor_noise: float = 0.05  # Std of temperature readings (°C)
+
+
+def _dot(a: list[float], b: list[float]) -> float:
+    """Dot product of two short vectors."""
+    return sum(x * y for x, y in zip(a, b))
+
+
+class RecursiveLeastSquares:
+    """Exponentially weighted recursive least squares for ``y = theta · x``.
+
+    Each update is a rank-one correction of the inverse covariance, so it
+    costs O(d²) time and memory regardless of how many samples were seen.
+    With three coefficients plain Python lists are faster than NumPy and keep
+    the model free of heavy imports.
+    """
+
+    def __init__(
+        self,
+        theta: list[float],
+        covariance: list[list[float]] | None = None,
+        forgetting: float = 0.995,
+        initial_variance: float = 10.0,
+        samples: int = 0,
+    ) -> None:
+        """Initialize the estimator.
+
+        Args:
+            theta: Initial coefficients (the prior)
+            covariance: Initial covariance (defaults to initial_variance * I)
+            forgetting: Weight decay per sample (1.0 = never forget)
+            initial_variance: Prior uncertainty of every coefficient
+            samples: Number of samples already absorbed
+        """
+        self.theta = [float(value) for value in theta]
+        d = len(self.theta)
+        if covariance is not None:
+            self.covariance = [[float(value) for value in row] for row in covariance]
+        else:
+            self.covariance = [[initial_variance if i == j else 0.0 for j in range(d)] for i in range(d)]
+        self.forgetting = forgetting
+        self.samples = samples
+
+    def predict(self, features: list[float]) -> float:
+        """Predict for one feature vector."""
+        return _dot(features, self.theta)
+
+    def update(self, x: list[float], y: float) -> float:
+        """Absorb one sample.
+
+        Returns:
+            Prediction error before the update
+        """
+        p_x = [_dot(row, x) for row in self.covariance]
+        denominator = self.forgetting + _dot(x, p_x)
+        gain = [value / denominator for value in p_x]
+        error = float(y - _dot(x, self.theta))
+        self.theta = [theta + g * error for theta, g in zip(self.theta, gain)]
+        d = len(self.theta)
+        covariance = [
+            [(self.covariance[i][j] - gain[i] * p_x[j]) / self.forgetting for j in range(d)]
+            for i in range(d)
+        ]
+        # Keep the covariance symmetric despite rounding
+        self.covariance = [[(covariance[i][j] + covariance[j][i]) / 2 for j in range(d)] for i in range(d)]
+        self.samples += 1
+        return error
+
+    def to_dict(self) -> dict[str, Any]:
+        """Export estimator state for persistence."""
+        return {
+            "theta": list(self.theta),
+            "covariance": [list(row) for row in self.covariance],
+            "samples": self.samples,
+        }
+
+
+def _is_square(matrix: Any, size: int) -> bool:
+    """Whether a persisted matrix is a size x size list of lists."""
+    return (
+        isinstance(matrix, list)
+        and len(matrix) == size
+        and all(isinstance(row, list) and len(row) == size for row in matrix)
+    )
+
+
+class ThermalModel:
+    """Per-pool heat-balance model learned online from sweeps and cycles."""
+
+    # Prior coefficients (PoolModel defaults) and their uncertainty
+    _PRIOR = PoolModel()
+    _INITIAL_VARIANCE = 1.0
+
+    def __init__(self, delta: dict[str, Any] | None = None, gain: dict[str, Any] | None = None) -> None:
+        """Initialize the model.
+
+        Args:
+            delta: Persisted return-delta estimator (optional)
+            gain: Persisted pool-gain estimator (optional)
+        """
+        prior = self._PRIOR
+        self.delta = self._restore(
+            delta,
+            [prior.collector_gain, -prior.collector_gain * prior.wind_loss, prior.ambient_coupling],
+        )
+        self.gain = self._restore(gain, [prior.heating_rate, prior.direct_solar, prior.loss_rate])
+
+    def _restore(self, data: dict[str, Any] | None, prior: list[float]) -> RecursiveLeastSquares:
+        """Restore an estimator, falling back to the prior on shape mismatch."""
+        if data and _is_square(data.get("covariance"), len(prior)) and len(data.get("theta") or ()) == len(prior):
+            return RecursiveLeastSquares(
+                data["theta"], data["covariance"], samples=data.get("samples", 0)
+            )
+        if data:
+            _LOGGER.warning("Thermal model: stored estimator does not match. Resetting.")
+        return RecursiveLeastSquares(prior, initial_variance=self._INITIAL_VARIANCE)
+
+    @staticmethod
+    def _delta_features(uv: float, wind: float, temperature_ext: float, t_pool: float) -> list[float]:
+        """Features of the return-delta model."""
+        return [uv, uv * wind, temperature_ext - t_pool]
+
+    @staticmethod
+    def _gain_features(
+        delta: float, uv: float, temperature_ext: float, t_pool: float, on_minutes: float, window_minutes: float
+    ) -> list[float]:
+        """Features of the pool-gain model."""
+        on_hours = on_minutes / 60
+        window_hours = window_minutes / 60
+        return [delta * on_hours, uv * window_hours, (temperature_ext - t_pool) * window_hours]
+
+    @staticmethod
+    def _context_values(context: dict[str, Any]) -> tuple[float, float, float, float, float]:
+        """(delta, uv, wind, t_ext, t_pool) from a coordinator context."""
+        t_pool = float(context.get("t_pool") or 0)
+        temperature_ext = context.get("temperature_ext")
+        return (
+            float(context.get("t_return") or 0) - t_pool,
+            float(context.get("uv_index") or 0),
+            float(context.get("wind_speed") or 0),
+            t_pool if temperature_ext is None else float(temperature_ext),
+            t_pool,
+        )
+
+    @property
+    def is_calibrated(self) -> bool:
+        """Whether both models have absorbed enough samples of this pool."""
+        return self.delta.samples >= MIN_SAMPLES and self.gain.samples >= MIN_SAMPLES
+
+    def observe_sweep(self, context: dict[str, Any]) -> None:
+        """Learn the collector response from a measured context."""
+        delta, uv, wind, temperature_ext, t_pool = self._context_values(context)
+        self.delta.update(self._delta_features(uv, wind, temperature_ext, t_pool), delta)
+
+    def observe_cycle(
+        self,
+        context: dict[str, Any],
+        on_minutes: float,
+        window_minutes: float,
+        actual_gain: float,
+    ) -> bool:
+        """Learn the pool response from a completed cycle.
+
+        Args:
+            context: Context the cycle started with
+            on_minutes: Minutes the pump was heating
+            window_minutes: Minutes between the start and the gain measurement
+            actual_gain: Measured pool temperature change (°C)
+
+        Returns:
+            Whether the sample was used
+        """
+        if window_minutes <= 0 or window_minutes > MAX_GAIN_WINDOW_MINUTES:
+            return False
+        delta, uv, _, temperature_ext, t_pool = self._context_values(context)
+        features = self._gain_features(
+            delta, uv, temperature_ext, t_pool, min(on_minutes, window_minutes), window_minutes
+        )
+        error = self.gain.update(features, actual_gain)
+        _LOGGER.debug(
+            "Modelo térmico: error=%.2f°C, coeficientes=%s", error, [round(value, 4) for value in self.gain.theta]
+        )
+        return True
+
+    def predict_gain(self, context: dict[str, Any], on_minutes: float, window_minutes: float) -> float:
+        """Expected pool gain (°C) of heating ``on_minutes`` within a window."""
+        delta, uv, _, temperature_ext, t_pool = self._context_values(context)
+        features = self._gain_features(delta, uv, temperature_ext, t_pool, on_minutes, window_minutes)
+        return round(self.gain.predict(features), 2)
+
+    def pool_model(self) -> PoolModel:
+        """Learned coefficients as a PoolModel (clipped to physical ranges)."""
+        collector_gain, uv_wind, ambient_coupling = self.delta.theta
+        heating_rate, direct_solar, ambient_exchange = self.gain.theta
+        collector_gain = max(float(collector_gain), 1e-3)
+        return self._PRIOR._replace(
+            collector_gain=collector_gain,
+            wind_loss=max(0.0, float(-uv_wind / collector_gain)),
+            ambient_coupling=max(0.0, float(ambient_coupling)),
+            heating_rate=max(0.0, float(heating_rate)),
+            direct_solar=max(0.0, float(direct_solar)),
+            loss_rate=max(0.0, float(ambient_exchange)),
+        )
+
+    def to_dict(self) -> dict[str, Any]:
+        """Export model state for persistence."""
+        return {"delta": self.delta.to_dict(), "gain": self.gain.to_dict()}
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any] | None) -> "ThermalModel":
+        """Create a model from persisted state."""
+        data = data or {}
+        return cls(delta=data.get("delta"), gain=data.get("gain"))
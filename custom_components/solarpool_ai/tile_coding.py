@@ -0,0 +1,164 @@
+"""Tile-coded Q-function backend for the SolarPool AI agent.
+
+The tabular agent needs a row for every combination of bins, so each new
+context dimension multiplies the table (and the cycles needed to fill it).
+Here the Q-function is a sum of weights over a few overlapping tilings of
+*groups* of dimensions: every single dimension plus a handful of pairs that
+interact physically. Memory grows with the number of groups (linearly), not
+with the cross-product of all bins, and unseen states generalize from their
+neighbours.
+"""
+from __future__ import annotations
+
+import logging
+from typing import Any
+
+import numpy as np
+
+from .const import POLICY_Q_TILES
+from .features import RAW_HIGH, RAW_LOW, raw_columns
+from .rl_agent import RLAgent
+
+_LOGGER = logging.getLogger(__name__)
+
+# Dimensions (columns of features.RAW_COLUMNS) tiled together. Singles give
+# per-feature effects, pairs capture the interactions that matter for
+# collector efficiency.
+TILE_GROUPS: tuple[tuple[int, ...], ...] = (
+    (0,), (1,), (2,), (3,), (4,), (5,),
+    (0, 1),  # delta x UV
+    (1, 2),  # UV x wind
+    (0, 3),  # delta x elevation
+)
+
+
+class TileCodedAgent(RLAgent):
+    """Q-learning agent with a tile-coded linear Q-function.
+
+    Same get_action/update/to_dict API as RLAgent. A state is represented by
+    the indices of its active tiles (one per group and tiling), and Q(s, a)
+    is the sum of their weights, so an update only touches those rows.
+    """
+
+    name = POLICY_Q_TILES
+
+    NUM_TILINGS = 4
+    TILES_PER_DIM = 6
+    # Overlapping tiles generalize, so a larger step than the table's pays off
+    # (tuned on benchmarks.policies: 0.3 beats 0.1 on regret in every profile tried)
+    ALPHA = 0.3
+
+    def __init__(
+        self,
+        weights: dict[str, list] | None = None,
+        episode_count: int = 0,
+        visit_counts: list[list[int]] | None = None,
+        random_state: dict[str, Any] | None = None,
+        rng: np.random.Generator | None = None,
+        pending: dict[str, Any] | None = None,
+    ) -> None:
+        """Initialize the agent.
+
+        Args:
+            weights: Sparse weights from to_dict ({"indices": [...], "values": [[...]]})
+            episode_count: Number of episodes already completed
+            visit_counts: Updates per discrete (state, action), for exploration
+            random_state: Persisted seed and generator state (optional)
+            rng: Generator to draw from instead of one seeded from random_state
+            pending: Persisted transition still waiting for its successor
+        """
+        super().__init__(
+            q_table=None,
+            episode_count=episode_count,
+            visit_counts=visit_counts,
+            random_state=random_state,
+            rng=rng,
+            pending=pending,
+        )
+        self.q_table = None  # Not used by this backend
+
+        # Each group is a grid with one extra tile per dim to absorb the offsets
+        side = self.TILES_PER_DIM + 1
+        group_sizes = [side ** len(group) for group in TILE_GROUPS]
+        self._group_offsets = np.cumsum([0] + group_sizes[:-1]) * self.NUM_TILINGS
+        self.num_tiles = sum(group_sizes) * self.NUM_TILINGS
+        self.weights = np.zeros((self.num_tiles, self.num_actions))
+        # Learning rate is shared among the active tiles
+        self._step = self.ALPHA / (len(TILE_GROUPS) * self.NUM_TILINGS)
+
+        # Asymmetric tiling displacements (1, 3, 5, ...) avoid diagonal artifacts
+        displacement = np.arange(1, 2 * len(RAW_LOW), 2)
+        self._tiling_offsets = (
+            np.arange(self.NUM_TILINGS)[:, None] * displacement[None, :] / self.NUM_TILINGS
+        ) % 1.0
+
+        if weights:
+            indices = np.asarray(weights.get("indices", []), dtype=np.int64)
+            values = np.asarray(weights.get("values", []), dtype=float)
+            if len(indices) and (indices.max() >= self.num_tiles or values.shape != (len(indices), self.num_actions)):
+                _LOGGER.warning("Tile agent: stored weights do not match the tiling. Resetting.")
+            elif len(indices):
+                self.weights[indices] = values
+
+    def _active_tiles(self, contexts: list[dict[str, Any]]) -> np.ndarray:
+        """Indices of the active tiles for many contexts, shape (n, groups * tilings)."""
+        scaled = (raw_columns(contexts) - RAW_LOW) / (RAW_HIGH - RAW_LOW)
+        scaled = np.clip(scaled, 0.0, 1.0) * self.TILES_PER_DIM  # (n, dims)
+        side = self.TILES_PER_DIM + 1
+
+        # (n, tilings, dims) integer tile coordinates
+        coords = np.floor(scaled[:, None, :] + self._tiling_offsets[None, :, :]).astype(np.int64)
+        tiling_index = np.arange(self.NUM_TILINGS)
+
+        columns = []
+        for offset, group in zip(self._group_offsets, TILE_GROUPS):
+            flat = np.zeros(coords.shape[:2], dtype=np.int64)
+            for dim in group:
+                flat = flat * side + coords[:, :, dim]
+            group_size = side ** len(group)
+            columns.append(offset + tiling_index * group_size + flat)
+        return np.concatenate(columns, axis=1)
+
+    def _encode(self, context: dict[str, Any], state_index: int) -> np.ndarray:
+        """Active tiles of a single context."""
+        return self._active_tiles([context])[0]
+
+    def _encode_batch(self, contexts: list[dict[str, Any]], state_indices: np.ndarray) -> np.ndarray:
+        """Active tiles of many contexts."""
+        return self._active_tiles(contexts)
+
+    def _q(self, state: np.ndarray) -> np.ndarray:
+        """Sum of the active tile weights (works for one state or a batch)."""
+        return self.weights[state].sum(axis=-2)
+
+    def _td_update(self, state: np.ndarray, action: int, target: float) -> tuple[float, float]:
+        """Sparse gradient step on the active tiles only."""
+        old_q = float(self.weights[state, action].sum())
+        error = target - old_q
+        self.weights[state, action] += self._step * error
+        return old_q, old_q + self._step * len(state) * error
+
+    def to_dict(self) -> dict[str, Any]:
+        """Export agent state for persistence (only tiles that were ever updated)."""
+        touched = np.flatnonzero(np.any(self.weights != 0.0, axis=1))
+        return {
+            "weights": {
+                "indices": touched.tolist(),
+                "values": self.weights[touched].tolist(),
+            },
+            "visit_counts": self.visit_counts.tolist(),
+            "episode_count": self.episode_count,
+            "random": self.random.to_dict(),
+            **self._unlearned_to_dict(),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "TileCodedAgent":
+        """Create agent from persisted state."""
+        return cls(
+            weights=data.get("weights"),
+            episode_count=data.get("episode_count", 0),
+            visit_counts=data.get("visit_counts"),
+            random_state=data.get("random"),
+            pending=data.get("pending"),
+        )
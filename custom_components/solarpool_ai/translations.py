@@ -142,12 +142,13 @@ def get_text(key: str, language: str = DEFAULT_LANGUAGE, **kwargs) -> str:
     return str(value) if value else key
 
 
-def get_template(category: str, language: str = DEFAULT_LANGUAGE, **kwargs) -> str:
+def get_template(category: str, language: str = DEFAULT_LANGUAGE, *, rng: Any = None, **kwargs) -> str:
     """Get a random template from a category.
     
     Args:
         category: Template category (e.g., "on_optimal", "off_wind")
         language: Language code
+        rng: numpy Generator to pick with (optional, for reproducible output)
         **kwargs: Format arguments for the template
         
     Returns:
@@ -164,7 +165,10 @@ def get_template(category: str, language: str = DEFAULT_LANGUAGE, **kwargs) -> s
     if not category_templates:
         return f"[{category}]"
     
-    template = random.choice(category_templates)
+    if rng is not None:
+        template = category_templates[int(rng.integers(len(category_templates)))]
+    else:
+        template = random.choice(category_templates)
     
     if kwargs:
         try:
@@ -0,0 +1,32 @@
+"""HTTP views of the SolarPool AI integration."""
+from __future__ import annotations
+
+from aiohttp import web
+
+from homeassistant.components.http import HomeAssistantView
+
+from .const import DOMAIN
+from .metrics import CONTENT_TYPE, render
+
+
+class SolarPoolMetricsView(HomeAssistantView):
+    """Metrics of every SolarPool entry in the Prometheus text format.
+
+    Scrape with a long-lived access token::
+
+        curl -H "Authorization: Bearer TOKEN" http://homeassistant.local:8123/api/solarpool_ai/metrics
+    """
+
+    url = f"/api/{DOMAIN}/metrics"
+    name = f"api:{DOMAIN}:metrics"
+    requires_auth = True
+
+    async def get(self, request: web.Request) -> web.Response:
+        """Render the metrics of all loaded entries."""
+        hass = request.app["hass"]
+        coordinators = hass.data.get(DOMAIN, {})
+        body = render(
+            ({"entry_id": entry_id}, coordinator.metrics.registry)
+            for entry_id, coordinator in coordinators.items()
+        )
+        return web.Response(body=body.encode("utf-8"), headers={"Content-Type": CONTENT_TYPE})
@@ -0,0 +1,162 @@
+"""What-if queries: what would the pool decide across many conditions.
+
+Contexts (a list, or the cartesian product of a grid of values) go through
+the active policy in one ``decide_batch`` call without exploration, which
+leaves ``last_state``/``last_action`` and the learned state untouched, and
+then through the coordinator's override rules, applied to whole arrays:
+
+- min_run_time: an OFF while the pump has run less than ``min_run_time``
+  becomes ON for the remaining minutes plus ``MIN_RUN_MARGIN``.
+- low_delta: an ON with a real delta below ``MIN_HEATING_DELTA`` becomes OFF.
+
+The expected gain of each row comes from the caller's gain function (the
+coordinator passes its learned thermal model) for the final duration. Only
+the gains and explanations are computed row by row. The coordinator
+runs queries in the executor on a copy of the policy. NumPy is imported when
+a query runs.
+"""
+from __future__ import annotations
+
+import itertools
+from collections.abc import Callable
+from typing import TYPE_CHECKING, Any
+
+from .const import MIN_HEATING_DELTA, MIN_RUN_MARGIN
+
+if TYPE_CHECKING:
+    from .explanation_templates import ExplanationEngine
+    from .policy import Policy
+
+MAX_CONTEXTS = 10000  # Rows per query, to bound the response
+DEFAULT_POOL_TEMP = 25.0  # °C when a context gives delta but no t_pool
+
+# Conditions a context or grid may give
+CONTEXT_KEYS = (
+    "delta", "t_return", "t_pool", "uv_index", "wind_speed", "sun_elevation", "temperature_ext", "cloud_coverage"
+)
+
+OVERRIDE_MIN_RUN = "min_run_time"
+OVERRIDE_LOW_DELTA = "low_delta"
+
+
+def build_contexts(
+    contexts: list[dict[str, Any]] | None,
+    grid: dict[str, list[float]] | None,
+    current: dict[str, Any] | None = None,
+) -> list[dict[str, Any]]:
+    """Sensor contexts of a query: the given ones plus the grid product.
+
+    Each row may give ``delta`` (return minus pool temperature) or
+    ``t_return``; ``t_pool`` defaults to ``DEFAULT_POOL_TEMP``, and
+    ``temperature_ext`` and ``cloud_coverage`` to the ``current`` readings
+    (the coordinator passes the entry's sensors), as live contexts always
+    carry them. Other missing conditions are 0.
+
+    Raises:
+        ValueError: No contexts, or more than ``MAX_CONTEXTS``
+    """
+    rows = list(contexts or [])
+    if grid:
+        keys = list(grid)
+        size = 1
+        for values in grid.values():
+            size *= len(values)
+        if len(rows) + size > MAX_CONTEXTS:
+            raise ValueError(f"{len(rows) + size} contexts requested, the limit is {MAX_CONTEXTS}")
+        rows.extend(dict(zip(keys, values)) for values in itertools.product(*grid.values()))
+    if not rows:
+        raise ValueError("No contexts to simulate")
+    if len(rows) > MAX_CONTEXTS:
+        raise ValueError(f"{len(rows)} contexts requested, the limit is {MAX_CONTEXTS}")
+
+    current = current or {}
+    built = []
+    for row in rows:
+        temperature_ext = row.get("temperature_ext", current.get("temperature_ext"))
+        t_pool = float(row.get("t_pool", DEFAULT_POOL_TEMP))
+        t_return = float(row["t_return"]) if "t_return" in row else t_pool + float(row.get("delta", 0.0))
+        built.append(
+            {
+                "t_pool": t_pool,
+                "t_return": t_return,
+                "uv_index": float(row.get("uv_index", 0.0)),
+                "wind_speed": float(row.get("wind_speed", 0.0)),
+                "sun_elevation": float(row.get("sun_elevation", 0.0)),
+                "temperature_ext": None if temperature_ext is None else float(temperature_ext),
+                "cloud_coverage": float(row.get("cloud_coverage", current.get("cloud_coverage", 0.0))),
+            }
+        )
+    return built
+
+
+def simulate_decisions(
+    policy: Policy,
+    explanation_engine: ExplanationEngine,
+    contexts: list[dict[str, Any]],
+    gain_fn: Callable[[dict[str, Any], int], float],
+    min_run_time: float,
+    pump_run_minutes: float | None = None,
+) -> list[dict[str, Any]]:
+    """Decisions the coordinator would take for each context.
+
+    Args:
+        policy: Active policy (only ``decide_batch`` with explore=False is used)
+        explanation_engine: Engine for the human-readable reasons
+        contexts: Sensor contexts (see ``build_contexts``)
+        gain_fn: Expected gain (°C) of heating a context for some minutes
+        min_run_time: Minimum pump run time in minutes
+        pump_run_minutes: Minutes the pump has been running at decision time
+            (the sweep time in a live consult); None skips the min_run_time rule
+
+    Returns:
+        One dict per context with the final action and duration, the policy's
+        own choice, the override applied (if any), the Q-values, the expected
+        gain of the final duration and the reason
+    """
+    import numpy as np
+
+    decisions = policy.decide_batch(contexts, explore=False)
+    n = len(decisions)
+    on = np.fromiter((d["action"] == "ON" for d in decisions), bool, n)
+    durations = np.fromiter((d["heating_duration_minutes"] for d in decisions), int, n)
+    deltas = np.fromiter((c["t_return"] - c["t_pool"] for c in contexts), float, n)
+    overrides = np.full(n, None, dtype=object)
+
+    if pump_run_minutes is not None and pump_run_minutes < min_run_time:
+        extend = ~on
+        on = on | extend
+        durations = np.where(extend, int(min_run_time - pump_run_minutes) + MIN_RUN_MARGIN, durations)
+        overrides[extend] = OVERRIDE_MIN_RUN
+    low_delta = on & (deltas < MIN_HEATING_DELTA)
+    on &= ~low_delta
+    durations = np.where(low_delta, 0, durations)
+    overrides[low_delta] = OVERRIDE_LOW_DELTA
+
+    results = []
+    for context, decision, is_on, duration, delta, override in zip(
+        contexts, decisions, on.tolist(), durations.tolist(), deltas.tolist(), overrides.tolist()
+    ):
+        if override == OVERRIDE_LOW_DELTA:
+            reason = explanation_engine.get_status_message("safety_override", delta=delta)
+        else:
+            reason = explanation_engine.get_explanation(
+                action=decision["action"], context=context, is_warmup=decision.get("is_warmup", False)
+            )
+            if override == OVERRIDE_MIN_RUN:
+                reason += f" (Protegiendo bomba: {pump_run_minutes:.0f}min run)"
+        results.append(
+            {
+                "context": {key: context[key] for key in ("t_pool", "uv_index", "wind_speed", "sun_elevation")}
+                | {"delta": round(delta, 3)},
+                "action": "ON" if is_on else "OFF",
+                "heating_duration_minutes": duration,
+                "policy_action": decision["action"],
+                "policy_duration_minutes": decision["heating_duration_minutes"],
+                "override": override,
+                "state_index": decision.get("state_index"),
+                "q_values": [float(value) for value in decision.get("q_values", [])],
+                "expected_gain": float(gain_fn(context, duration)),
+                "explanation": reason,
+            }
+        )
+    return results